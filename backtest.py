@@ -0,0 +1,293 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, List, Optional, Sequence, TextIO, Tuple
+
+from columnar import ColumnarSnapshot
+from discounts import filter_discounts, name_column, price_columns
+from export import FORMATS, write_rows
+from main import SkinportAPI
+
+# Saved responses replayed per worker task (consecutive snapshots of one market)
+SHARD_SIZE = 50
+CHECKPOINT_NAME = "backtest_checkpoint.json"
+SUMMARY_FIELDS = ("min_discount_percent", "min_price", "snapshots", "hits", "hits_per_snapshot",
+                  "bought_percent", "repriced_percent", "unchanged_percent", "avg_discount_percent")
+
+Rule = Tuple[float, float]
+
+
+def rule_grid(min_discounts: Iterable[float], min_prices: Iterable[float]) -> List[Rule]:
+    """Every (min_discount_percent, min_price) combination, in order."""
+    return sorted(itertools.product(min_discounts, min_prices))
+
+
+def _rule_key(rule: Rule) -> str:
+    return f"{rule[0]:g}|{rule[1]:g}"
+
+
+def _quantity_column(items: Sequence[Dict]) -> Sequence[int]:
+    if isinstance(items, ColumnarSnapshot):
+        return items.column('quantity')
+    return array('q', (-1 if item.get('quantity') is None else item['quantity'] for item in items))
+
+
+def plan_shards(entries: List[Dict], shard_size: int = SHARD_SIZE,
+                currency: Optional[str] = None) -> List[List[str]]:
+    """
+    Split saved responses into shards of consecutive snapshots per market.
+
+    Neighbouring shards overlap by one snapshot, so every pair of
+    consecutive snapshots of a market is evaluated exactly once.
+
+    Args:
+        entries: Snapshot catalog entries (any order)
+        shard_size: Snapshot pairs per shard
+        currency: Only replay snapshots in this currency
+
+    Returns:
+        Lists of snapshot paths, oldest first
+    """
+    markets: Dict[Tuple, List[Dict]] = {}
+    for entry in entries:
+        if currency and entry['currency'] not in (None, currency):
+            continue
+        markets.setdefault((entry['currency'], entry['app_id']), []).append(entry)
+
+    shards = []
+    for market in sorted(markets, key=str):
+        paths = [e['path'] for e in sorted(markets[market], key=lambda e: (e['timestamp'], e['file']))]
+        for start in range(0, len(paths) - 1, shard_size):
+            shards.append(paths[start:start + shard_size + 1])
+    return shards
+
+
+def shard_id(paths: List[str]) -> str:
+    return f"{os.path.basename(paths[0])}..{os.path.basename(paths[-1])}"
+
+
+def run_shard(data_dir: str, paths: List[str], grid: List[Rule]) -> Dict:
+    """
+    Replay every rule over consecutive snapshot pairs of one shard.
+
+    Each snapshot is loaded once, its discounts are computed once for the
+    loosest rule, and the stricter rules only re-check those candidates.
+    A hit counts as bought if its quantity dropped or it was delisted by
+    the next snapshot, and as repriced if its min_price changed.
+
+    Returns:
+        Dict with 'pairs' (snapshot pairs evaluated) and 'rules' (rule key
+        -> [hits, bought, repriced, unchanged, discount total])
+    """
+    api = SkinportAPI(data_dir=data_dir)
+    loosest_discount = min(rule[0] for rule in grid)
+    loosest_price = min(rule[1] for rule in grid)
+    totals = {_rule_key(rule): [0, 0, 0, 0, 0.0] for rule in grid}
+    pairs = 0
+    previous = None
+    for path in paths:
+        items = api.get_items(use_local=True, local_file=path)
+        if not len(items):
+            previous = None  # Unreadable snapshot: skip both pairs it belongs to
+            continue
+        current, suggested = price_columns(items)
+        quantity = _quantity_column(items)
+        names = name_column(items)
+        if previous is not None:
+            pairs += 1
+            prev_names, prev_current, prev_suggested, prev_quantity, candidates = previous
+            latest = {name: i for i, name in enumerate(names)}
+            for i, discount in candidates:
+                j = latest.get(prev_names[i])
+                price = prev_current[i]
+                # Thresholds apply to the unrounded discount, as in filter_discounts
+                exact = (prev_suggested[i] - price) / prev_suggested[i] * 100
+                if j is None or not current[j] > 0:
+                    bought, repriced = True, False
+                else:
+                    bought = 0 <= quantity[j] < prev_quantity[i]
+                    repriced = current[j] != price
+                for rule in grid:
+                    if exact >= rule[0] and price >= rule[1]:
+                        stats = totals[_rule_key(rule)]
+                        stats[0] += 1
+                        stats[1] += bought
+                        stats[2] += repriced
+                        stats[3] += not (bought or repriced)
+                        stats[4] += discount
+        candidates = filter_discounts(current, suggested, loosest_discount, loosest_price)
+        previous = (names, current, suggested, quantity, candidates)
+    return {'pairs': pairs, 'rules': totals}
+
+
+def _load_checkpoint(path: str, data_dir: str, grid: List[Rule]) -> Dict[str, Dict]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if checkpoint.get('data_dir') != os.path.abspath(data_dir) or checkpoint.get('grid') != [list(r) for r in grid]:
+        print(f"Ignoring checkpoint {path}: it was made for different snapshots or rules", file=sys.stderr)
+        return {}
+    return checkpoint.get('shards', {})
+
+
+def _save_checkpoint(path: str, data_dir: str, grid: List[Rule], shards: Dict[str, Dict]):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'data_dir': os.path.abspath(data_dir), 'grid': [list(r) for r in grid], 'shards': shards}, f)
+    os.replace(tmp_path, path)
+
+
+def summarize(results: Iterable[Dict], grid: List[Rule]) -> List[Dict]:
+    """Merge shard results into one summary row per rule."""
+    pairs = 0
+    totals = {_rule_key(rule): [0, 0, 0, 0, 0.0] for rule in grid}
+    for result in results:
+        pairs += result['pairs']
+        for key, values in result['rules'].items():
+            merged = totals[key]
+            for k, value in enumerate(values):
+                merged[k] += value
+
+    def percent(part: float, whole: float) -> Optional[float]:
+        return round(part / whole * 100, 2) if whole else None
+
+    rows = []
+    for rule in grid:
+        hits, bought, repriced, unchanged, discount_total = totals[_rule_key(rule)]
+        rows.append({
+            'min_discount_percent': rule[0],
+            'min_price': rule[1],
+            'snapshots': pairs,
+            'hits': hits,
+            'hits_per_snapshot': round(hits / pairs, 2) if pairs else None,
+            'bought_percent': percent(bought, hits),
+            'repriced_percent': percent(repriced, hits),
+            'unchanged_percent': percent(unchanged, hits),
+            'avg_discount_percent': round(discount_total / hits, 2) if hits else None,
+        })
+    return rows
+
+
+def backtest(data_dir: str, grid: List[Rule], workers: Optional[int] = None, shard_size: int = SHARD_SIZE,
+             currency: Optional[str] = None, checkpoint: Optional[str] = None,
+             progress: Optional[TextIO] = sys.stderr) -> List[Dict]:
+    """
+    Replay a grid of discount rules over the saved responses.
+
+    Shards of consecutive snapshots are evaluated on a process pool. Every
+    finished shard is written to the checkpoint file, so an interrupted
+    run picks up where it stopped when started again with the same rules.
+
+    Args:
+        data_dir: Directory holding the saved responses
+        grid: (min_discount_percent, min_price) rules to evaluate
+        workers: Worker processes (1 runs everything in this process)
+        shard_size: Snapshot pairs per worker task
+        currency: Only replay snapshots in this currency
+        checkpoint: File recording finished shards (None disables resuming)
+        progress: Where to report progress (None for quiet)
+
+    Returns:
+        One summary row per rule (see SUMMARY_FIELDS)
+    """
+    if not grid:
+        raise ValueError("No rules to backtest")
+    api = SkinportAPI(data_dir=data_dir)
+    shards = plan_shards(api.get_snapshot_catalog(), shard_size, currency)
+    done = _load_checkpoint(checkpoint, data_dir, grid) if checkpoint else {}
+    results = {shard_id(paths): done[shard_id(paths)] for paths in shards if shard_id(paths) in done}
+    pending = [paths for paths in shards if shard_id(paths) not in results]
+    total_pairs = sum(len(paths) - 1 for paths in shards)
+    resumed = finished = sum(len(paths) - 1 for paths in shards if shard_id(paths) in results)
+    if progress is not None and results:
+        print(f"Resuming: {len(results)} of {len(shards)} shards already done", file=progress, flush=True)
+    started = time.perf_counter()
+
+    def report(paths: List[str], result: Dict):
+        nonlocal finished
+        results[shard_id(paths)] = result
+        finished += len(paths) - 1
+        if checkpoint:
+            _save_checkpoint(checkpoint, data_dir, grid, results)
+        if progress is not None:
+            elapsed = time.perf_counter() - started
+            remaining = elapsed / (finished - resumed) * (total_pairs - finished)
+            print(f"[{len(results)}/{len(shards)} shards] {finished}/{total_pairs} snapshot pairs, "
+                  f"{elapsed:.0f}s elapsed, ~{remaining:.0f}s left", file=progress, flush=True)
+
+    if workers == 1:
+        for paths in pending:
+            report(paths, run_shard(data_dir, paths, grid))
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = {executor.submit(run_shard, data_dir, paths, grid): paths for paths in pending}
+            for future in as_completed(futures):
+                report(futures[future], future.result())
+
+    return summarize((results[shard_id(paths)] for paths in shards), grid)
+
+
+def format_table(rows: List[Dict]) -> str:
+    """Fixed-width summary table, one line per rule."""
+    def value(number: Optional[float], spec: str) -> str:
+        return "-" if number is None else format(number, spec)
+
+    row_format = "{:>10} {:>10} {:>8} {:>10} {:>10} {:>10} {:>10} {:>10}"
+    lines = [row_format.format("Min Disc %", "Min Price", "Hits", "Hits/Snap", "Bought %", "Repriced %",
+                               "Same %", "Avg Disc %"),
+             "-" * 88]
+    for row in rows:
+        lines.append(row_format.format(
+            f"{row['min_discount_percent']:g}", f"{row['min_price']:.2f}", row['hits'],
+            value(row['hits_per_snapshot'], ".2f"), value(row['bought_percent'], ".1f"),
+            value(row['repriced_percent'], ".1f"), value(row['unchanged_percent'], ".1f"),
+            value(row['avg_discount_percent'], ".1f")))
+    return "\n".join(lines)
+
+
+def _floats(text: str) -> List[float]:
+    return [float(part) for part in text.split(",") if part.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Replay discount rules over saved responses and report how their hits turned out")
+    parser.add_argument("--data-dir", default="saved_responses", help="Saved responses directory")
+    parser.add_argument("--min-discount", type=_floats, default=[5, 10, 15, 20, 30], metavar="LIST",
+                        help="Comma-separated minimum discount percentages (default: 5,10,15,20,30)")
+    parser.add_argument("--min-price", type=_floats, default=[0.5, 1, 5, 20], metavar="LIST",
+                        help="Comma-separated minimum prices (default: 0.5,1,5,20)")
+    parser.add_argument("--currency", help="Only replay snapshots in this currency")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: one per CPU)")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE,
+                        help=f"Snapshot pairs per worker task (default: {SHARD_SIZE})")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help=f"Checkpoint file for resuming (default: DATA_DIR/{CHECKPOINT_NAME})")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--format", choices=("table",) + FORMATS, default="table")
+    parser.add_argument("--quiet", action="store_true", help="Don't report progress")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.data_dir):
+        parser.error(f"No saved responses in {args.data_dir}")
+    checkpoint = args.checkpoint or os.path.join(args.data_dir, CHECKPOINT_NAME)
+    if args.restart and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    rows = backtest(args.data_dir, rule_grid(args.min_discount, args.min_price), workers=args.workers,
+                    shard_size=max(args.shard_size, 1), currency=args.currency, checkpoint=checkpoint,
+                    progress=None if args.quiet else sys.stderr)
+    if args.format == "table":
+        print(format_table(rows))
+    else:
+        write_rows(rows, SUMMARY_FIELDS, args.format)
+
+
+if __name__ == "__main__":
+    main()
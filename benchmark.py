@@ -0,0 +1,249 @@
+"""
+Performance benchmarks on synthetic /v1/items snapshots.
+
+Generates realistic snapshots into a temporary saved_responses directory,
+times the local data paths and compares the results with a JSON baseline:
+
+    python benchmark.py --sizes 1000,20000,100000 --baseline bench_baseline.json
+    python benchmark.py --update-baseline
+
+Exits with status 1 if any benchmark is slower than the baseline by more than
+--threshold (default 25%).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+# Peak memory growth below this is never reported as a regression
+MEMORY_NOISE_BYTES = 64 * 1024
+
+WEAPONS = ["AK-47", "M4A4", "M4A1-S", "AWP", "Desert Eagle", "USP-S", "Glock-18", "P250", "FAMAS",
+           "Galil AR", "MP9", "MAC-10", "UMP-45", "P90", "SSG 08", "Five-SeveN", "Tec-9", "CZ75-Auto",
+           "Nova", "XM1014", "MAG-7", "Negev", "M249", "SG 553", "AUG", "MP7", "PP-Bizon"]
+KNIVES = ["★ Karambit", "★ Butterfly Knife", "★ M9 Bayonet", "★ Bayonet", "★ Talon Knife", "★ Skeleton Knife"]
+SKINS = ["Redline", "Asiimov", "Vulcan", "Fire Serpent", "Hyper Beast", "Neo-Noir", "Slate", "Printstream",
+         "Case Hardened", "Fade", "Doppler", "Tiger Tooth", "Safari Mesh", "Boreal Forest", "Night",
+         "Blue Steel", "Crimson Web", "Bloodsport", "Phantom Disruptor", "Elite Build", "Wasteland Rebel"]
+WEARS = ["Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred"]
+OTHER = ["Sticker | {} (Holo) | Katowice 2014", "Sticker | {} | Paris 2023", "{} Case", "Sealed Graffiti | {}",
+         "Music Kit | {}", "Patch | {}"]
+
+
+def generate_items(count: int, seed: int = 0, currency: str = "EUR") -> List[Dict]:
+    """Generate /v1/items-shaped items with realistic names and log-normal prices."""
+    rng = random.Random(seed)
+    names = set()
+    items = []
+    now = int(time.time())
+    while len(items) < count:
+        roll = rng.random()
+        if roll < 0.7:
+            weapon = rng.choice(WEAPONS)
+            prefix = "StatTrak™ " if rng.random() < 0.2 else ("Souvenir " if rng.random() < 0.05 else "")
+            name = f"{prefix}{weapon} | {rng.choice(SKINS)} ({rng.choice(WEARS)})"
+        elif roll < 0.8:
+            name = f"{rng.choice(KNIVES)} | {rng.choice(SKINS)} ({rng.choice(WEARS)})"
+        else:
+            name = rng.choice(OTHER).format(f"{rng.choice(SKINS)} {rng.randint(1, 999)}")
+        # Keep names unique like the real catalogue
+        if name in names:
+            name = f"{name} #{len(items)}"
+        names.add(name)
+
+        suggested = round(rng.lognormvariate(1.5, 1.6), 2)
+        has_listing = rng.random() < 0.85
+        min_price = round(suggested * rng.uniform(0.55, 1.3), 2) if has_listing else None
+        items.append({
+            'market_hash_name': name,
+            'currency': currency,
+            'suggested_price': suggested,
+            'item_page': f"https://skinport.com/item/{len(items)}",
+            'market_page': f"https://skinport.com/market?item={len(items)}",
+            'min_price': min_price,
+            'max_price': round(min_price * rng.uniform(1, 3), 2) if has_listing else None,
+            'mean_price': round(min_price * rng.uniform(1, 1.5), 2) if has_listing else None,
+            'median_price': round(min_price * rng.uniform(1, 1.4), 2) if has_listing else None,
+            'quantity': rng.randint(1, 400) if has_listing else 0,
+            'created_at': now - rng.randint(0, 10 ** 8),
+            'updated_at': now - rng.randint(0, 3600),
+        })
+    return items
+
+
+def measure(func: Callable, repeat: int = 3) -> Dict:
+    """Best wall time over repeat runs, plus peak traced memory of one run."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': best, 'peak_bytes': peak}
+
+
+def bench_gui(items: List[Dict], currency: str) -> Optional[Callable]:
+    """Benchmark for filling the GUI results table, or None without a display."""
+    try:
+        import tkinter as tk
+        root = tk.Tk()
+    except Exception:
+        return None
+    root.withdraw()
+    from gui import SkinportGUI
+    gui = SkinportGUI(root)
+    rows = [(item, gui._format_row(item, currency)) for item in items]
+
+    def populate():
+        gui._update_results(rows, currency)
+        while len(gui.tree.get_children()) < len(rows):
+            root.update()
+
+    return populate
+
+
+def run(sizes: List[int], files: int, repeat: int) -> Dict[str, Dict]:
+    from item_table import ItemTable
+    from main import SkinportAPI, display_items
+
+    results = {}
+    workdir = tempfile.mkdtemp(prefix="skinport-bench-")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        for size in sizes:
+            api = SkinportAPI(data_dir=f"saved_responses_{size}")
+            items = generate_items(size, seed=size)
+            json_file = api._save_response(items, "EUR", 730)
+            plain_file = os.path.join(api.data_dir, "plain.json")
+            with open(plain_file, 'w', encoding='utf-8') as f:
+                json.dump(items, f, indent=2)
+            loaded = api.get_items(use_local=True, local_file=json_file)
+
+            def record(name: str, func: Callable):
+                result = measure(func, repeat)
+                result['items_per_second'] = size / result['seconds'] if result['seconds'] else None
+                results[f"{name}[{size}]"] = result
+                print(f"{name}[{size}]: {result['seconds'] * 1000:.1f} ms, "
+                      f"peak {result['peak_bytes'] / 2 ** 20:.1f} MiB", flush=True)
+
+            # Loads go around the snapshot cache so they measure reading the file
+            def load_local(path: str):
+                api.invalidate_snapshots([path])
+                return api.get_items(use_local=True, local_file=path)
+
+            record("get_items_local_json", lambda: load_local(plain_file))
+            record("get_items_local_columnar", lambda: list(load_local(json_file)))
+            record("iter_items_local_json", lambda: sum(1 for _ in api.iter_items(use_local=True, local_file=plain_file)))
+            record("get_discounted_items", lambda: api.get_discounted_items(10, min_price=1, items=loaded))
+            record("get_discounted_items_top100", lambda: api.get_discounted_items(10, min_price=1, items=loaded,
+                                                                                   limit=100))
+            record("get_discounted_items_median_7d", lambda: api.get_discounted_items(
+                10, min_price=1, items=loaded, score="median_7d"))
+            record("item_table", lambda: ItemTable(loaded))
+            table = ItemTable(loaded)
+            record("get_discounted_items_facets", lambda: api.get_discounted_items(
+                10, min_price=1, items=table, facets={'category': ["Weapon"], 'wear': ["Factory New"]}))
+            discounted = api.get_discounted_items(10, min_price=1, items=loaded)
+
+            def display():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    display_items(discounted, "EUR")
+            record("display_items", display)
+
+            populate = bench_gui(discounted, "EUR")
+            if populate:
+                record("gui_populate", populate)
+            else:
+                print("gui_populate: skipped (no display; run under xvfb-run to include it)")
+
+        # Listing saved responses with many files in the directory
+        api = SkinportAPI(data_dir="saved_responses_many")
+        os.makedirs(api.data_dir, exist_ok=True)
+        start = datetime(2024, 1, 1)
+        for i in range(files):
+            stamp = (start + timedelta(minutes=5 * i)).strftime("%Y%m%d_%H%M%S")
+            with open(os.path.join(api.data_dir, f"items_{stamp}_EUR_730.json"), 'w', encoding='utf-8') as f:
+                f.write("[]")
+        api.refresh_saved_responses()
+        result = measure(api.get_saved_responses, repeat)
+        results[f"get_saved_responses[{files} files]"] = result
+        print(f"get_saved_responses[{files} files]: {result['seconds'] * 1000:.1f} ms", flush=True)
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+            memory_threshold: float = 0.25) -> List[str]:
+    """List benchmarks that got slower, or peaked higher in memory, than the baseline by more than the thresholds."""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        if base.get('seconds'):
+            ratio = result['seconds'] / base['seconds']
+            if ratio > 1 + threshold:
+                regressions.append(f"{name}: {base['seconds'] * 1000:.1f} ms -> "
+                                   f"{result['seconds'] * 1000:.1f} ms ({(ratio - 1) * 100:+.0f}%)")
+        base_peak, peak = base.get('peak_bytes'), result.get('peak_bytes')
+        # Tiny peaks swing by whole allocations, so small absolute growth is ignored
+        if base_peak and peak is not None and peak - base_peak > MEMORY_NOISE_BYTES:
+            ratio = peak / base_peak
+            if ratio > 1 + memory_threshold:
+                regressions.append(f"{name}: peak {base_peak / 2 ** 20:.2f} MiB -> "
+                                   f"{peak / 2 ** 20:.2f} MiB ({(ratio - 1) * 100:+.0f}%)")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SkinportAPI on synthetic snapshots")
+    parser.add_argument("--sizes", default="1000,20000,100000",
+                        help="Comma-separated snapshot sizes (up to 500000)")
+    parser.add_argument("--files", type=int, default=2000, help="Saved responses for the listing benchmark")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark (best time is kept)")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="Baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="Allowed slowdown against the baseline (0.25 = 25%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.25,
+                        help="Allowed growth in peak memory against the baseline (0.25 = 25%%)")
+    parser.add_argument("--update-baseline", action="store_true", help="Write results as the new baseline")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    baseline_path = os.path.abspath(args.baseline)
+    results = run(sizes, args.files, args.repeat)
+
+    if args.update_baseline or not os.path.exists(baseline_path):
+        with open(baseline_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nBaseline written to {baseline_path}")
+        return
+
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold, args.memory_threshold)
+    if regressions:
+        print("\nRegressions:")
+        for line in regressions:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
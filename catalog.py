@@ -0,0 +1,258 @@
+import bisect
+import glob
+import itertools
+import json
+import os
+import struct
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from columnar import MAGIC as COLUMNAR_MAGIC, columnar_path
+from delta_store import DELTA_EXTENSION
+from snapshot_io import COMPRESSED_EXTENSION, PLAIN_EXTENSION, is_json_snapshot
+
+MANIFEST_NAME = "catalog.json"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M%S"
+
+
+def snapshot_timestamp(path: str) -> str:
+    """Timestamp string embedded in a saved response's file name."""
+    # items_<YYYYmmdd_HHMMSS>[_<currency>_<app_id>].<ext>
+    return os.path.basename(path)[len("items_"):].split(".")[0][:len("YYYYmmdd_HHMMSS")]
+
+
+def snapshot_market(path: str) -> Tuple[Optional[str], Optional[int]]:
+    """(currency, app_id) embedded in a saved response's file name, if any."""
+    parts = os.path.basename(path)[len("items_"):].split(".")[0].split("_")
+    if len(parts) == 4 and parts[3].isdigit():
+        return parts[2], int(parts[3])
+    return None, None
+
+
+def matches_market(entry: Dict, currency: Optional[str] = None, app_id: Optional[int] = None) -> bool:
+    """
+    Whether a catalog entry holds data for a market.
+    
+    None on either side matches anything: a None filter means any market,
+    and snapshots saved before responses were tagged have no market.
+    """
+    return ((currency is None or entry.get('currency') in (None, currency)) and
+            (app_id is None or entry.get('app_id') in (None, app_id)))
+
+
+def companion_files(path: str) -> List[str]:
+    """Files stored alongside a saved response (e.g. its columnar copy)."""
+    return [columnar_path(path)] if is_json_snapshot(path) else []
+
+
+@dataclass
+class RetentionPolicy:
+    """
+    Which saved responses to keep as they age.
+
+    Everything newer than keep_all_hours is kept. Up to hourly_days old, the
+    newest snapshot per hour is kept; after that, the newest per day, for up
+    to daily_days (None keeps daily snapshots forever). Buckets are separate
+    per currency and app_id.
+    """
+    keep_all_hours: float = 24
+    hourly_days: float = 7
+    daily_days: Optional[float] = None
+
+    def select(self, entries: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """Get the entries the policy would delete."""
+        now = now or datetime.now()
+        seen = set()
+        expired = []
+        # Newest first, so the first entry seen in a bucket is the one kept
+        for entry in sorted(entries, key=lambda e: e['timestamp'], reverse=True):
+            when = datetime.strptime(entry['timestamp'], TIMESTAMP_FORMAT)
+            age = now - when
+            if age <= timedelta(hours=self.keep_all_hours):
+                continue
+            if age <= timedelta(days=self.hourly_days):
+                bucket = when.strftime("%Y%m%d%H")
+            elif self.daily_days is None or age <= timedelta(days=self.daily_days):
+                bucket = when.strftime("%Y%m%d")
+            else:
+                expired.append(entry)
+                continue
+            key = (entry.get('currency'), entry.get('app_id'), bucket)
+            if key in seen:
+                expired.append(entry)
+            else:
+                seen.add(key)
+        return expired
+
+
+def parse_retention(value: Optional[str]) -> Optional[RetentionPolicy]:
+    """
+    Parse a retention setting (--retention or $SKINPORT_RETENTION).
+
+    "90" keeps daily snapshots for 90 days (with the default first day and
+    hourly week), "forever" keeps daily snapshots forever, and an empty
+    value or "off" disables retention.
+
+    Raises:
+        ValueError: If the value is none of these
+    """
+    if value is None or value.strip().lower() in ("", "off"):
+        return None
+    if value.strip().lower() == "forever":
+        return RetentionPolicy()
+    try:
+        days = float(value)
+    except ValueError:
+        days = 0
+    if not days > 0:
+        raise ValueError(f"Retention must be a number of days, 'forever' or 'off': {value}")
+    return RetentionPolicy(daily_days=days)
+
+
+class SnapshotCatalog:
+    """
+    Persisted manifest of saved responses.
+
+    Entries hold the file name, timestamp, currency, app_id, item count and
+    byte size, kept sorted by timestamp so the newest snapshots are found
+    without listing or sorting the directory. The manifest is rewritten
+    atomically on every change and rebuilt from the directory if missing.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.path = os.path.join(data_dir, MANIFEST_NAME)
+        self._entries: List[Dict] = []
+        self._keys: List[Tuple[str, str]] = []
+        self._mtime: Optional[float] = None
+        self._lock = threading.RLock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)['snapshots']
+            self._mtime = os.path.getmtime(self.path)
+        except (OSError, ValueError, KeyError):
+            self.rebuild()
+            return
+        self._set_entries(entries)
+
+    def _set_entries(self, entries: List[Dict]):
+        self._entries = sorted(entries, key=lambda e: (e['timestamp'], e['file']))
+        self._keys = [(e['timestamp'], e['file']) for e in self._entries]
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': 1, 'snapshots': self._entries}, f)
+        os.replace(tmp_path, self.path)
+        self._mtime = os.path.getmtime(self.path)
+
+    def _sync(self):
+        """Pick up changes written by another process."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._load()
+
+    @staticmethod
+    def _describe(path: str) -> Dict:
+        """Build an entry for a file that was saved without metadata."""
+        info = {'count': None, 'base': None}
+        try:
+            if path.endswith(DELTA_EXTENSION):
+                with open(path, 'r', encoding='utf-8') as f:
+                    delta = json.load(f)
+                info = {'count': delta.get('count'), 'base': delta.get('base')}
+            else:
+                cols = columnar_path(path)
+                if os.path.exists(cols):
+                    with open(cols, 'rb') as f:
+                        prefix = f.read(len(COLUMNAR_MAGIC) + 4)
+                        (header_len,) = struct.unpack_from('<I', prefix, len(COLUMNAR_MAGIC))
+                        info['count'] = json.loads(f.read(header_len))['count']
+        except (OSError, ValueError, KeyError, struct.error):
+            pass
+        return info
+
+    def _entry(self, path: str, currency: Optional[str], app_id: Optional[int],
+               count: Optional[int], base: Optional[str] = None) -> Dict:
+        timestamp = snapshot_timestamp(path)
+        size = sum(os.path.getsize(f) for f in [path] + companion_files(path) if os.path.exists(f))
+        return {
+            'file': os.path.basename(path),
+            'timestamp': timestamp,
+            'time': datetime.strptime(timestamp, TIMESTAMP_FORMAT).strftime("%Y-%m-%d %H:%M:%S"),
+            'kind': 'delta' if path.endswith(DELTA_EXTENSION) else 'full',
+            'currency': currency,
+            'app_id': app_id,
+            'count': count,
+            'bytes': size,
+            'base': os.path.basename(base) if base else None,
+        }
+
+    def rebuild(self):
+        """Rebuild the manifest by scanning the data directory."""
+        with self._lock:
+            files = glob.glob(os.path.join(self.data_dir, f"items_*{PLAIN_EXTENSION}"))
+            files += glob.glob(os.path.join(self.data_dir, f"items_*{COMPRESSED_EXTENSION}"))
+            files += glob.glob(os.path.join(self.data_dir, f"items_*{DELTA_EXTENSION}"))
+            entries = []
+            for path in files:
+                try:
+                    info = self._describe(path)
+                    entries.append(self._entry(path, *snapshot_market(path), info['count'], info['base']))
+                except (OSError, ValueError):
+                    continue
+            self._set_entries(entries)
+            if os.path.isdir(self.data_dir):
+                self._save()
+
+    def add(self, path: str, currency: Optional[str] = None, app_id: Optional[int] = None,
+            count: Optional[int] = None, base: Optional[str] = None) -> Dict:
+        """Record a newly saved response (base is the keyframe of a delta)."""
+        with self._lock:
+            self._sync()
+            entry = self._entry(path, currency, app_id, count, base)
+            key = (entry['timestamp'], entry['file'])
+            idx = bisect.bisect_left(self._keys, key)
+            if idx < len(self._keys) and self._keys[idx] == key:
+                self._entries[idx] = entry
+            else:
+                self._keys.insert(idx, key)
+                self._entries.insert(idx, entry)
+            self._save()
+            return entry
+
+    def remove(self, files: List[str]):
+        """Drop entries (by file name or path) from the manifest."""
+        names = {os.path.basename(f) for f in files}
+        with self._lock:
+            self._sync()
+            self._set_entries([e for e in self._entries if e['file'] not in names])
+            self._save()
+
+    def entries(self) -> List[Dict]:
+        """All entries, newest first."""
+        with self._lock:
+            self._sync()
+            return self._entries[::-1]
+
+    def latest(self, n: int = 1, currency: Optional[str] = None, app_id: Optional[int] = None) -> List[Dict]:
+        """The newest n entries (of one market if currency/app_id are given), newest first."""
+        if n <= 0:
+            return []
+        with self._lock:
+            self._sync()
+            if currency is None and app_id is None:
+                return self._entries[:-n - 1:-1]
+            matching = (e for e in reversed(self._entries) if matches_market(e, currency, app_id))
+            return list(itertools.islice(matching, n))
+
+    def path_for(self, entry: Dict) -> str:
+        return os.path.join(self.data_dir, entry['file'])
@@ -0,0 +1,356 @@
+import glob
+import json
+import mmap
+import os
+import struct
+import sys
+import weakref
+import zlib
+from array import array
+from typing import Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+from snapshot_io import COMPRESSED_EXTENSION, PLAIN_EXTENSION, read_snapshot, snapshot_base
+
+# File layout:
+#   MAGIC | uint32 header length | JSON header | padding to 8 bytes | column data
+# All column offsets in the header are relative to the start of the column data,
+# whose length and CRC-32 are stored in the header (files written before the
+# checksum was added have neither and are not verified).
+MAGIC = b"SKPCOL01"
+EXTENSION = ".cols"
+
+FLOAT_COLUMNS = ('suggested_price', 'min_price', 'max_price', 'mean_price', 'median_price')
+INT_COLUMNS = ('quantity', 'created_at', 'updated_at')
+STRING_COLUMNS = ('market_hash_name', 'currency', 'item_page', 'market_page')
+FIELD_ORDER = ('market_hash_name', 'currency', 'suggested_price', 'item_page', 'market_page',
+               'min_price', 'max_price', 'mean_price', 'median_price', 'quantity',
+               'created_at', 'updated_at')
+
+# Sentinels for missing values (floats use NaN)
+INT_MISSING = -1
+STRING_MISSING = 0xFFFFFFFF
+# Rows converted at a time when iterating a snapshot
+ITER_BLOCK = 4096
+
+
+def columnar_path(json_path: str) -> str:
+    """Return the columnar snapshot path stored next to a saved JSON response."""
+    return snapshot_base(json_path) + EXTENSION
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def write_snapshot(items: Sequence[Dict], path: str) -> str:
+    """
+    Write items to a columnar snapshot file.
+
+    The file is written to a temporary path, flushed to disk and renamed
+    over the target, so readers never see a partial snapshot.
+
+    Args:
+        items: Items as returned by the /v1/items endpoint
+        path: Destination file (written atomically)
+
+    Returns:
+        The path that was written
+    """
+    strings: List[str] = []
+    string_ids: Dict[str, int] = {}
+
+    def intern(value) -> int:
+        if value is None:
+            return STRING_MISSING
+        value = str(value)
+        idx = string_ids.get(value)
+        if idx is None:
+            idx = string_ids[value] = len(strings)
+            strings.append(value)
+        return idx
+
+    def to_float(value) -> float:
+        return float('nan') if value is None else float(value)
+
+    def to_int(value) -> int:
+        return INT_MISSING if value is None else int(value)
+
+    columns = {}
+    for name in FLOAT_COLUMNS:
+        columns[name] = array('d', (to_float(item.get(name)) for item in items))
+    for name in INT_COLUMNS:
+        columns[name] = array('q', (to_int(item.get(name)) for item in items))
+    for name in STRING_COLUMNS:
+        columns[name] = array('I', (intern(item.get(name)) for item in items))
+
+    encoded = [s.encode('utf-8') for s in strings]
+    string_offsets = array('Q', [0])
+    for raw in encoded:
+        string_offsets.append(string_offsets[-1] + len(raw))
+    blob = b"".join(encoded)
+
+    # Lay out the data sections, each 8-byte aligned
+    sections = []
+    layout = {}
+    offset = 0
+    for name, values in columns.items():
+        data = values.tobytes()
+        layout[name] = [values.typecode, offset, len(data)]
+        sections.append((offset, data))
+        offset = _align(offset + len(data))
+    string_layout = {'offsets': [offset, len(string_offsets.tobytes())]}
+    sections.append((offset, string_offsets.tobytes()))
+    offset = _align(offset + len(string_offsets.tobytes()))
+    string_layout['blob'] = [offset, len(blob)]
+    sections.append((offset, blob))
+    data = bytearray(offset + len(blob))
+    for section_offset, section in sections:
+        data[section_offset:section_offset + len(section)] = section
+
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'count': len(items),
+        'string_count': len(strings),
+        'fields': list(FIELD_ORDER),
+        'columns': layout,
+        'strings': string_layout,
+        'data_bytes': len(data),
+        'crc32': zlib.crc32(data),
+    }).encode('utf-8')
+    prefix = MAGIC + struct.pack('<I', len(header)) + header
+    data_start = _align(len(prefix))
+
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(prefix)
+            f.write(b"\0" * (data_start - len(prefix)))
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+def _release(file, mm: mmap.mmap, views: List[memoryview]):
+    for view in reversed(views):
+        view.release()
+    views.clear()
+    if not mm.closed:
+        mm.close()
+    file.close()
+
+
+def make_row(fields: Sequence[str], columns: Mapping[str, Sequence], i: int,
+             string: Optional[Callable[[int], Optional[str]]] = None) -> Dict:
+    """
+    Build the item dict for row i of a set of typed columns.
+
+    Missing values (NaN floats, -1 integers) become None. String columns hold
+    indices resolved with string(), or the strings themselves if it is None.
+    """
+    row = {}
+    for name in fields:
+        value = columns[name][i]
+        if name in STRING_COLUMNS:
+            if string is not None:
+                value = string(value)
+        elif name in INT_COLUMNS:
+            if value == INT_MISSING:
+                value = None
+        elif value != value:
+            value = None
+        row[name] = value
+    return row
+
+
+class RowSequence(Sequence):
+    """Read-only sequence of item dicts built on access by _row() from _count rows of columns."""
+
+    _count: int
+
+    def _row(self, i: int) -> Dict:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError(f"{type(self).__name__} index out of range")
+        return self._row(index)
+
+
+class ColumnarSnapshot(RowSequence):
+    """
+    Read-only, memory-mapped view of a columnar snapshot.
+
+    Behaves like a list of item dicts (rows are materialized on access),
+    while the numeric columns can be read directly without building dicts.
+    Call close() (or use it as a context manager) to release the mapping;
+    otherwise it is released as soon as the last reference is dropped.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        self._views: List[memoryview] = []
+        self._finalizer = weakref.finalize(self, _release, self._file, self._mm, self._views)
+        try:
+            self._open_views()
+        except Exception:
+            self.close()
+            raise
+
+    def _open_views(self):
+        if self._mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"Not a columnar snapshot: {self.path}")
+        try:
+            (header_len,) = struct.unpack_from('<I', self._mm, len(MAGIC))
+        except struct.error:
+            raise ValueError(f"Columnar snapshot is truncated: {self.path}")
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._mm[header_start:header_start + header_len].decode('utf-8'))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError(f"Snapshot byte order {header['byteorder']} does not match this machine")
+
+        data_start = _align(header_start + header_len)
+        view = memoryview(self._mm)
+        self._views.append(view)
+        if 'crc32' in header:
+            data = view[data_start:]
+            self._views.append(data)
+            if len(data) != header['data_bytes'] or zlib.crc32(data) != header['crc32']:
+                raise ValueError(f"Columnar snapshot is damaged (checksum mismatch): {self.path}")
+
+        def section(offset: int, length: int) -> memoryview:
+            part = view[data_start + offset:data_start + offset + length]
+            self._views.append(part)
+            return part
+
+        self._count = header['count']
+        self._fields = header['fields']
+        self._columns: Dict[str, memoryview] = {}
+        for name, (typecode, offset, length) in header['columns'].items():
+            column = section(offset, length).cast(typecode)
+            self._views.append(column)
+            self._columns[name] = column
+
+        offsets = section(*header['strings']['offsets']).cast('Q')
+        self._views.append(offsets)
+        self._string_offsets = offsets
+        self._blob = section(*header['strings']['blob'])
+        self._string_cache: Dict[int, str] = {}
+
+    def string(self, idx: int) -> Optional[str]:
+        """Resolve an index from a string column."""
+        if idx == STRING_MISSING:
+            return None
+        value = self._string_cache.get(idx)
+        if value is None:
+            start, end = self._string_offsets[idx], self._string_offsets[idx + 1]
+            value = self._string_cache[idx] = str(self._blob[start:end], 'utf-8')
+        return value
+
+    def column(self, name: str) -> memoryview:
+        """
+        Get a raw column.
+
+        Float columns use NaN for missing values, integer columns use -1 and
+        string columns hold indices that can be resolved with string().
+        """
+        return self._columns[name]
+
+    def strings(self, name: str) -> List[Optional[str]]:
+        """Get a string column resolved to Python strings."""
+        return [self.string(idx) for idx in self._columns[name]]
+
+    def _row(self, i: int) -> Dict:
+        return make_row(self._fields, self._columns, i, self.string)
+
+    def _values(self, name: str, start: int, stop: int) -> List:
+        """Get rows start:stop of a column as Python values, with None for missing ones."""
+        values = self._columns[name][start:stop].tolist()
+        if name in STRING_COLUMNS:
+            cache = self._string_cache
+            return [cache[idx] if idx in cache else self.string(idx) for idx in values]
+        if name in INT_COLUMNS:
+            return [None if value == INT_MISSING else value for value in values]
+        return [None if value != value else value for value in values]
+
+    def __iter__(self) -> Iterator[Dict]:
+        # Convert whole column blocks at once and zip them into rows, which is
+        # several times cheaper than resolving each field of each row in _row
+        fields = self._fields
+        for start in range(0, self._count, ITER_BLOCK):
+            stop = min(start + ITER_BLOCK, self._count)
+            columns = [self._values(name, start, stop) for name in fields]
+            for values in zip(*columns):
+                yield dict(zip(fields, values))
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        """Release the memory mapping."""
+        self._columns = {}
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def load_snapshot(path: str) -> ColumnarSnapshot:
+    """Open a columnar snapshot file."""
+    return ColumnarSnapshot(path)
+
+
+def convert_json_snapshots(data_dir: str, overwrite: bool = False) -> List[str]:
+    """
+    Write columnar copies of existing items_*.json(.gz) snapshots.
+
+    Args:
+        data_dir: Directory holding the saved responses
+        overwrite: Rewrite columnar files that already exist
+
+    Returns:
+        List of columnar files that were written
+    """
+    written = []
+    paths = glob.glob(os.path.join(data_dir, f"items_*{PLAIN_EXTENSION}"))
+    paths += glob.glob(os.path.join(data_dir, f"items_*{COMPRESSED_EXTENSION}"))
+    for json_path in sorted(paths):
+        target = columnar_path(json_path)
+        if not overwrite and os.path.exists(target):
+            continue
+        try:
+            items = read_snapshot(json_path)
+        except (OSError, ValueError) as e:
+            print(f"Skipping {json_path}: {str(e)}")
+            continue
+        written.append(write_snapshot(items, target))
+    return written
+
+
+if __name__ == "__main__":
+    args = [arg for arg in sys.argv[1:] if arg != "--overwrite"]
+    directory = args[0] if args else "saved_responses"
+    converted = convert_json_snapshots(directory, overwrite="--overwrite" in sys.argv)
+    print(f"Converted {len(converted)} snapshot(s) in {directory}")
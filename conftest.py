@@ -0,0 +1,2 @@
+# Lets the tests in tests/ import the top-level modules (main, columnar, ...)
+# without installing the project: pytest puts this file's directory on sys.path.
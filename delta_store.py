@@ -0,0 +1,111 @@
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Delta snapshots are stored as items_<timestamp>.delta next to the full
+# (keyframe) items_<timestamp>.json(.gz) files. Each delta is cumulative against its
+# keyframe, so any snapshot can be rebuilt from one keyframe and one delta.
+DELTA_EXTENSION = ".delta"
+
+# Fields that count as a price or quantity change for get_changes
+PRICE_FIELDS = ('suggested_price', 'min_price', 'max_price', 'mean_price', 'median_price', 'quantity')
+
+
+def index_by_name(items: Iterable[Dict]) -> Dict[str, Dict]:
+    """Key items by market_hash_name."""
+    return {item['market_hash_name']: item for item in items}
+
+
+def compute_delta(base: Dict[str, Dict], items: Sequence[Dict]) -> Dict:
+    """
+    Compute the per-item changes from a keyframe to a new item list.
+
+    Args:
+        base: Keyframe items keyed by market_hash_name
+        items: The new item list
+
+    Returns:
+        Dict with 'changed' (name -> changed fields, or the full item if new)
+        and 'removed' (names missing from the new list)
+    """
+    changed = {}
+    seen = set()
+    for item in items:
+        name = item['market_hash_name']
+        seen.add(name)
+        old = base.get(name)
+        if old is None:
+            changed[name] = dict(item)
+            continue
+        fields = {key: value for key, value in item.items() if old.get(key) != value}
+        fields.update((key, None) for key in old if key not in item)
+        if fields:
+            changed[name] = fields
+    removed = [name for name in base if name not in seen]
+    return {'changed': changed, 'removed': removed}
+
+
+def apply_delta(base_items: Iterable[Dict], delta: Dict) -> List[Dict]:
+    """Rebuild a snapshot from its keyframe items and a delta."""
+    changed = delta['changed']
+    removed = set(delta['removed'])
+    items = []
+    seen = set()
+    for item in base_items:
+        name = item['market_hash_name']
+        if name in removed:
+            continue
+        seen.add(name)
+        fields = changed.get(name)
+        items.append(dict(item, **fields) if fields else item)
+    # Items that were not in the keyframe go at the end
+    items.extend(dict(fields) for name, fields in changed.items() if name not in seen)
+    return items
+
+
+def write_delta(path: str, base_file: str, delta: Dict, item_count: int) -> str:
+    """Atomically write a delta file referring to its keyframe by file name."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'base': os.path.basename(base_file), 'count': item_count, **delta}, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_delta(path: str) -> Dict:
+    """Read a delta file; 'base' is resolved to a path in the same directory."""
+    with open(path, 'r', encoding='utf-8') as f:
+        delta = json.load(f)
+    delta['base'] = os.path.join(os.path.dirname(path), delta['base'])
+    return delta
+
+
+def diff_items(old: Dict[str, Dict], new: Dict[str, Dict],
+               names: Optional[Iterable[str]] = None) -> List[Dict]:
+    """
+    List items whose price or quantity differs between two snapshots.
+
+    Args:
+        old: Earlier snapshot keyed by market_hash_name
+        new: Later snapshot keyed by market_hash_name
+        names: Only compare these names (defaults to every name in either snapshot)
+
+    Returns:
+        Copies of the current items with a 'changes' dict of field -> [old, new].
+        Items that disappeared are returned as {'market_hash_name': ..., 'removed': True}.
+    """
+    if names is None:
+        names = list(new) + [name for name in old if name not in new]
+    changes = []
+    for name in names:
+        before, after = old.get(name), new.get(name)
+        if after is None:
+            if before is not None:
+                changes.append({'market_hash_name': name, 'removed': True})
+            continue
+        before = before or {}
+        fields = {key: [before.get(key), after.get(key)] for key in PRICE_FIELDS
+                  if before.get(key) != after.get(key)}
+        if fields:
+            changes.append(dict(after, changes=fields))
+    return changes
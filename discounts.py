@@ -0,0 +1,91 @@
+import heapq
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from columnar import ColumnarSnapshot
+from item_table import ItemTable
+
+NAN = float('nan')
+
+
+def price_columns(items: Sequence[Dict]) -> Tuple[Sequence[float], Sequence[float]]:
+    """
+    Get the (min_price, suggested_price) columns for a batch of items.
+
+    Columnar snapshots and item tables hand out their columns directly; lists
+    of dicts are converted once into float arrays with NaN for missing prices.
+    """
+    if isinstance(items, (ColumnarSnapshot, ItemTable)):
+        return items.column('min_price'), items.column('suggested_price')
+
+    current = array('d', (item.get('min_price') or NAN for item in items))
+    suggested = array('d', (item.get('suggested_price') or NAN for item in items))
+    return current, suggested
+
+
+def filter_discounts(current: Sequence[float], suggested: Sequence[float],
+                     min_discount_percent: float, min_price: float) -> List[Tuple[int, float]]:
+    """
+    Filter and score a batch of prices in a single pass.
+
+    Args:
+        current: Current (min) prices, NaN where missing
+        suggested: Suggested prices, NaN where missing
+        min_discount_percent: Minimum discount percentage to keep
+        min_price: Minimum current price to keep
+
+    Returns:
+        List of (row index, rounded discount percentage), in input order
+    """
+    # NaN fails every comparison, so missing prices drop out with the invalid ones
+    return [(i, round(discount, 2))
+            for i, (cur, sug) in enumerate(zip(current, suggested))
+            if cur > 0 and cur >= min_price and sug > 0
+            and (discount := (sug - cur) / sug * 100) >= min_discount_percent]
+
+
+def name_column(items: Sequence[Dict]) -> Sequence[Optional[str]]:
+    """Get the market_hash_name of every item, straight from the string table for columnar snapshots."""
+    if isinstance(items, ColumnarSnapshot):
+        return items.strings('market_hash_name')
+    if isinstance(items, ItemTable):
+        return items.names
+    return [item.get('market_hash_name') for item in items]
+
+
+def reference_column(names: Sequence[Optional[str]], stats: Dict[str, Dict], field: str) -> Sequence[float]:
+    """Look up a per-item statistic (e.g. median_7d) as a price column, NaN where unknown."""
+    missing = {}
+    return array('d', ((stats.get(name, missing).get(field) or NAN) for name in names))
+
+
+def _discount_key(hit: Tuple[int, float]) -> float:
+    return hit[1]
+
+
+def rank_discounts(hits: List[Tuple[int, float]], limit: Optional[int] = None) -> List[Tuple[int, float]]:
+    """Order hits highest discount first (partial selection instead of a full sort with a limit)."""
+    if limit is not None and limit < len(hits):
+        return heapq.nlargest(max(limit, 0), hits, key=_discount_key)
+    return sorted(hits, key=_discount_key, reverse=True)
+
+
+def item_discount(item: Dict) -> Optional[float]:
+    """Rounded discount of one item's min_price against its suggested_price, or None if invalid."""
+    cur = item.get('min_price') or NAN
+    sug = item.get('suggested_price') or NAN
+    if cur > 0 and sug > 0:
+        return round((sug - cur) / sug * 100, 2)
+    return None
+
+
+def iter_discounted(items: Iterable[Dict], min_discount_percent: float,
+                    min_price: float) -> Iterator[Dict]:
+    """Yield copies of discounted items one at a time, in input order."""
+    for item in items:
+        cur = item.get('min_price') or NAN
+        sug = item.get('suggested_price') or NAN
+        if cur > 0 and cur >= min_price and sug > 0:
+            discount = (sug - cur) / sug * 100
+            if discount >= min_discount_percent:
+                yield dict(item, discount_percent=round(discount, 2))
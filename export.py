@@ -0,0 +1,57 @@
+import csv
+import itertools
+import json
+import sys
+from typing import Dict, Iterable, Optional, Sequence, TextIO
+
+FORMATS = ("ndjson", "csv")
+
+# CSV columns per kind of row (NDJSON rows keep every field)
+ITEM_FIELDS = ("market_hash_name", "currency", "suggested_price", "min_price", "max_price", "mean_price",
+               "median_price", "quantity", "item_page", "market_page", "created_at", "updated_at")
+DISCOUNT_FIELDS = ("market_hash_name", "currency", "min_price", "suggested_price", "discount_percent",
+                   "quantity", "median_7d", "low_30d", "volatility", "item_page")
+HISTORY_FIELDS = ("market_hash_name", "currency", "period", "min", "max", "avg", "median", "volume")
+SNAPSHOT_FIELDS = ("file", "time", "kind", "currency", "app_id", "count", "bytes", "base", "path")
+
+
+def write_rows(rows: Iterable[Dict], fields: Sequence[str], fmt: str = "ndjson",
+               stream: Optional[TextIO] = None, limit: Optional[int] = None) -> int:
+    """
+    Write rows one at a time as they are produced.
+
+    Each row is flushed as soon as it is written, so a consumer reading a
+    pipe sees results while the producer is still running.
+
+    Args:
+        rows: Dicts to write
+        fields: CSV columns (missing fields are left empty, others ignored)
+        fmt: "ndjson" (one JSON object per line) or "csv" (with a header row)
+        stream: Where to write (defaults to sys.stdout at the time of the call)
+        limit: Stop after this many rows
+
+    Returns:
+        Number of rows written
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    if stream is None:
+        stream = sys.stdout
+    if limit is not None:
+        rows = itertools.islice(rows, max(limit, 0))
+
+    if fmt == "csv":
+        writer = csv.DictWriter(stream, fieldnames=list(fields), extrasaction='ignore', lineterminator="\n")
+        writer.writeheader()
+        stream.flush()
+        write = writer.writerow
+    else:
+        def write(row: Dict):
+            stream.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    count = 0
+    for row in rows:
+        write(row)
+        stream.flush()
+        count += 1
+    return count
@@ -0,0 +1,420 @@
+import argparse
+import gzip
+import hashlib
+import json
+import random
+import threading
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from benchmark import generate_items
+from main import SkinportAPI
+from metrics import Metrics, render_prometheus
+
+ENCODINGS = ("auto", "br", "gzip", "deflate", "none")
+SALES_PERIODS = (("last_24_hours", 1), ("last_7_days", 7), ("last_30_days", 30), ("last_90_days", 90))
+# Bytes written per bandwidth-throttled chunk
+CHUNK_SIZE = 16384
+
+
+@dataclass
+class FakeServerConfig:
+    """
+    How the fake server behaves. Rates are probabilities per request.
+
+    etag is "on" (validators sent and honoured with 304s), "ignore" (sent
+    but never honoured) or "off". rate_limit is (requests, seconds) per
+    endpoint; requests over it get a 429 with Retry-After.
+    """
+    latency: float = 0.0
+    jitter: float = 0.0
+    bandwidth: Optional[float] = None
+    compression: str = "auto"
+    etag: str = "on"
+    rate_limit: Optional[Tuple[int, float]] = None
+    error_rate: float = 0.0
+    error_statuses: Tuple[int, ...] = (500, 502, 503)
+    retry_after: Optional[float] = None
+    truncate_rate: float = 0.0
+    seed: Optional[int] = None
+    _random: Optional[random.Random] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.compression not in ENCODINGS:
+            raise ValueError(f"Unknown compression: {self.compression}")
+        if self.compression == "br" and brotli is None:
+            raise ValueError("br compression needs the brotli package")
+        if self.etag not in ("on", "ignore", "off"):
+            raise ValueError(f"Unknown ETag mode: {self.etag}")
+        self._random = random.Random(self.seed)
+
+
+class _Body:
+    """One response body with its validators and lazily compressed variants."""
+
+    def __init__(self, data: bytes, modified: float):
+        self.data = data
+        self.etag = '"' + hashlib.sha1(data).hexdigest()[:20] + '"'
+        self.last_modified = formatdate(modified, usegmt=True)
+        self._encoded: Dict[str, bytes] = {'identity': data}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: str) -> bytes:
+        with self._lock:
+            body = self._encoded.get(encoding)
+            if body is None:
+                if encoding == "br":
+                    body = brotli.compress(self.data)
+                elif encoding == "gzip":
+                    body = gzip.compress(self.data, mtime=0)
+                else:
+                    body = zlib.compress(self.data)
+                self._encoded[encoding] = body
+            return body
+
+
+class SnapshotReplay:
+    """
+    Items served by the fake server, replayed from saved responses.
+
+    Snapshots are grouped by market. With advance set, the server moves to
+    the next snapshot (oldest first, wrapping around) every advance seconds;
+    otherwise it serves each market's latest snapshot.
+    """
+
+    def __init__(self, data_dir: str = "saved_responses", synthetic: int = 0, advance: float = 0.0):
+        """
+        Args:
+            data_dir: Saved responses to replay
+            synthetic: Serve this many generated items if there are no saved responses
+            advance: Seconds between moving on to the next snapshot (0 serves the latest)
+        """
+        self.advance = advance
+        self.started = time.monotonic()
+        self.synthetic = synthetic
+        self._api = SkinportAPI(data_dir=data_dir)
+        self._markets: Dict[Tuple, List[Dict]] = {}
+        for entry in self._api.get_snapshot_catalog():
+            self._markets.setdefault((entry['currency'], entry['app_id']), []).append(entry)
+        for entries in self._markets.values():
+            entries.sort(key=lambda e: e['timestamp'])
+        if synthetic and not self._markets:
+            # One generated snapshot, in whatever currency is asked for
+            self._markets[(None, None)] = [{'path': None, 'timestamp': datetime.now().strftime("%Y%m%d_%H%M%S")}]
+        self._bodies: Dict[Tuple, Tuple[_Body, Dict[str, Dict]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._markets.values())
+
+    def _entries(self, currency: str, app_id: int) -> List[Dict]:
+        for market in ((currency, app_id), (None, None)):
+            if market in self._markets:
+                return self._markets[market]
+        return next(iter(self._markets.values()), [])
+
+    def current(self, currency: str, app_id: int) -> Optional[Tuple[_Body, Dict[str, Dict]]]:
+        """Get the /items body being served for a market, with its items by name."""
+        entries = self._entries(currency, app_id)
+        if not entries:
+            return None
+        if self.advance > 0:
+            entry = entries[int((time.monotonic() - self.started) / self.advance) % len(entries)]
+        else:
+            entry = entries[-1]
+        key = (entry['path'], currency)
+        with self._lock:
+            cached = self._bodies.get(key)
+            if cached is None:
+                if entry['path'] is None:
+                    items = generate_items(self.synthetic, currency=currency)
+                else:
+                    items = [dict(item) for item in self._api.get_items(use_local=True, local_file=entry['path'])]
+                modified = datetime.strptime(entry['timestamp'], "%Y%m%d_%H%M%S").timestamp()
+                body = _Body(json.dumps(items, separators=(',', ':')).encode('utf-8'), modified)
+                cached = self._bodies[key] = (body, {item['market_hash_name']: item for item in items})
+                # Keep only the snapshots currently being served
+                while len(self._bodies) > 2 * len(self._markets) + 2:
+                    self._bodies.pop(next(iter(self._bodies)))
+            return cached
+
+
+def sales_history(by_name: Dict[str, Dict], names: List[str], currency: str) -> List[Dict]:
+    """Make up plausible /sales/history entries from the items' listed prices."""
+    result = []
+    for name in names:
+        item = by_name.get(name)
+        if item is None:
+            continue
+        rng = random.Random(name)
+        base = item.get('median_price') or item.get('suggested_price') or item.get('min_price') or 1.0
+        entry = {'market_hash_name': name, 'currency': currency,
+                 'item_page': item.get('item_page'), 'market_page': item.get('market_page')}
+        for period, days in SALES_PERIODS:
+            volume = rng.randint(0, 5) * days
+            prices = sorted(round(base * rng.uniform(0.8, 1.2), 2) for _ in range(min(volume, 50)))
+            entry[period] = {
+                'min': prices[0] if prices else None,
+                'max': prices[-1] if prices else None,
+                'avg': round(sum(prices) / len(prices), 2) if prices else None,
+                'median': prices[len(prices) // 2] if prices else None,
+                'volume': volume,
+            }
+        result.append(entry)
+    return result
+
+
+class _Bucket:
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> float:
+        """Take a token; returns 0, or the seconds until one is available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class FakeSkinportServer:
+    """
+    Local stand-in for the Skinport API (/v1/items and /v1/sales/history).
+
+    Serves replayed snapshots with the configured latency, bandwidth,
+    compression, validators, rate limits and injected errors, and counts
+    what it served in metrics (exposed at /metrics).
+    """
+
+    def __init__(self, replay: SnapshotReplay, config: Optional[FakeServerConfig] = None,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.replay = replay
+        self.config = config or FakeServerConfig()
+        self.metrics = Metrics(enabled=True)
+        self._buckets: Dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to pass to SkinportAPI(base_url=...)."""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> 'FakeSkinportServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _throttle(self, endpoint: str) -> float:
+        if self.config.rate_limit is None:
+            return 0.0
+        with self._lock:
+            bucket = self._buckets.get(endpoint)
+            if bucket is None:
+                bucket = self._buckets[endpoint] = _Bucket(*self.config.rate_limit)
+            return bucket.take()
+
+    def _chance(self, rate: float) -> bool:
+        with self._lock:
+            return rate > 0 and self.config._random.random() < rate
+
+    def _delay(self) -> float:
+        if not self.config.jitter:
+            return self.config.latency
+        with self._lock:
+            return self.config.latency + self.config._random.uniform(0, self.config.jitter)
+
+    def _handler(self):
+        server = self
+        config = self.config
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/metrics":
+                    self._send(200, render_prometheus(server.metrics.snapshot(), prefix="fake_skinport").encode(),
+                               {'Content-Type': 'text/plain; version=0.0.4'}, "/metrics")
+                    return
+                endpoint = url.path[len("/v1"):] if url.path.startswith("/v1/") else url.path
+                if endpoint not in ("/items", "/sales/history"):
+                    self._send(404, b'{"errors":[{"id":"not_found"}]}', {}, endpoint)
+                    return
+
+                delay = server._delay()
+                if delay > 0:
+                    time.sleep(delay)
+                wait = server._throttle(endpoint)
+                if wait:
+                    self._send(429, b'{"errors":[{"id":"rate_limit_exceeded"}]}',
+                               {'Retry-After': str(max(1, round(wait)))}, endpoint)
+                    return
+                if server._chance(config.error_rate):
+                    with server._lock:
+                        status = config._random.choice(config.error_statuses)
+                    headers = {'Retry-After': f"{config.retry_after:g}"} if config.retry_after is not None else {}
+                    self._send(status, b'{"errors":[{"id":"injected_error"}]}', headers, endpoint)
+                    return
+
+                query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+                currency = query.get('currency', 'EUR')
+                try:
+                    app_id = int(query.get('app_id', 730))
+                except ValueError:
+                    self._send(400, b'{"errors":[{"id":"validation_error"}]}', {}, endpoint)
+                    return
+                current = server.replay.current(currency, app_id)
+                if current is None:
+                    self._send(503, b'{"errors":[{"id":"no_snapshots"}]}', {}, endpoint)
+                    return
+                body, by_name = current
+                if endpoint == "/sales/history":
+                    names = [name for name in query.get('market_hash_name', '').split(",") if name]
+                    data = json.dumps(sales_history(by_name, names, currency), separators=(',', ':')).encode()
+                    self._send_body(data, {}, endpoint)
+                    return
+
+                headers = {}
+                if config.etag != "off":
+                    headers = {'ETag': body.etag, 'Last-Modified': body.last_modified}
+                    # If-None-Match wins over If-Modified-Since when both are sent
+                    if_none_match = self.headers.get('If-None-Match')
+                    fresh = (if_none_match == body.etag if if_none_match is not None
+                             else self.headers.get('If-Modified-Since') == body.last_modified)
+                    if config.etag == "on" and fresh:
+                        self._send(304, b"", headers, endpoint)
+                        return
+                self._send_body(body, headers, endpoint)
+
+            def _encoding(self) -> str:
+                accepted = [part.split(";")[0].strip() for part in self.headers.get('Accept-Encoding', '').split(",")]
+                if config.compression == "none":
+                    return "identity"
+                if config.compression != "auto":
+                    return config.compression if config.compression in accepted else "identity"
+                for encoding in ("br", "gzip", "deflate"):
+                    if encoding in accepted and (encoding != "br" or brotli is not None):
+                        return encoding
+                return "identity"
+
+            def _send_body(self, body, headers: Dict[str, str], endpoint: str):
+                encoding = self._encoding()
+                if isinstance(body, bytes):
+                    body = _Body(body, time.time())
+                data = body.encoded(encoding)
+                headers = dict(headers, **{'Content-Type': 'application/json; charset=utf-8'})
+                if encoding != "identity":
+                    headers['Content-Encoding'] = encoding
+                server.metrics.count('payload_bytes', len(body.data), endpoint=endpoint)
+                self._send(200, data, headers, endpoint)
+
+            def _send(self, status: int, data: bytes, headers: Dict[str, str], endpoint: str):
+                truncate = status == 200 and server._chance(config.truncate_rate)
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(data)))
+                if truncate:
+                    self.send_header('Connection', 'close')
+                self.end_headers()
+                server.metrics.count('responses', endpoint=endpoint, status=status)
+                if truncate:
+                    # Promise the whole body but hang up halfway through it
+                    data = data[:len(data) // 2]
+                    self.close_connection = True
+                    server.metrics.count('truncated', endpoint=endpoint)
+                self._write(data)
+                server.metrics.count('wire_bytes', len(data), endpoint=endpoint)
+
+            def _write(self, data: bytes):
+                if not config.bandwidth:
+                    self.wfile.write(data)
+                    return
+                for start in range(0, len(data), CHUNK_SIZE):
+                    chunk = data[start:start + CHUNK_SIZE]
+                    self.wfile.write(chunk)
+                    time.sleep(len(chunk) / config.bandwidth)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _rate_limit(text: str) -> Tuple[int, float]:
+    count, _, seconds = text.partition("/")
+    return int(count), float(seconds or 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve saved responses as a local stand-in for the Skinport API")
+    parser.add_argument("--data-dir", default="saved_responses", help="Saved responses to replay")
+    parser.add_argument("--synthetic", type=int, default=0, metavar="COUNT",
+                        help="Serve COUNT generated items when there are no saved responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--advance", type=float, default=0.0, metavar="SECONDS",
+                        help="Move to the next snapshot every SECONDS (default: always serve the latest)")
+    parser.add_argument("--latency", type=float, default=0.0, metavar="SECONDS", help="Delay before responding")
+    parser.add_argument("--jitter", type=float, default=0.0, metavar="SECONDS",
+                        help="Extra random delay of up to SECONDS")
+    parser.add_argument("--bandwidth", type=float, metavar="BYTES_PER_SECOND", help="Throttle response bodies")
+    parser.add_argument("--compression", choices=ENCODINGS, default="auto",
+                        help="Content-Encoding for clients that accept it (default: auto)")
+    parser.add_argument("--etag", choices=("on", "ignore", "off"), default="on",
+                        help="Send ETag/Last-Modified and answer revalidations with 304 (default: on)")
+    parser.add_argument("--rate-limit", type=_rate_limit, metavar="COUNT/SECONDS",
+                        help="Requests allowed per endpoint, e.g. 8/300 like Skinport (default: unlimited)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with an error")
+    parser.add_argument("--error-status", type=lambda text: tuple(int(s) for s in text.split(",")),
+                        default=(500, 502, 503), metavar="CODES", help="Injected error statuses (default: 500,502,503)")
+    parser.add_argument("--retry-after", type=float, metavar="SECONDS", help="Retry-After sent with injected errors")
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="Fraction of responses cut off halfway through the body")
+    parser.add_argument("--seed", type=int, help="Random seed for jitter and injected failures")
+    args = parser.parse_args()
+
+    config = FakeServerConfig(latency=args.latency, jitter=args.jitter, bandwidth=args.bandwidth,
+                              compression=args.compression, etag=args.etag, rate_limit=args.rate_limit,
+                              error_rate=args.error_rate, error_statuses=args.error_status,
+                              retry_after=args.retry_after, truncate_rate=args.truncate_rate, seed=args.seed)
+    replay = SnapshotReplay(args.data_dir, synthetic=args.synthetic, advance=args.advance)
+    if not len(replay):
+        parser.error(f"No saved responses in {args.data_dir} (use --synthetic COUNT to generate items)")
+    server = FakeSkinportServer(replay, config, args.host, args.port)
+    print(f"Serving {len(replay)} snapshots at {server.url} (metrics at {server.url.rsplit('/v1', 1)[0]}/metrics)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
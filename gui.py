@@ -1,13 +1,32 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 from main import SkinportAPI
+from catalog import parse_retention
+from item_table import CATEGORIES, QUALITIES, WEARS
+from metrics import Metrics, format_summary
 from dotenv import load_dotenv
 import os
 import threading
+import time
 from datetime import datetime
-from typing import Optional
 
 class SkinportGUI:
+    # Rows inserted per event-loop turn when filling the results table
+    RESULT_CHUNK_SIZE = 300
+    # Score modes offered in the dropdown, by label
+    SCORE_MODES = {"Suggested price": "suggested", "7-day median": "median_7d", "30-day low": "low_30d"}
+    # Phases shown in the status bar stats panel
+    STATS_PHASES = ("fetch", "decode", "persist", "load", "filter", "sort", "render")
+    # Milliseconds of typing pause before name suggestions refresh
+    SUGGEST_DELAY = 150
+    # Milliseconds of typing pause before the loaded results are re-filtered
+    FILTER_DELAY = 200
+    SUGGESTION_COUNT = 10
+    # Facet dropdowns: (label, facet, fixed values; weapons come from the loaded items)
+    FACET_FILTERS = (("Wear:", "wear", WEARS), ("Quality:", "quality", QUALITIES),
+                     ("Type:", "category", CATEGORIES), ("Weapon:", "weapon", ()))
+    ANY = "Any"
+    
     def __init__(self, root):
         self.root = root
         self.root.title("Skinport Discount Checker")
@@ -17,7 +36,9 @@ class SkinportGUI:
         load_dotenv()
         client_id = os.getenv('SKINPORT_CLIENT_ID')
         client_secret = os.getenv('SKINPORT_CLIENT_SECRET')
-        self.api = SkinportAPI(client_id, client_secret)
+        self.api = SkinportAPI(client_id, client_secret, metrics=Metrics(enabled=True),
+                               base_url=os.getenv('SKINPORT_BASE_URL'),
+                               retention=parse_retention(os.getenv('SKINPORT_RETENTION')))
         
         # Create main frame
         self.main_frame = ttk.Frame(root, padding="10")
@@ -47,7 +68,7 @@ class SkinportGUI:
         
         # Refresh button for saved responses
         self.refresh_button = ttk.Button(self.source_frame, text="↻", width=3, 
-                                       command=self._update_saved_responses)
+                                       command=lambda: self._update_saved_responses(rescan=True))
         self.refresh_button.grid(row=0, column=5, padx=5)
         
         # Initialize saved responses list
@@ -77,17 +98,77 @@ class SkinportGUI:
         self.currency_dropdown = ttk.Combobox(self.filter_frame, textvariable=self.currency, values=currencies, width=10)
         self.currency_dropdown.grid(row=0, column=5, padx=5)
         
+        # What the discount is measured against
+        ttk.Label(self.filter_frame, text="Discount vs:").grid(row=1, column=0, padx=5, pady=(5, 0))
+        self.score_mode = tk.StringVar(value="Suggested price")
+        self.score_dropdown = ttk.Combobox(self.filter_frame, textvariable=self.score_mode,
+                                           values=list(self.SCORE_MODES), state='readonly', width=15)
+        self.score_dropdown.grid(row=1, column=1, columnspan=2, sticky=tk.W, padx=5, pady=(5, 0))
+        
+        # Name filter, with suggestions from the last searched items
+        ttk.Label(self.filter_frame, text="Name:").grid(row=1, column=3, padx=5, pady=(5, 0))
+        self.name_query = tk.StringVar()
+        self.name_entry = ttk.Combobox(self.filter_frame, textvariable=self.name_query, width=30)
+        self.name_entry.grid(row=1, column=4, columnspan=3, sticky=(tk.W, tk.E), padx=5, pady=(5, 0))
+        self.name_entry.bind("<KeyRelease>", self._schedule_suggestions)
+        self.name_entry.bind("<Return>", lambda event: self.search_discounts())
+        self._name_index = None
+        self._suggest_id = None
+        
+        # Facet filters parsed from the item names
+        self.facet_vars = {}
+        self.facet_dropdowns = {}
+        for column, (label, facet, values) in enumerate(self.FACET_FILTERS):
+            ttk.Label(self.filter_frame, text=label).grid(row=2, column=2 * column, padx=5, pady=(5, 0))
+            var = tk.StringVar(value=self.ANY)
+            dropdown = ttk.Combobox(self.filter_frame, textvariable=var, values=[self.ANY, *values],
+                                    state='readonly', width=14)
+            dropdown.grid(row=2, column=2 * column + 1, sticky=tk.W, padx=5, pady=(5, 0))
+            self.facet_vars[facet] = var
+            self.facet_dropdowns[facet] = dropdown
+        
+        # Items from the last search, re-filtered as the filters change:
+        # ((currency, use_local, local_file), items)
+        self._loaded = None
+        # Filters behind the results on screen
+        self._filter_params = None
+        self._filter_generation = 0
+        self._refilter_id = None
+        for var in (self.min_discount, self.min_price, self.score_mode, self.name_query,
+                    *self.facet_vars.values()):
+            var.trace_add('write', self._schedule_refilter)
+        
         # Search button
         self.search_button = ttk.Button(self.filter_frame, text="Search Discounts", command=self.search_discounts)
         self.search_button.grid(row=0, column=6, padx=10)
         
+        # Enrich button fills in sales history for the selected rows
+        self.enrich_button = ttk.Button(self.filter_frame, text="Enrich Selected", command=self.enrich_selected)
+        self.enrich_button.grid(row=0, column=7, padx=5)
+        
+        # Scored results as (item, formatted row values), in display order
+        self._results = []
+        self._results_currency = "EUR"
+        # 7-day sales stats per (currency, name): (median, volume)
+        self._enrichment = {}
+        self._render_id = 0
+        self._render_started = 0.0
+        self._sort_column = None
+        self._sort_reverse = False
+        
         # Results treeview
         self.create_treeview()
         
         # Status bar
         self.status_var = tk.StringVar()
         self.status_bar = ttk.Label(self.main_frame, textvariable=self.status_var, relief=tk.SUNKEN)
-        self.status_bar.grid(row=2, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        self.status_bar.grid(row=2, column=0, sticky=(tk.W, tk.E))
+        
+        # Stats panel: last timing per phase (click for all counters)
+        self.stats_var = tk.StringVar()
+        self.stats_label = ttk.Label(self.main_frame, textvariable=self.stats_var, relief=tk.SUNKEN)
+        self.stats_label.grid(row=2, column=1, sticky=(tk.W, tk.E))
+        self.stats_label.bind("<Button-1>", lambda event: self.show_stats())
         
         # Configure grid weights
         self.root.columnconfigure(0, weight=1)
@@ -100,19 +181,22 @@ class SkinportGUI:
         self.tree_frame = ttk.Frame(self.main_frame)
         self.tree_frame.grid(row=1, column=0, columnspan=2, sticky=(tk.W, tk.E, tk.N, tk.S))
         
-        self.tree = ttk.Treeview(self.tree_frame, columns=("name", "current", "suggested", "discount"), show="headings")
+        self.tree = ttk.Treeview(self.tree_frame, columns=("name", "current", "suggested", "discount", "median_7d", "volume_7d"),
+                                 show="headings")
         
-        # Define columns
-        self.tree.heading("name", text="Item Name")
-        self.tree.heading("current", text="Current Price")
-        self.tree.heading("suggested", text="Suggested Price")
-        self.tree.heading("discount", text="Discount %")
+        # Define columns (click a heading to sort)
+        headings = [("name", "Item Name"), ("current", "Current Price"), ("suggested", "Suggested Price"),
+                    ("discount", "Discount %"), ("median_7d", "7d Median"), ("volume_7d", "7d Sales")]
+        for column, text in headings:
+            self.tree.heading(column, text=text, command=lambda c=column: self.sort_results(c))
         
         # Configure column widths
         self.tree.column("name", width=300)
         self.tree.column("current", width=100)
         self.tree.column("suggested", width=100)
         self.tree.column("discount", width=100)
+        self.tree.column("median_7d", width=100)
+        self.tree.column("volume_7d", width=80)
         
         # Add scrollbar
         scrollbar = ttk.Scrollbar(self.tree_frame, orient=tk.VERTICAL, command=self.tree.yview)
@@ -135,19 +219,8 @@ class SkinportGUI:
         symbol = currency_symbols.get(currency, currency)
         return f"{symbol}{amount:.2f}"
         
-    def search_discounts(self):
-        # Clear previous results
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-            
-        try:
-            min_discount = float(self.min_discount.get())
-            min_price = float(self.min_price.get())
-        except ValueError:
-            messagebox.showerror("Error", "Please enter valid numbers for minimum discount and price")
-            return
-            
-        # Get data source settings
+    def _selected_source(self):
+        """Get the (currency, use_local, local_file) the next search loads from."""
         use_local = self.data_source.get() == "local"
         local_file = None
         if use_local and self.saved_response_var.get() != "No saved responses":
@@ -155,55 +228,285 @@ class SkinportGUI:
             selected = self.saved_response_var.get()
             filename = selected.split('(')[1].rstrip(')')
             local_file = os.path.join(self.api.data_dir, filename)
+        return self.currency.get(), use_local, local_file
+        
+    def _selected_filters(self):
+        """Get the (min_discount, min_price, score, name_query, facets) filters; raises ValueError."""
+        facets = tuple((facet, var.get()) for facet, var in self.facet_vars.items() if var.get() != self.ANY)
+        return (float(self.min_discount.get()), float(self.min_price.get()),
+                self.SCORE_MODES[self.score_mode.get()], self.name_query.get(), facets)
+        
+    def search_discounts(self):
+        try:
+            filters = self._selected_filters()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter valid numbers for minimum discount and price")
+            return
+            
+        # Get data source settings
+        source = self._selected_source()
+            
+        # Clear previous results (and stop any render or re-filter still in progress)
+        self._render_id += 1
+        self._filter_generation += 1
+        self.tree.delete(*self.tree.get_children())
             
         self.search_button.configure(state='disabled')
         self.status_var.set("Searching for discounted items...")
         
         # Run search in separate thread
-        thread = threading.Thread(target=lambda: self._search_thread(use_local, local_file))
+        thread = threading.Thread(target=lambda: self._search_thread(source, filters))
         thread.daemon = True
         thread.start()
         
-    def _search_thread(self, use_local: bool, local_file: Optional[str]):
+    def _search_thread(self, source, filters):
+        currency, use_local, local_file = source
         try:
-            items = self.api.get_discounted_items(
-                min_discount_percent=float(self.min_discount.get()),
-                currency=self.currency.get(),
-                min_price=float(self.min_price.get()),
-                use_local=use_local,
-                local_file=local_file
-            )
+            # The item table is kept for re-filtering, so facets are parsed once per search
+            all_items = self.api.get_items(currency=currency, use_local=use_local, local_file=local_file,
+                                           as_table=True)
+            # Built (or reused) here so suggestions come from the items just searched
+            self._name_index = self.api.get_name_index(all_items)
+            weapons = sorted(value for value in all_items.facet_counts('weapon') if value)
+            self.root.after(0, self._update_weapons, weapons)
+            rows = self._filter_rows(all_items, currency, filters)
             
             # Update UI in main thread
-            self.root.after(0, self._update_results, items)
+            self.root.after(0, self._update_results, rows, currency, (source, all_items), filters)
             
         except Exception as e:
             self.root.after(0, self._show_error, str(e))
             
-    def _update_results(self, items):
-        for item in items:
-            self.tree.insert("", tk.END, values=(
-                item['market_hash_name'],
-                self.format_currency(item['min_price'], self.currency.get()),
-                self.format_currency(item['suggested_price'], self.currency.get()),
-                f"{item['discount_percent']:.1f}%"
-            ))
+    def _filter_rows(self, items, currency: str, filters):
+        """Filter loaded items and format every row once, off the UI thread."""
+        min_discount, min_price, score, name_query, facets = filters
+        discounted = self.api.get_discounted_items(
+            min_discount_percent=min_discount,
+            currency=currency,
+            min_price=min_price,
+            items=items,
+            score=score,
+            name_query=name_query,
+            facets={facet: [value] for facet, value in facets}
+        )
+        return [(item, self._format_row(item, currency)) for item in discounted]
+        
+    def _update_weapons(self, weapons):
+        """Offer the weapons of the loaded items in the Weapon dropdown."""
+        self.facet_dropdowns['weapon']['values'] = [self.ANY, *weapons]
+        
+    def _schedule_refilter(self, *args):
+        """Re-filter the loaded results once typing pauses."""
+        if self._refilter_id is not None:
+            self.root.after_cancel(self._refilter_id)
+        self._refilter_id = self.root.after(self.FILTER_DELAY, self._refilter)
+        
+    def _refilter(self):
+        self._refilter_id = None
+        # Only results already on screen are re-filtered; a new source needs a search
+        if self._loaded is None or str(self.search_button['state']) == 'disabled':
+            return
+        source, items = self._loaded
+        if source != self._selected_source():
+            return
+        try:
+            filters = self._selected_filters()
+        except ValueError:
+            return  # Still typing a number
+        if filters == self._filter_params:
+            return
             
+        self._filter_generation += 1
+        generation = self._filter_generation
+        currency = source[0]
+        
+        def work():
+            try:
+                rows = self._filter_rows(items, currency, filters)
+                self.root.after(0, self._show_filtered, generation, rows, currency, filters)
+            except Exception as e:
+                self.root.after(0, self.status_var.set, f"Error filtering results: {str(e)}")
+                
+        thread = threading.Thread(target=work)
+        thread.daemon = True
+        thread.start()
+        
+    def _show_filtered(self, generation: int, rows, currency: str, filters):
+        if generation != self._filter_generation:
+            return  # Superseded by a newer filter or search
+        self._results = rows
+        self._results_currency = currency
+        self._filter_params = filters
+        self._sort_column = None
+        self._render(f"Found {len(rows)} items with discounts (filters updated)")
+            
+    def _schedule_suggestions(self, event=None):
+        """Refresh the name suggestions once typing pauses."""
+        if event is not None and event.keysym in ("Return", "Up", "Down", "Escape"):
+            return
+        if self._suggest_id is not None:
+            self.root.after_cancel(self._suggest_id)
+        self._suggest_id = self.root.after(self.SUGGEST_DELAY, self._update_suggestions)
+        
+    def _update_suggestions(self):
+        self._suggest_id = None
+        if self._name_index is None:
+            return
+        self.name_entry['values'] = self._name_index.search(self.name_query.get(), self.SUGGESTION_COUNT)
+        
+    def _format_row(self, item, currency: str):
+        # History-based scores don't need a suggested price, so it may be missing
+        suggested = item.get('suggested_price')
+        return (
+            item['market_hash_name'],
+            self.format_currency(item['min_price'], currency),
+            self.format_currency(suggested, currency) if suggested is not None else "-",
+            f"{item['discount_percent']:.1f}%"
+        )
+        
+    def _enrichment_values(self, name: str, currency: str):
+        stats = self._enrichment.get((currency, name))
+        if stats is None:
+            return ("", "")
+        median, volume = stats
+        return (self.format_currency(median, currency) if median is not None else "-", volume)
+        
+    def _update_results(self, rows, currency: str, loaded=None, filters=None):
+        self._results = rows
+        self._results_currency = currency
+        self._loaded = loaded
+        self._filter_params = filters
+        self._sort_column = None
         self.search_button.configure(state='normal')
-        self.status_var.set(f"Found {len(items)} items with discounts. Last updated: {datetime.now().strftime('%H:%M:%S')}")
+        self._render(f"Found {len(rows)} items with discounts. Last updated: {datetime.now().strftime('%H:%M:%S')}")
+        # Catch up with filters edited while the search was running
+        self._schedule_refilter()
+        
+    def _render(self, done_message: str):
+        """Fill the table in chunks so the window stays responsive."""
+        self._render_id += 1
+        self._render_started = time.perf_counter()
+        self.tree.delete(*self.tree.get_children())
+        self._insert_chunk(self._render_id, 0, done_message)
+        
+    def _insert_chunk(self, render_id: int, start: int, done_message: str):
+        if render_id != self._render_id:
+            return  # A newer search or sort replaced these results
+        rows = self._results
+        currency = self._results_currency
+        end = min(start + self.RESULT_CHUNK_SIZE, len(rows))
+        for item, values in rows[start:end]:
+            self.tree.insert("", tk.END, values=values + self._enrichment_values(item['market_hash_name'], currency))
+            
+        if end < len(rows):
+            self.status_var.set(f"Loading results... {end}/{len(rows)}")
+            self.root.after(1, self._insert_chunk, render_id, end, done_message)
+        else:
+            self.status_var.set(done_message)
+            self.api.metrics.observe('render', time.perf_counter() - self._render_started)
+            self._update_stats()
+            
+    def _update_stats(self):
+        """Show the latest duration of each phase in the status bar."""
+        phases = self.api.metrics.snapshot()['phases']
+        parts = [f"{phase} {phases[phase]['last'] * 1000:.0f}ms" for phase in self.STATS_PHASES if phase in phases]
+        self.stats_var.set(" | ".join(parts))
+        
+    def show_stats(self):
+        """Show all timings and counters in a dialog."""
+        messagebox.showinfo("Stats", format_summary(self.api.get_metrics()))
+        
+    def sort_results(self, column: str):
+        """Sort the current results by a column, off the UI thread."""
+        if not self._results:
+            return
+        reverse = not self._sort_reverse if self._sort_column == column else column != "name"
+        self._sort_column, self._sort_reverse = column, reverse
+        self.status_var.set("Sorting results...")
+        
+        rows, currency = self._results, self._results_currency
+        thread = threading.Thread(target=lambda: self._sort_thread(rows, currency, column, reverse))
+        thread.daemon = True
+        thread.start()
+        
+    def _sort_thread(self, rows, currency: str, column: str, reverse: bool):
+        def enrichment(item, idx):
+            stats = self._enrichment.get((currency, item['market_hash_name']))
+            value = stats[idx] if stats else None
+            return value if value is not None else float('-inf')
+            
+        keys = {
+            "name": lambda row: row[0]['market_hash_name'].lower(),
+            "current": lambda row: row[0]['min_price'],
+            "suggested": lambda row: row[0]['suggested_price'] if row[0]['suggested_price'] is not None
+                                     else float('-inf'),
+            "discount": lambda row: row[0]['discount_percent'],
+            "median_7d": lambda row: enrichment(row[0], 0),
+            "volume_7d": lambda row: enrichment(row[0], 1),
+        }
+        with self.api.metrics.timer('sort'):
+            ordered = sorted(rows, key=keys[column], reverse=reverse)
+        self.root.after(0, self._show_sorted, rows, ordered, column, reverse)
+        
+    def _show_sorted(self, rows, ordered, column: str, reverse: bool):
+        if rows is not self._results:
+            return  # Results changed while sorting
+        self._results = ordered
+        direction = "descending" if reverse else "ascending"
+        self._render(f"Showing {len(ordered)} items sorted by {self.tree.heading(column, 'text')} ({direction})")
+        
+    def enrich_selected(self):
+        """Fetch sales history for the selected rows in one bulk request."""
+        rows = {self.tree.set(row, "name"): row for row in self.tree.selection()}
+        if not rows:
+            messagebox.showinfo("Enrich Selected", "Select one or more items first")
+            return
+            
+        self.enrich_button.configure(state='disabled')
+        self.status_var.set(f"Fetching sales history for {len(rows)} items...")
+        
+        thread = threading.Thread(target=lambda: self._enrich_thread(rows, self.currency.get()))
+        thread.daemon = True
+        thread.start()
+        
+    def _enrich_thread(self, rows, currency: str):
+        try:
+            history = self.api.get_sales_history_many(list(rows), currency=currency)
+            self.root.after(0, self._update_enriched, rows, history, currency)
+        except Exception as e:
+            self.root.after(0, self._show_enrich_error, str(e))
+            
+    def _update_enriched(self, rows, history, currency: str):
+        for name, row in rows.items():
+            stats = (history.get(name) or {}).get("last_7_days") or {}
+            self._enrichment[(currency, name)] = (stats.get("median"), stats.get("volume") or 0)
+            if not self.tree.exists(row):
+                continue
+            median, volume = self._enrichment_values(name, currency)
+            self.tree.set(row, "median_7d", median)
+            self.tree.set(row, "volume_7d", volume)
+            
+        self.enrich_button.configure(state='normal')
+        self.status_var.set(f"Added sales history for {len(rows)} items")
+        
+    def _show_enrich_error(self, error_message):
+        self.enrich_button.configure(state='normal')
+        self.status_var.set("Error occurred while fetching sales history")
+        messagebox.showerror("Error", f"Failed to fetch sales history: {error_message}")
         
     def _show_error(self, error_message):
         self.search_button.configure(state='normal')
         self.status_var.set("Error occurred during search")
         messagebox.showerror("Error", f"Failed to fetch items: {error_message}")
         
-    def _update_saved_responses(self):
+    def _update_saved_responses(self, rescan: bool = False):
         """Update the saved responses dropdown with available files."""
-        saved = self.api.get_saved_responses()
+        if rescan:
+            self.api.refresh_saved_responses()
+        saved = self.api.get_snapshot_catalog()
         if saved:
-            # Format the timestamps for display
-            options = [f"{datetime.strptime(ts, '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M:%S')} ({os.path.basename(f)})"
-                      for f, ts in saved]
+            # The catalog already has display-ready timestamps, newest first
+            options = [f"{entry['time']} ({entry['file']})" for entry in saved]
             self.saved_response_dropdown['values'] = options
             if not self.saved_response_var.get():
                 self.saved_response_var.set(options[0])  # Select most recent by default
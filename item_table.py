@@ -0,0 +1,220 @@
+import re
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from columnar import (FIELD_ORDER, FLOAT_COLUMNS, INT_COLUMNS, INT_MISSING, STRING_COLUMNS, ColumnarSnapshot,
+                      RowSequence, make_row)
+
+# Facets parsed from market_hash_name. Code 0 of every facet is its "none"
+# value: no wear, Normal quality, Other category, no weapon.
+FACETS = ("wear", "quality", "category", "weapon")
+WEARS = ("Factory New", "Minimal Wear", "Field-Tested", "Well-Worn", "Battle-Scarred")
+QUALITIES = ("Normal", "StatTrak™", "Souvenir")
+CATEGORIES = ("Other", "Weapon", "Knife", "Gloves", "Sticker", "Agent", "Container", "Key",
+              "Graffiti", "Patch", "Music Kit", "Pin", "Pass")
+# Fixed vocabularies; weapon codes are assigned per table as names are seen
+FACET_VALUES = {'wear': ("",) + WEARS, 'quality': QUALITIES, 'category': CATEGORIES}
+
+GUNS = frozenset((
+    "AK-47", "AUG", "AWP", "CZ75-Auto", "Desert Eagle", "Dual Berettas", "FAMAS", "Five-SeveN", "G3SG1",
+    "Galil AR", "Glock-18", "M249", "M4A1-S", "M4A4", "MAC-10", "MAG-7", "MP5-SD", "MP7", "MP9", "Negev",
+    "Nova", "P2000", "P250", "P90", "PP-Bizon", "R8 Revolver", "Sawed-Off", "SCAR-20", "SG 553", "SSG 08",
+    "Tec-9", "UMP-45", "USP-S", "XM1014", "Zeus x27"))
+AGENT_FACTIONS = frozenset((
+    "The Professionals", "Sabre", "Sabre Footsoldier", "Elite Crew", "Phoenix", "Guerrilla Warfare",
+    "FBI", "FBI SWAT", "FBI Sniper", "FBI HRT", "SWAT", "SEAL Frogman", "NSWC SEAL", "NZSAS", "KSK", "SAS",
+    "USAF TACP", "TACP Cavalry", "Brazilian 1st Battalion", "Gendarmerie Nationale"))
+# Item types named by the part before the first " | "
+PREFIX_CATEGORIES = {"Sticker": "Sticker", "Sealed Graffiti": "Graffiti", "Graffiti": "Graffiti",
+                     "Patch": "Patch", "Music Kit": "Music Kit"}
+# Item types named by how the name ends, checked in order
+SUFFIX_CATEGORIES = ((("Key",), "Key"), (("Case", "Capsule", "Package", "Pack", "Box"), "Container"),
+                     (("Pin",), "Pin"), (("Pass",), "Pass"))
+
+_WEAR = re.compile(r"\((" + "|".join(map(re.escape, WEARS)) + r")\)")
+_LABEL = re.compile(r"[^0-9a-z]+")
+
+
+@lru_cache(maxsize=1 << 16)
+def parse_facets(name: str) -> Tuple[str, str, str, str]:
+    """
+    Parse the facets of a market_hash_name.
+
+    "★ StatTrak™ Karambit | Doppler (Factory New)" gives
+    ("Factory New", "StatTrak™", "Knife", "Karambit").
+
+    Returns:
+        Tuple of (wear, quality, category, weapon); wear and weapon are ""
+        for items that have none
+    """
+    wear = _WEAR.search(name)
+    rest = name
+    starred = rest.startswith("★")
+    if starred:
+        rest = rest[1:].lstrip()
+    quality = "Normal"
+    for prefix in QUALITIES[1:]:
+        if rest.startswith(prefix + " "):
+            quality = prefix
+            rest = rest[len(prefix):].lstrip()
+            break
+    head, _, tail = rest.partition(" | ")
+    head = head.strip()
+
+    weapon = ""
+    if starred:
+        category = "Gloves" if head.endswith(("Gloves", "Hand Wraps")) else "Knife"
+        weapon = head
+    elif head in GUNS:
+        category, weapon = "Weapon", head
+    elif head in PREFIX_CATEGORIES:
+        category = PREFIX_CATEGORIES[head]
+    elif tail and tail.strip() in AGENT_FACTIONS:
+        category = "Agent"
+    else:
+        category = next((label for suffixes, label in SUFFIX_CATEGORIES if head.endswith(suffixes)), "Other")
+    return (wear.group(1) if wear else "", quality, category, weapon)
+
+
+def _normalize(label: str) -> str:
+    # "StatTrak™", "stattrak" and "STATTRAK" name the same value
+    return _LABEL.sub("", label.lower())
+
+
+def _bitmaps(codes: Sequence[int], count: int, size: int) -> List[int]:
+    """Build one bitset per code, with bit i set when row i has that code."""
+    bits = [bytearray((size + 7) // 8) for _ in range(count)]
+    for i, code in enumerate(codes):
+        bits[code][i >> 3] |= 1 << (i & 7)
+    return [int.from_bytes(raw, 'little') for raw in bits]
+
+
+_BYTE_BITS = [tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)]
+
+
+class ItemTable(RowSequence):
+    """
+    Compact, read-only table of items with precomputed facets.
+
+    Prices and counts are kept in typed arrays (NaN / -1 for missing values)
+    and strings are interned, so the same names and links are shared between
+    tables of different snapshots. Wear, quality, category and weapon are
+    parsed from each name once, stored as small integer codes and indexed as
+    bitsets, so facet filters are a few integer operations regardless of how
+    many items match.
+
+    Behaves like a list of item dicts (rows are materialized on access with
+    the /v1/items fields; other keys of the source items are not kept).
+    """
+
+    def __init__(self, items: Sequence[Dict]):
+        """
+        Args:
+            items: Items as returned by get_items (dicts or a columnar snapshot)
+        """
+        self._count = len(items)
+        self._columns: Dict[str, array] = {}
+        self._strings: Dict[str, List[Optional[str]]] = {}
+        if isinstance(items, ColumnarSnapshot):
+            for name in FLOAT_COLUMNS + INT_COLUMNS:
+                self._columns[name] = array('d' if name in FLOAT_COLUMNS else 'q', items.column(name))
+            for name in STRING_COLUMNS:
+                self._strings[name] = [value if value is None else sys.intern(value)
+                                       for value in items.strings(name)]
+        else:
+            for name in FLOAT_COLUMNS:
+                self._columns[name] = array('d', (float('nan') if item.get(name) is None else float(item[name])
+                                                  for item in items))
+            for name in INT_COLUMNS:
+                self._columns[name] = array('q', (INT_MISSING if item.get(name) is None else int(item[name])
+                                                  for item in items))
+            for name in STRING_COLUMNS:
+                self._strings[name] = [None if item.get(name) is None else sys.intern(str(item[name]))
+                                       for item in items]
+        self.names = self._strings['market_hash_name']
+        self._all_columns = {**self._columns, **self._strings}
+
+        # Facet codes per row, and a bitset of rows per code
+        self._values: Dict[str, List[str]] = {}
+        self._codes: Dict[str, array] = {}
+        self._bitmaps: Dict[str, List[int]] = {}
+        parsed = [parse_facets(name) if name else ("", "Normal", "Other", "") for name in self.names]
+        for position, facet in enumerate(FACETS):
+            if facet in FACET_VALUES:
+                values = list(FACET_VALUES[facet])
+                code_of = {value: code for code, value in enumerate(values)}
+            else:
+                values = [""]
+                code_of = {"": 0}
+                for facets in parsed:
+                    if facets[position] not in code_of:
+                        code_of[facets[position]] = len(values)
+                        values.append(facets[position])
+            codes = array('B' if len(values) <= 256 else 'H', (code_of[facets[position]] for facets in parsed))
+            self._values[facet] = values
+            self._codes[facet] = codes
+            self._bitmaps[facet] = _bitmaps(codes, len(values), self._count)
+        self.all = (1 << self._count) - 1
+
+    def column(self, name: str) -> array:
+        """Get a numeric column (NaN for missing floats, -1 for missing integers)."""
+        return self._columns[name]
+
+    def strings(self, name: str) -> List[Optional[str]]:
+        """Get a string column."""
+        return self._strings[name]
+
+    def facet(self, index: int, facet: str) -> str:
+        """Get one facet of a row (e.g. facet(0, "wear") -> "Field-Tested")."""
+        return self._values[facet][self._codes[facet][index]]
+
+    def facet_counts(self, facet: str) -> Dict[str, int]:
+        """Count the rows per value of a facet, leaving out values no row has."""
+        counts = {value: bin(bitmap).count("1")
+                  for value, bitmap in zip(self._values[facet], self._bitmaps[facet])}
+        return {value: count for value, count in counts.items() if count}
+
+    def select(self, facets: Mapping[str, Iterable[str]]) -> int:
+        """
+        Get the rows matching a facet combination as a bitset.
+
+        Values of one facet are OR-ed and facets are AND-ed, so
+        {"wear": ["Factory New", "Minimal Wear"], "quality": ["StatTrak"]}
+        selects StatTrak™ items in either wear. Values are matched ignoring
+        case and punctuation; values no row has match nothing.
+
+        Args:
+            facets: Allowed values per facet name (see FACETS)
+
+        Returns:
+            Bitset with bit i set for every matching row i
+        """
+        selected = self.all
+        for facet, wanted in facets.items():
+            if facet not in self._values:
+                raise ValueError(f"Unknown facet: {facet}")
+            wanted = {_normalize(value) for value in wanted}
+            mask = 0
+            for value, bitmap in zip(self._values[facet], self._bitmaps[facet]):
+                if _normalize(value) in wanted:
+                    mask |= bitmap
+            selected &= mask
+        return selected
+
+    def positions(self, bitset: int) -> List[int]:
+        """Get the row indexes of a bitset, in ascending order."""
+        result = []
+        for offset, byte in enumerate(bitset.to_bytes((self._count + 7) // 8, 'little')):
+            if byte:
+                base = offset << 3
+                result.extend(base + bit for bit in _BYTE_BITS[byte])
+        return result
+
+    def _row(self, i: int) -> Dict:
+        return make_row(FIELD_ORDER, self._all_columns, i)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(self._count):
+            yield self._row(i)
@@ -0,0 +1,197 @@
+import argparse
+import json
+import math
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, List, Optional, TextIO
+
+from main import SkinportAPI
+from metrics import Metrics
+from scheduler import RequestScheduler
+
+ENDPOINTS = ("items", "sales")
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentile(ordered: List[float], percent: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not ordered:
+        return 0.0
+    rank = max(1, math.ceil(percent / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def run_load(call: Callable[[], object], requests: Optional[int] = None, duration: Optional[float] = None,
+             concurrency: int = 4, progress: Optional[TextIO] = sys.stderr,
+             progress_interval: float = 5.0) -> Dict:
+    """
+    Call a client method from several threads and time every call.
+
+    Stops after requests calls or duration seconds, whichever comes first
+    (at least one of them must be set).
+
+    Args:
+        call: Client call to measure (e.g. lambda: api.get_items())
+        requests: Total number of calls
+        duration: Seconds to keep calling
+        concurrency: Threads calling at once
+        progress: Where to report progress (None for quiet)
+        progress_interval: Seconds between progress lines
+
+    Returns:
+        Dict with requests, errors (by exception type), elapsed seconds,
+        throughput per second and latency percentiles in milliseconds
+    """
+    if requests is None and duration is None:
+        raise ValueError("Set requests or duration")
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+    issued = 0
+    started = time.perf_counter()
+    deadline = started + duration if duration is not None else None
+    stop = threading.Event()
+
+    def worker():
+        nonlocal issued
+        while True:
+            with lock:
+                if (requests is not None and issued >= requests) or \
+                        (deadline is not None and time.perf_counter() >= deadline):
+                    return
+                issued += 1
+            start = time.perf_counter()
+            error = None
+            try:
+                call()
+            except Exception as e:
+                error = type(e).__name__
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if error:
+                    errors[error] = errors.get(error, 0) + 1
+
+    def report():
+        while not stop.wait(progress_interval):
+            with lock:
+                done, failed = len(latencies), sum(errors.values())
+            elapsed = time.perf_counter() - started
+            print(f"{done} requests ({failed} failed) in {elapsed:.0f}s, {done / elapsed:.1f}/s",
+                  file=progress, flush=True)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(concurrency, 1))]
+    if progress is not None:
+        threading.Thread(target=report, daemon=True).start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    stop.set()
+
+    elapsed = time.perf_counter() - started
+    ordered = sorted(latencies)
+    result = {
+        'requests': len(ordered),
+        'errors': errors,
+        'elapsed': round(elapsed, 3),
+        'throughput': round(len(ordered) / elapsed, 2) if elapsed else 0.0,
+        'latency_ms': {f"p{p}": round(percentile(ordered, p) * 1000, 2) for p in PERCENTILES},
+    }
+    result['latency_ms']['mean'] = round(sum(ordered) / len(ordered) * 1000, 2) if ordered else 0.0
+    result['latency_ms']['max'] = round(ordered[-1] * 1000, 2) if ordered else 0.0
+    return result
+
+
+def format_report(result: Dict) -> str:
+    """Human-readable load test summary."""
+    latency = result['latency_ms']
+    lines = [f"Requests:   {result['requests']:,} in {result['elapsed']:.1f}s ({result['throughput']:.1f}/s)",
+             "Latency:    " + "  ".join(f"{name} {value:.1f}ms" for name, value in latency.items())]
+    for error, count in sorted(result['errors'].items()):
+        lines.append(f"Errors:     {error}: {count:,}")
+    for name, value in sorted(result.get('counters', {}).items()):
+        series = value if isinstance(value, dict) else {"": value}
+        for label, sample in sorted(series.items()):
+            lines.append(f"{name}[{label}]: {sample:,}" if label else f"{name}: {sample:,}")
+    for endpoint, stats in sorted(result.get('scheduler', {}).items()):
+        lines.append(f"Scheduler {endpoint}: {stats['retries']} retries, {stats['throttled']} throttled, "
+                     f"max wait {stats['max_wait']:.2f}s")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure client throughput and latency against a Skinport stand-in")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", metavar="URL", help="API root of a running fake_server.py")
+    target.add_argument("--serve", action="store_true",
+                        help="Start a fake server in this process (shares the CPU with the client)")
+    parser.add_argument("--data-dir", default="saved_responses", help="Snapshots for --serve")
+    parser.add_argument("--synthetic", type=int, default=20000, metavar="COUNT",
+                        help="Items --serve generates when there are no saved responses (default: 20000)")
+    parser.add_argument("--endpoint", choices=ENDPOINTS, default="items")
+    parser.add_argument("--currency", default="EUR")
+    parser.add_argument("--app-id", type=int, default=730)
+    parser.add_argument("--requests", type=int, help="Total requests (default: 100 unless --duration is set)")
+    parser.add_argument("--duration", type=float, metavar="SECONDS", help="Run for SECONDS")
+    parser.add_argument("--concurrency", type=int, default=4, help="Concurrent client threads (default: 4)")
+    parser.add_argument("--batch", type=int, default=20, help="Names per sales history call (default: 20)")
+    parser.add_argument("--timeout", type=float, default=SkinportAPI.REQUEST_TIMEOUT,
+                        help="Client request timeout in seconds")
+    parser.add_argument("--client-rate", type=float, metavar="PER_SECOND",
+                        help="Client-side rate limit per endpoint (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=4, help="Client retries on 429/5xx (default: 4)")
+    parser.add_argument("--format", choices=("text", "ndjson"), default="text")
+    parser.add_argument("--quiet", action="store_true", help="Don't report progress")
+    args = parser.parse_args()
+
+    if args.base_url and args.base_url.rstrip("/") == SkinportAPI.BASE_URL:
+        parser.error("Refusing to load test the live Skinport API")
+
+    base_url = args.base_url
+    if args.serve:
+        from fake_server import FakeSkinportServer, SnapshotReplay
+        server = FakeSkinportServer(SnapshotReplay(args.data_dir, synthetic=args.synthetic)).start()
+        base_url = server.url
+
+    # Every call goes to the server: no response cache, and a rate limit only if asked for
+    rate = (1, 1.0 / args.client_rate) if args.client_rate else (10 ** 9, 1.0)
+    scheduler = RequestScheduler(limits={'/items': rate, '/sales/history': rate}, max_retries=args.max_retries)
+    with tempfile.TemporaryDirectory(prefix="skinport_load_") as data_dir:
+        api = SkinportAPI("load", "test", cache_ttl=0, scheduler=scheduler, data_dir=data_dir,
+                          metrics=Metrics(enabled=True), base_url=base_url, timeout=args.timeout)
+
+        if args.endpoint == "items":
+            def call():
+                return api.get_items(args.currency, args.app_id)
+        else:
+            api.sales_cache.ttl = 0
+            names = [item['market_hash_name'] for item in api.get_items(args.currency, args.app_id)]
+            api.metrics.reset()
+            if not names:
+                parser.error("The server returned no items to ask for sales history of")
+
+            def call():
+                return api.get_sales_history_many(random.sample(names, min(args.batch, len(names))),
+                                                  args.currency, args.app_id)
+
+        requests = args.requests if args.requests is not None or args.duration is not None else 100
+        result = run_load(call, requests, args.duration, args.concurrency,
+                          progress=None if args.quiet else sys.stderr)
+        api.flush_saves()
+        stats = api.get_metrics()
+    result['counters'] = {name: value for name, value in stats['counters'].items()
+                          if name in ('http_responses', 'http_errors')}
+    result['scheduler'] = stats['scheduler']
+
+    if args.format == "ndjson":
+        print(json.dumps(result))
+    else:
+        print(format_report(result))
+
+
+if __name__ == "__main__":
+    main()
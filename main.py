@@ -1,66 +1,636 @@
+import argparse
 import requests
+import sys
 import time
-import json
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 from dotenv import load_dotenv
 import os
 from datetime import datetime
-import glob
 import base64
+import gzip
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from export import (DISCOUNT_FIELDS, FORMATS, HISTORY_FIELDS, ITEM_FIELDS, SNAPSHOT_FIELDS,
+                    write_rows)
+from columnar import columnar_path, convert_json_snapshots, load_snapshot, write_snapshot
+from discounts import (filter_discounts, iter_discounted, name_column, price_columns, rank_discounts,
+                       reference_column)
+from name_index import NameIndex
+from item_table import FACETS, ItemTable
+from streaming import iter_json_array
+from sales_cache import SalesHistoryCache
+from scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+from metrics import Metrics, MetricsLogger, format_summary, serve_prometheus
+from price_history import PriceHistoryStore
+from rolling_stats import RollingStatsIndex
+from snapshot_cache import SnapshotCache, file_stamp
+from catalog import RetentionPolicy, SnapshotCatalog, companion_files, matches_market, parse_retention
+from snapshot_io import (COMPRESSED_EXTENSION, COMPRESSLEVEL, PART_EXTENSION, SnapshotWriter, open_snapshot,
+                         read_snapshot, snapshot_base, write_snapshot_json)
+from delta_store import (DELTA_EXTENSION, apply_delta, compute_delta, diff_items, index_by_name,
+                         read_delta, write_delta)
+
+class FetchResult(NamedTuple):
+    """Outcome of one (currency, app_id) fetch from get_items_many."""
+    currency: str
+    app_id: int
+    items: List[Dict]
+    error: Optional[Exception]
+    elapsed: float
+
 
 class SkinportAPI:
     BASE_URL = "https://api.skinport.com/v1"
+    # Seconds to wait for the server to connect or send data
+    REQUEST_TIMEOUT = 30
+    # Skinport caches /v1/items server-side for 5 minutes
+    CACHE_TTL = 300
+    SALES_CACHE_TTL = 3600
+    # Bulk /sales/history requests take comma-separated names; keep URLs short
+    MAX_NAMES_PER_REQUEST = 50
+    MAX_NAMES_QUERY_LENGTH = 4000
+    # Connections kept per host, enough for concurrent fan-out fetches
+    POOL_SIZE = 16
+    # Delta storage: write a full keyframe every N snapshots, or sooner when
+    # more than this fraction of the items changed
+    KEYFRAME_INTERVAL = 12
+    KEYFRAME_CHANGE_RATIO = 0.5
+    # Snapshots waiting for the background writer before get_items blocks
+    MAX_PENDING_SAVES = 4
+    # What get_discounted_items measures the discount against: Skinport's
+    # suggested price, or the item's own rolling history
+    SCORE_MODES = ("suggested", "median_7d", "low_30d")
+    # Loaded saved responses kept in memory for repeated searches
+    SNAPSHOT_CACHE_SIZE = 4
+    # Name search indexes kept for recently searched item lists
+    NAME_INDEX_CACHE_SIZE = 4
+    # Item tables kept for recently loaded item lists
+    ITEM_TABLE_CACHE_SIZE = 4
     
-    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None):
+    def __init__(self, client_id: Optional[str] = None, client_secret: Optional[str] = None,
+                 cache_ttl: float = CACHE_TTL, scheduler: Optional[RequestScheduler] = None,
+                 storage_mode: str = "full", retention: Optional[RetentionPolicy] = None,
+                 data_dir: str = "saved_responses", metrics: Optional[Metrics] = None,
+                 base_url: Optional[str] = None, timeout: float = REQUEST_TIMEOUT):
+        """
+        Args:
+            client_id: Skinport API client ID
+            client_secret: Skinport API client secret
+            cache_ttl: Seconds to serve live /items responses from memory
+            scheduler: Rate-limit scheduler to share between clients
+            storage_mode: "full" saves every response in full, "delta" saves
+                periodic keyframes plus per-item changes
+            retention: Policy applied after every save to thin out old
+                snapshots (if None, nothing is ever deleted)
+            data_dir: Directory for saved responses and caches
+            metrics: Phase timers and counters to record into (disabled by default)
+            base_url: API root to send requests to (e.g. a local fake server);
+                defaults to BASE_URL
+            timeout: Seconds to wait for the server to connect or send data
+        """
+        if storage_mode not in ("full", "delta"):
+            raise ValueError(f"Unknown storage mode: {storage_mode}")
         self.client_id = client_id
         self.client_secret = client_secret
-        self.data_dir = "saved_responses"
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.timeout = timeout
+        self.data_dir = data_dir
+        self.cache_ttl = cache_ttl
+        self.storage_mode = storage_mode
+        self.retention = retention
+        self._catalog: Optional[SnapshotCatalog] = None
+        # Keyframe that new deltas are written against per (currency, app_id):
+        # (path, items by name, deltas written)
+        self._keyframes: Dict[Tuple, Tuple[str, Dict[str, Dict], int]] = {}
+        self._price_history: Optional[PriceHistoryStore] = None
+        self._rolling_stats: Optional[RollingStatsIndex] = None
+        # Name search indexes keyed by the item names they were built from
+        self._name_indexes: "OrderedDict[Tuple, NameIndex]" = OrderedDict()
+        self._name_index_lock = threading.Lock()
+        # Item tables keyed by id() of the item list they were built from
+        # (the list is kept alongside, so the id stays valid)
+        self._item_tables: "OrderedDict[int, Tuple[Sequence[Dict], ItemTable]]" = OrderedDict()
+        self._item_table_lock = threading.Lock()
         
-        # Create data directory if it doesn't exist
-        if not os.path.exists(self.data_dir):
-            os.makedirs(self.data_dir)
+        # Live /items responses per (currency, app_id), with their validators
+        self._items_cache: Dict[Tuple[str, int], Dict] = {}
+        self._cache_lock = threading.Lock()
+        # Live /items requests in progress per (currency, app_id), shared by concurrent misses
+        self._items_inflight: Dict[Tuple[str, int], Future] = {}
+        # Saved responses already loaded, so re-filtering doesn't re-read them
+        self.snapshot_cache = SnapshotCache(self.SNAPSHOT_CACHE_SIZE)
+        # Saving touches the keyframe and catalog, so snapshots are written one at a time
+        self._save_lock = threading.Lock()
+        # Live responses are persisted off the request path
+        self.writer = SnapshotWriter(self._save_response, max_pending=self.MAX_PENDING_SAVES)
+        # Rate limiting shared by every thread using this client
+        self.scheduler = scheduler or RequestScheduler()
+        self.metrics = metrics or Metrics()
+        self.sales_cache = SalesHistoryCache(os.path.join(self.data_dir, "sales_history_cache.json"),
+                                             ttl=self.SALES_CACHE_TTL)
+        self.fetch_stats = {
+            'hits': 0,
+            'misses': 0,
+            'not_modified': 0,
+            'bytes_received': 0,
+            'bytes_saved': 0
+        }
+        
+        # The data directory and HTTP session are created on first use, so
+        # commands that only read saved responses start quickly
+        self._session: Optional[requests.Session] = None
+        self._session_lock = threading.Lock()
+        
+    @property
+    def session(self) -> requests.Session:
+        """HTTP session with the default headers and credentials, created on first use."""
+        with self._session_lock:
+            if self._session is None:
+                self._session = self._create_session()
+            return self._session
             
+    def _create_session(self) -> requests.Session:
         # Create authorization header
-        if client_id and client_secret:
-            credentials = f"{client_id}:{client_secret}"
+        if self.client_id and self.client_secret:
+            credentials = f"{self.client_id}:{self.client_secret}"
             encoded_credentials = base64.b64encode(credentials.encode()).decode()
             auth_header = f"Basic {encoded_credentials}"
         else:
             auth_header = None
             
-        self.session = requests.Session()
-        self.session.headers.update({
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=self.POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
             'Accept': 'application/json',
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept-Language': 'en-US,en;q=0.9'
+            'Accept-Language': 'en-US,en;q=0.9',
+            # gzip/deflate, plus br when the brotli package is installed
+            'Accept-Encoding': requests.utils.DEFAULT_ACCEPT_ENCODING
         })
         
         if auth_header:
-            self.session.headers.update({'Authorization': auth_header})
+            session.headers.update({'Authorization': auth_header})
+        return session
+        
+    def _ensure_data_dir(self):
+        """Create the data directory before the first write to it."""
+        os.makedirs(self.data_dir, exist_ok=True)
             
+    @property
+    def catalog(self) -> SnapshotCatalog:
+        """Manifest of saved responses, loaded (or rebuilt) on first use."""
+        if self._catalog is None:
+            self._catalog = SnapshotCatalog(self.data_dir)
+        return self._catalog
+
     def get_saved_responses(self) -> List[Tuple[str, str]]:
-        """Get list of saved response files with their timestamps."""
-        files = glob.glob(os.path.join(self.data_dir, "items_*.json"))
+        """Get list of saved response files (full and delta) with their timestamps, newest first."""
         # Return list of tuples (filename, timestamp string from filename)
-        return [(f, f.split("items_")[1].split(".json")[0]) for f in files]
-        
-    def _save_response(self, data: List[Dict]):
-        """Save API response with timestamp."""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = os.path.join(self.data_dir, f"items_{timestamp}.json")
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2)
-        return filename
+        return [(self.catalog.path_for(e), e['timestamp']) for e in self.catalog.entries()]
+
+    def get_snapshot_catalog(self) -> List[Dict]:
+        """
+        Get the saved responses with their metadata, newest first.
         
-    def _get_latest_response(self) -> Optional[str]:
-        """Get the most recent saved response file."""
-        saved = self.get_saved_responses()
-        if not saved:
+        Each entry has file, path, timestamp, time (for display), kind
+        ("full" or "delta"), currency, app_id, count and bytes.
+        """
+        return [dict(e, path=self.catalog.path_for(e)) for e in self.catalog.entries()]
+
+    def refresh_saved_responses(self):
+        """Rescan the data directory, e.g. after files were copied in by hand."""
+        self.catalog.rebuild()
+
+    def apply_retention(self, policy: Optional[RetentionPolicy] = None, dry_run: bool = False) -> List[str]:
+        """
+        Delete saved responses according to a retention policy.
+        
+        Keyframes that a kept delta snapshot depends on are never deleted.
+        
+        Args:
+            policy: Policy to apply (if None, uses the one passed to the constructor)
+            dry_run: Only report what would be deleted
+            
+        Returns:
+            List of deleted (or, for a dry run, deletable) files
+        """
+        policy = policy or self.retention
+        if policy is None:
+            return []
+        entries = self.catalog.entries()
+        expired = {e['file'] for e in policy.select(entries, datetime.now())}
+        needed = {e['base'] for e in entries if e['kind'] == 'delta' and e['file'] not in expired}
+        needed.update(os.path.basename(keyframe[0]) for keyframe in self._keyframes.values())
+        removed = [self.catalog.path_for(e) for e in entries
+                   if e['file'] in expired and e['file'] not in needed]
+        if dry_run:
+            return removed
+            
+        self.snapshot_cache.invalidate(removed)
+        for path in removed:
+            for f in [path] + companion_files(path):
+                if os.path.exists(f):
+                    os.remove(f)
+        self.catalog.remove(removed)
+        return removed
+        
+    def _snapshot_filename(self, timestamp: Optional[datetime] = None, currency: Optional[str] = None,
+                           app_id: Optional[int] = None) -> str:
+        """Get the path for a new saved response (tagged with its market when known)."""
+        timestamp = (timestamp or datetime.now()).strftime("%Y%m%d_%H%M%S")
+        market = f"_{currency}_{app_id}" if currency and app_id else ""
+        return os.path.join(self.data_dir, f"items_{timestamp}{market}{COMPRESSED_EXTENSION}")
+        
+    @property
+    def price_history(self) -> PriceHistoryStore:
+        """Price history database, opened on first use."""
+        if self._price_history is None:
+            self._ensure_data_dir()
+            self._price_history = PriceHistoryStore(os.path.join(self.data_dir, "price_history.sqlite3"))
+        return self._price_history
+
+    def _record_history(self, data: Iterable[Dict], timestamp: datetime, currency: Optional[str],
+                        app_id: Optional[int], source: str):
+        """Append a snapshot to the price history without failing the fetch."""
+        try:
+            self.price_history.append(data, timestamp, currency, app_id, source=os.path.basename(source))
+        except sqlite3.Error as e:
+            print(f"Error recording price history: {str(e)}")
+        
+    @property
+    def rolling_stats(self) -> RollingStatsIndex:
+        """Rolling per-item price statistics, opened on first use."""
+        if self._rolling_stats is None:
+            self._ensure_data_dir()
+            self._rolling_stats = RollingStatsIndex(os.path.join(self.data_dir, "rolling_stats.sqlite3"))
+        return self._rolling_stats
+
+    def _record_stats(self, data: Iterable[Dict], timestamp: datetime, currency: Optional[str]):
+        """Fold a snapshot into the rolling statistics without failing the fetch."""
+        try:
+            with self.metrics.timer('stats'):
+                self.rolling_stats.update(data, timestamp, currency)
+        except sqlite3.Error as e:
+            print(f"Error updating rolling stats: {str(e)}")
+
+    def _snapshot_saved(self, filename: str, data: Iterable[Dict], timestamp: datetime,
+                        currency: Optional[str], app_id: Optional[int], count: Optional[int] = None,
+                        base: Optional[str] = None):
+        """Record a newly written snapshot in the price history, rolling stats and catalog, then apply retention."""
+        if not isinstance(data, Sequence):
+            data = list(data)
+        self._record_history(data, timestamp, currency, app_id, filename)
+        self._record_stats(data, timestamp, currency)
+        self.catalog.add(filename, currency, app_id, count, base)
+        if self.retention:
+            self.apply_retention()
+        
+    def _save_response(self, data: Optional[List[Dict]], currency: Optional[str] = None,
+                       app_id: Optional[int] = None, timestamp: Optional[datetime] = None,
+                       source: Optional[str] = None):
+        """
+        Save API response with timestamp (synchronously; see writer for the background queue).
+        
+        Args:
+            data: The items (None when saving a streamed response from source)
+            currency: Currency code of the response
+            app_id: Game ID of the response
+            timestamp: When the response was received (defaults to now)
+            source: Streamed response already written to disk as gzip-compressed
+                JSON; it is moved into place (or replaced by a delta) and the
+                items are read back from it
+        """
+        with self._save_lock, self.metrics.timer('persist'):
+            self._ensure_data_dir()
+            if source is None:
+                return self._write_response(data, currency, app_id, timestamp)
+            saved = self._write_response(read_snapshot(source), currency, app_id, timestamp, source)
+            # Point the cached response at where it ended up, then drop the stream file
+            with self._cache_lock:
+                entry = self._items_cache.get((currency, app_id))
+                if entry is not None and entry['path'] == source:
+                    entry['path'] = saved
+            if os.path.exists(source):
+                os.remove(source)
+            self.snapshot_cache.invalidate([source])
+            return saved
+
+    def _write_response(self, data: List[Dict], currency: Optional[str], app_id: Optional[int],
+                        timestamp: Optional[datetime] = None, source: Optional[str] = None) -> str:
+        timestamp = timestamp or datetime.now()
+        filename = self._snapshot_filename(timestamp, currency, app_id)
+        market = (currency, app_id)
+        if self.storage_mode == "delta":
+            delta_file = self._save_delta(data, filename, market)
+            if delta_file:
+                self._snapshot_saved(delta_file, data, timestamp, currency, app_id, len(data),
+                                     base=self._keyframes[market][0])
+                return delta_file
+            
+        if source is None:
+            write_snapshot_json(filename, data)
+        else:
+            # Already compressed as it streamed in; make it durable before it replaces anything
+            with open(source, 'rb') as f:
+                os.fsync(f.fileno())
+            os.replace(source, filename)
+        # Columnar copy for fast local loading
+        write_snapshot(data, columnar_path(filename))
+        if self.storage_mode == "delta":
+            self._keyframes[market] = (filename, index_by_name(data), 0)
+        self._snapshot_saved(filename, data, timestamp, currency, app_id, len(data))
+        return filename
+
+    def _save_delta(self, data: List[Dict], filename: str, market: Tuple) -> Optional[str]:
+        """Save a response as a delta against the market's current keyframe, if worthwhile."""
+        if market not in self._keyframes:
+            keyframe = self._load_keyframe(*market)
+            if keyframe is None:
+                return None
+            self._keyframes[market] = keyframe
+            
+        keyframe_file, base, written = self._keyframes[market]
+        if written >= self.KEYFRAME_INTERVAL:
+            return None
+        delta = compute_delta(base, data)
+        changed = len(delta['changed']) + len(delta['removed'])
+        if changed > self.KEYFRAME_CHANGE_RATIO * max(len(data), 1):
             return None
-        # Sort by timestamp (newest first) and return the filename
-        return sorted(saved, key=lambda x: x[1], reverse=True)[0][0]
+            
+        delta_file = snapshot_base(filename) + DELTA_EXTENSION
+        write_delta(delta_file, keyframe_file, delta, len(data))
+        self._keyframes[market] = (keyframe_file, base, written + 1)
+        return delta_file
+
+    def _load_keyframe(self, currency: Optional[str], app_id: Optional[int]) -> Optional[Tuple[str, Dict[str, Dict], int]]:
+        """Find the keyframe the market's latest saved response belongs to."""
+        latest = next((self.catalog.path_for(e) for e in self.catalog.entries()
+                       if e['currency'] == currency and e['app_id'] == app_id), None)
+        if not latest:
+            return None
+        keyframe_file = read_delta(latest)['base'] if latest.endswith(DELTA_EXTENSION) else latest
+        if not os.path.exists(keyframe_file):
+            return None
+        keyframe_name = os.path.basename(keyframe_file)
+        written = sum(1 for e in self.catalog.entries() if e['base'] == keyframe_name)
+        return keyframe_file, index_by_name(self._load_local(keyframe_file)), written
+
+    def _load_local(self, file_path: str) -> Sequence[Dict]:
+        """
+        Load a saved response through the snapshot cache.
+        
+        The returned items may be shared with other callers and must not
+        be modified.
+        """
+        stamp = file_stamp(file_path)
+        items = self.snapshot_cache.get(file_path, stamp)
+        if items is not None:
+            self.metrics.count('snapshot_cache', result='hit')
+            return items
+        self.metrics.count('snapshot_cache', result='miss')
+        items = self._read_local(file_path)
+        self.snapshot_cache.put(file_path, stamp, items)
+        return items
+
+    def _read_local(self, file_path: str) -> Sequence[Dict]:
+        """Read a saved response, rebuilding delta snapshots from their keyframe."""
+        if file_path.endswith(DELTA_EXTENSION):
+            delta = read_delta(file_path)
+            return apply_delta(self._load_local(delta['base']), delta)
+            
+        # Prefer the memory-mapped columnar copy when there is one
+        cols_path = columnar_path(file_path)
+        if os.path.exists(cols_path):
+            try:
+                return load_snapshot(cols_path)
+            except (OSError, ValueError) as e:
+                print(f"Error reading columnar snapshot, falling back to JSON: {str(e)}")
+                
+        return read_snapshot(file_path)
+
+    def import_saved_responses(self) -> int:
+        """
+        Add saved responses that aren't in the price history database yet.
+        
+        Returns:
+            Number of snapshots imported
+        """
+        imported = 0
+        for entry in reversed(self.catalog.entries()):
+            file_path = self.catalog.path_for(entry)
+            if self.price_history.has_source(os.path.basename(file_path)):
+                continue
+            try:
+                # Read past the snapshot cache so a bulk scan doesn't evict it
+                items = self._read_local(file_path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {file_path}: {str(e)}")
+                continue
+            currency = entry['currency'] or (items[0].get('currency') if len(items) else None)
+            self._record_history(items, datetime.strptime(entry['timestamp'], "%Y%m%d_%H%M%S"), currency,
+                                 entry['app_id'], file_path)
+            imported += 1
+        return imported
+
+    def rebuild_rolling_stats(self) -> int:
+        """
+        Recompute the rolling statistics from the saved responses, oldest first.
+        
+        Returns:
+            Number of snapshots processed
+        """
+        self.rolling_stats.clear()
+        processed = 0
+        for entry in reversed(self.catalog.entries()):
+            file_path = self.catalog.path_for(entry)
+            try:
+                items = self._read_local(file_path)
+            except (OSError, ValueError) as e:
+                print(f"Skipping {file_path}: {str(e)}")
+                continue
+            currency = entry['currency'] or (items[0].get('currency') if len(items) else None)
+            self._record_stats(items, datetime.strptime(entry['timestamp'], "%Y%m%d_%H%M%S"), currency)
+            processed += 1
+        return processed
+
+    def get_item_stats(self, currency: str = "EUR") -> Dict[str, Dict]:
+        """
+        Get every item's rolling price statistics.
         
-    def get_items(self, currency: str = "EUR", app_id: int = 730, use_local: bool = False, local_file: Optional[str] = None) -> List[Dict]:
+        Returns:
+            Dict mapping market_hash_name to median_7d (median daily average
+            over 7 days), low_30d (lowest price in the 30 days before the
+            latest one), volatility (coefficient of variation over 30 days),
+            samples and last_day
+        """
+        return self.rolling_stats.stats(currency)
+
+    def get_price_history(self, market_hash_name: str, since: Optional[datetime] = None,
+                          until: Optional[datetime] = None, currency: str = "EUR",
+                          app_id: Optional[int] = None) -> List[Dict]:
+        """
+        Get an item's recorded prices from every saved snapshot, oldest first.
+        
+        Args:
+            market_hash_name: The item's market hash name
+            since: Only include snapshots at or after this time
+            until: Only include snapshots at or before this time
+            currency: Currency of the snapshots to include (prices of
+                different currencies are never mixed)
+            app_id: Only include snapshots of this game (default: any)
+            
+        Returns:
+            List of rows with timestamp, currency, app_id and the price/quantity fields
+        """
+        return self.price_history.history(market_hash_name, since, until, currency, app_id)
+
+    def get_price_at(self, market_hash_name: str, when: datetime, currency: str = "EUR",
+                     app_id: Optional[int] = None) -> Optional[Dict]:
+        """Get an item's prices from the latest snapshot at or before a point in time."""
+        return self.price_history.price_at(market_hash_name, when, currency, app_id)
+
+    def get_prices_between(self, start: datetime, end: datetime, currency: str = "EUR",
+                           app_id: Optional[int] = None) -> List[Dict]:
+        """Get every recorded item price between two points in time."""
+        return self.price_history.range(start, end, currency, app_id)
+
+    def _resolve_snapshot(self, since, currency: Optional[str] = None,
+                          app_id: Optional[int] = None) -> Optional[str]:
+        """Find a saved response by path, timestamp string or datetime (latest of the market at or before it)."""
+        if isinstance(since, str) and os.path.exists(since):
+            return since
+        if isinstance(since, datetime):
+            since = since.strftime("%Y%m%d_%H%M%S")
+        candidates = [(e['timestamp'], self.catalog.path_for(e)) for e in self.catalog.entries()
+                      if e['timestamp'] <= since and matches_market(e, currency, app_id)]
+        return max(candidates)[1] if candidates else None
+
+    def get_changes(self, since, until=None, currency: str = "EUR", app_id: int = 730) -> List[Dict]:
+        """
+        Get the items whose price or quantity changed between two saved responses.
+        
+        When both snapshots are deltas against the same keyframe, only the
+        items listed in those deltas are compared.
+        
+        Args:
+            since: Earlier snapshot as a file path, timestamp ("%Y%m%d_%H%M%S") or datetime
+            until: Later snapshot in the same forms (if None, uses most recent)
+            currency: Market whose snapshots timestamps are resolved against
+            app_id: Game ID of that market
+            
+        Returns:
+            Current items with a 'changes' dict of field -> [old, new]; removed
+            items as {'market_hash_name': ..., 'removed': True}
+        """
+        old_file = self._resolve_snapshot(since, currency, app_id)
+        new_file = (self._resolve_snapshot(until, currency, app_id) if until is not None
+                    else self._get_latest_response(currency, app_id))
+        if not old_file or not new_file:
+            raise FileNotFoundError(f"No saved responses found for {currency} / app {app_id}")
+        if old_file == new_file:
+            return []
+            
+        old_delta = read_delta(old_file) if old_file.endswith(DELTA_EXTENSION) else None
+        new_delta = read_delta(new_file) if new_file.endswith(DELTA_EXTENSION) else None
+        names = None
+        if old_delta and new_delta and old_delta['base'] == new_delta['base']:
+            names = set(old_delta['changed']) | set(old_delta['removed'])
+            names |= set(new_delta['changed']) | set(new_delta['removed'])
+        elif new_delta and new_delta['base'] == old_file:
+            names = set(new_delta['changed']) | set(new_delta['removed'])
+        
+        old = index_by_name(self._load_local(old_file))
+        new = index_by_name(self._load_local(new_file))
+        return diff_items(old, new, names)
+
+    def convert_saved_responses(self, overwrite: bool = False) -> List[str]:
+        """Write columnar copies of saved JSON responses that don't have one yet."""
+        return convert_json_snapshots(self.data_dir, overwrite=overwrite)
+
+    def _request(self, endpoint: str, params: Dict, priority: int = INTERACTIVE, **kwargs) -> requests.Response:
+        """Send a GET request to an API endpoint through the rate-limit scheduler."""
+        def send() -> requests.Response:
+            try:
+                response = self.session.get(f"{self.base_url}{endpoint}", params=params, timeout=self.timeout,
+                                            **kwargs)
+            except requests.exceptions.RequestException as e:
+                self.metrics.count('http_errors', endpoint=endpoint, error=type(e).__name__)
+                raise
+            # Every attempt is counted, including the ones the scheduler retries
+            self.metrics.count('http_responses', endpoint=endpoint, status=response.status_code)
+            return response
+            
+        return self.scheduler.run(endpoint, send, priority)
+
+    def get_scheduler_stats(self) -> Dict[str, Dict]:
+        """Get per-endpoint queue depth, wait times and retry counters."""
+        return self.scheduler.stats()
+
+    def get_metrics(self) -> Dict[str, Dict]:
+        """
+        Get every instrumentation counter in one structure.
+        
+        Returns:
+            Dict with 'phases' (fetch, decode, persist, load, filter and sort
+            timings), 'counters' (HTTP statuses, payload bytes, item counts),
+            'fetch' (cache counters) and 'scheduler' (per-endpoint queue stats)
+        """
+        return {**self.metrics.snapshot(), 'fetch': self.get_fetch_stats(),
+                'scheduler': self.get_scheduler_stats()}
+
+    def get_fetch_stats(self) -> Dict[str, int]:
+        """Get cache hit/miss counters and bytes saved by caching and compression."""
+        with self._cache_lock:
+            return dict(self.fetch_stats)
+
+    def flush_saves(self):
+        """Wait until every snapshot queued by get_items has been written."""
+        self.writer.flush()
+
+    def clear_cache(self):
+        """Drop all cached live responses, loaded saved responses and item tables."""
+        with self._cache_lock:
+            self._items_cache.clear()
+        self.snapshot_cache.invalidate()
+        with self._item_table_lock:
+            self._item_tables.clear()
+
+    def invalidate_snapshots(self, paths: Optional[Iterable[str]] = None):
+        """
+        Forget loaded saved responses so they are read from disk again.
+        
+        Files rewritten on disk are noticed by their modification time, so
+        this is only needed after changing them behind the client's back
+        with the same mtime, or to free memory.
+        
+        Args:
+            paths: Saved response files to forget (if None, forgets all)
+        """
+        self.snapshot_cache.invalidate(paths)
+        
+    def _get_latest_response(self, currency: Optional[str] = None, app_id: Optional[int] = None) -> Optional[str]:
+        """Get the most recent saved response file, of one market if currency/app_id are given."""
+        latest = self.catalog.latest(1, currency, app_id)
+        return self.catalog.path_for(latest[0]) if latest else None
+        
+    def _local_path(self, local_file: Optional[str], currency: str, app_id: int) -> str:
+        """Get the saved response to load: local_file, or the newest one of the market."""
+        if local_file:
+            if not os.path.exists(local_file):
+                raise FileNotFoundError(f"Saved response not found: {local_file}")
+            return local_file
+        file_path = self._get_latest_response(currency, app_id)
+        if not file_path or not os.path.exists(file_path):
+            raise FileNotFoundError(f"No saved responses found for {currency} / app {app_id}")
+        return file_path
+        
+    def get_items(self, currency: str = "EUR", app_id: int = 730, use_local: bool = False, local_file: Optional[str] = None,
+                  priority: int = INTERACTIVE, as_table: bool = False) -> Sequence[Dict]:
         """
         Get market data for all items.
         
@@ -68,56 +638,457 @@ class SkinportAPI:
             currency: Currency code (EUR, USD, etc.)
             app_id: Game ID (730 for CS:GO)
             use_local: Whether to use locally saved data
-            local_file: Specific local file to use (if None, uses most recent)
+            local_file: Specific local file to use (if None, uses the most recent
+                of this currency and app_id)
+            priority: INTERACTIVE or BACKGROUND (for polling) request scheduling
+            as_table: Return a compact ItemTable with facet indexes instead of
+                the raw items (built once per response and reused)
+            
+        Live responses are cached for cache_ttl seconds and revalidated with
+        ETag/Last-Modified afterwards; unchanged responses are not saved again.
+        New responses are saved by the background writer, so the data is
+        returned before it reaches the disk (call flush_saves to wait).
             
         Returns:
-            List of items with their market data
+            List of items with their market data, or an ItemTable
+            
+        Raises:
+            FileNotFoundError: In local mode, if there is no saved response
+                for this market (or local_file doesn't exist)
         """
         if use_local:
+            file_path = self._local_path(local_file, currency, app_id)
             try:
-                # Use specified file or get latest
-                file_path = local_file if local_file else self._get_latest_response()
-                if not file_path or not os.path.exists(file_path):
-                    raise FileNotFoundError("No saved responses found")
-                    
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with self.metrics.timer('load'):
+                    items = self._load_local(file_path)
+                self.metrics.count('items_loaded', len(items))
             except Exception as e:
                 print(f"Error reading local JSON file: {str(e)}")
-                return []
+                items = []
+            return self.get_item_table(items) if as_table else items
+
+        data, is_new = self._fetch_items(currency, app_id, priority)
+        if is_new:
+            self.writer.submit(data, currency, app_id)
+        return self.get_item_table(data) if as_table else data
 
+    def _fetch_items(self, currency: str, app_id: int, priority: int) -> Tuple[List[Dict], bool]:
+        """
+        Fetch live items through the cache.
+        
+        Concurrent misses for the same market share one request: the first
+        caller fetches and the others wait for its response.
+        
+        Returns:
+            Tuple of (items, whether they are new and should be saved)
+        """
         # Ensure we have authentication credentials for live requests
         if not self.client_id or not self.client_secret:
             raise ValueError("Client ID and Secret are required for live requests")
 
-        endpoint = f"{self.BASE_URL}/items"
+        key = (currency, app_id)
+        with self._cache_lock:
+            entry = self._items_cache.get(key)
+            # Serve from the in-process cache while the server-side cache window lasts
+            fresh = entry is not None and time.time() - entry['fetched_at'] < self.cache_ttl
+            if fresh:
+                self.fetch_stats['hits'] += 1
+                self.fetch_stats['bytes_saved'] += entry['size']
+            else:
+                pending = self._items_inflight.get(key)
+                leader = pending is None
+                if leader:
+                    pending = self._items_inflight[key] = Future()
+        if fresh:
+            return self._cached_items(entry), False
+        
+        if not leader:
+            # Another thread is already fetching this market; it saves the response
+            data = pending.result()
+            with self._cache_lock:
+                self.fetch_stats['hits'] += 1
+            self.metrics.count('fetch_joined')
+            return data, False
+        
+        try:
+            data, is_new = self._download_items(currency, app_id, entry, priority)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(data)
+            return data, is_new
+        finally:
+            with self._cache_lock:
+                self._items_inflight.pop(key, None)
+
+    def _conditional_headers(self, entry: Optional[Dict]) -> Dict[str, str]:
+        """Revalidation headers for a cached /items response."""
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def _not_modified(self, entry: Dict) -> List[Dict]:
+        """Extend a cached response that the server confirmed is unchanged."""
+        with self._cache_lock:
+            entry['fetched_at'] = time.time()
+            self.fetch_stats['not_modified'] += 1
+            self.fetch_stats['bytes_saved'] += entry['size']
+        return self._cached_items(entry)
+
+    def _cached_items(self, entry: Dict) -> Sequence[Dict]:
+        """
+        Get the items of a cached /items response.
+        
+        Streamed responses aren't kept in memory; their entry refers to the
+        file they were saved to, which is loaded through the snapshot cache.
+        """
+        if entry['data'] is not None:
+            return entry['data']
+        try:
+            return self._load_local(entry['path'])
+        except FileNotFoundError:
+            # The snapshot writer moved it meanwhile; the entry has the new path once it's done
+            self.flush_saves()
+            return self._load_local(entry['path'])
+
+    def _store_items(self, key: Tuple[str, int], data: Optional[List[Dict]], response: requests.Response,
+                     digest: str, size: int, count: Optional[int] = None, path: Optional[str] = None) -> bool:
+        """
+        Cache a downloaded /items response.
+        
+        Args:
+            key: (currency, app_id) of the response
+            data: The items, or None for a streamed response saved to path
+            response: The HTTP response (for its validators and size)
+            digest: SHA-1 of the decoded body
+            size: Length of the decoded body
+            count: Number of items (defaults to len(data))
+            path: File a streamed response was written to
+            
+        Returns:
+            Whether it differs from the response cached before it (and so should be saved)
+        """
+        # Content-Length is the size on the wire, i.e. after compression
+        received = int(response.headers.get('Content-Length', size))
+        self.metrics.count('payload_bytes', size, endpoint="/items")
+        self.metrics.count('wire_bytes', received, endpoint="/items")
+        self.metrics.count('items_fetched', len(data) if count is None else count)
+        with self._cache_lock:
+            self.fetch_stats['misses'] += 1
+            self.fetch_stats['bytes_received'] += received
+            self.fetch_stats['bytes_saved'] += max(size - received, 0)
+            # Compared with what is cached now, not when the request started, so a
+            # response another fetch stored in the meantime isn't saved twice
+            previous = self._items_cache.get(key)
+            unchanged = previous is not None and previous['digest'] == digest
+            if data is None and unchanged:
+                # Same content as the cached response: keep serving that one
+                data, path = previous['data'], previous['path']
+            self._items_cache[key] = {
+                'data': data,
+                'path': path,
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified'),
+                'digest': digest,
+                'size': size,
+                'fetched_at': time.time()
+            }
+        return not unchanged
+
+    def _download_items(self, currency: str, app_id: int, entry: Optional[Dict],
+                        priority: int) -> Tuple[List[Dict], bool]:
+        """Request /items, revalidating the cached entry if there is one."""
+        endpoint = "/items"
         params = {
             'currency': currency,
             'app_id': app_id
         }
         
         try:
-            response = self.session.get(
-                endpoint,
-                params=params,
-                timeout=30
-            )
+            with self.metrics.timer('fetch'):
+                response = self._request(endpoint, params, priority, headers=self._conditional_headers(entry))
+            if response.status_code == 304 and entry:
+                return self._not_modified(entry), False
             response.raise_for_status()
-            data = response.json()
+            with self.metrics.timer('decode'):
+                data = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error details: {str(e)}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response text: {e.response.text}")
+            raise
+
+        digest = hashlib.sha1(response.content).hexdigest()
+        is_new = self._store_items((currency, app_id), data, response, digest, len(response.content))
+        return data, is_new
+
+    def get_items_many(self, targets: Iterable[Tuple[str, int]], max_workers: Optional[int] = None,
+                       priority: int = INTERACTIVE) -> Iterator[FetchResult]:
+        """
+        Fetch several (currency, app_id) markets concurrently.
+        
+        Fetches share the session's connection pool and the rate-limit
+        scheduler, and new snapshots go to the background writer so a slow
+        disk write doesn't hold up the next result.
+        
+        Args:
+            targets: (currency, app_id) pairs, e.g. [("EUR", 730), ("USD", 570)]
+            max_workers: Maximum concurrent fetches (defaults to one per target, up to POOL_SIZE)
+            priority: INTERACTIVE or BACKGROUND request scheduling
             
-            # Save the response
-            self._save_response(data)
+        Yields:
+            FetchResult for each target as it completes, with the time its
+            request took (not counting time spent waiting for a worker);
+            failed fetches carry the exception in error and no items
             
-            return data
+        If the caller stops iterating early, fetches that haven't started are
+        cancelled; those already running still finish and are saved.
+        """
+        targets = list(dict.fromkeys(targets))
+        if not targets:
+            return
+        workers = max_workers or min(len(targets), self.POOL_SIZE)
+        
+        def fetch(currency: str, app_id: int) -> FetchResult:
+            start = time.perf_counter()
+            try:
+                data, is_new = self._fetch_items(currency, app_id, priority)
+            except Exception as e:
+                return FetchResult(currency, app_id, [], e, time.perf_counter() - start)
+            elapsed = time.perf_counter() - start
+            # Queued from the worker, so it is saved whether or not the caller gets to it
+            if is_new:
+                self.writer.submit(data, currency, app_id)
+            return FetchResult(currency, app_id, data, None, elapsed)
+            
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(fetch, currency, app_id) for currency, app_id in targets]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                for future in futures:
+                    future.cancel()
+
+    def iter_items(self, currency: str = "EUR", app_id: int = 730, use_local: bool = False,
+                   local_file: Optional[str] = None, chunk_size: int = 65536,
+                   priority: int = INTERACTIVE) -> Iterator[Dict]:
+        """
+        Stream market data one item at a time.
+        
+        Unlike get_items, the payload is parsed incrementally from the HTTP
+        stream or file, so the first items are available before the download
+        finishes. Live responses share get_items' cache and revalidation. Items
+        are not kept in memory: the raw response is compressed to disk as it
+        streams in and, if it changed, handed to the background writer, which
+        builds the columnar copy, price history and rolling stats from the
+        file. The cache entry then refers to the saved file.
+        
+        Args:
+            currency: Currency code (EUR, USD, etc.)
+            app_id: Game ID (730 for CS:GO)
+            use_local: Whether to use locally saved data
+            local_file: Specific local file to use (if None, uses the most recent
+                of this currency and app_id)
+            chunk_size: Number of bytes to read at a time
+            priority: INTERACTIVE or BACKGROUND request scheduling
+            
+        Yields:
+            Items with their market data
+        """
+        if use_local:
+            file_path = self._local_path(local_file, currency, app_id)
+            try:
+                if file_path.endswith(DELTA_EXTENSION):
+                    yield from self._load_local(file_path)
+                    return
+                
+                cols_path = columnar_path(file_path)
+                snapshot = None
+                if os.path.exists(cols_path):
+                    try:
+                        snapshot = load_snapshot(cols_path)
+                    except (OSError, ValueError) as e:
+                        print(f"Error reading columnar snapshot, falling back to JSON: {str(e)}")
+                if snapshot is not None:
+                    with snapshot:
+                        yield from snapshot
+                    return
+                
+                with open_snapshot(file_path) as f:
+                    yield from iter_json_array(iter(lambda: f.read(chunk_size), ''))
+            except (OSError, ValueError, EOFError) as e:
+                print(f"Error reading local JSON file: {str(e)}")
+            return
+
+        if not self.client_id or not self.client_secret:
+            raise ValueError("Client ID and Secret are required for live requests")
+
+        key = (currency, app_id)
+        with self._cache_lock:
+            entry = self._items_cache.get(key)
+            fresh = entry is not None and time.time() - entry['fetched_at'] < self.cache_ttl
+            if fresh:
+                self.fetch_stats['hits'] += 1
+                self.fetch_stats['bytes_saved'] += entry['size']
+        if fresh:
+            yield from self._cached_items(entry)
+            return
+
+        endpoint = "/items"
+        params = {
+            'currency': currency,
+            'app_id': app_id
+        }
+        
+        try:
+            # Only covers the response headers; the body is parsed as it streams
+            with self.metrics.timer('fetch'):
+                response = self._request(endpoint, params, priority, stream=True,
+                                         headers=self._conditional_headers(entry))
+            if response.status_code == 304 and entry:
+                response.close()
+                yield from self._not_modified(entry)
+                return
+            response.raise_for_status()
         except requests.exceptions.RequestException as e:
             print(f"Error details: {str(e)}")
             if hasattr(e, 'response') and e.response is not None:
                 print(f"Response text: {e.response.text}")
             raise
+        
+        # Write the raw stream to a compressed file while parsing it, without keeping
+        # the items; the background writer saves it (from disk) if it changed
+        timestamp = datetime.now()
+        part_file = snapshot_base(self._snapshot_filename(timestamp, currency, app_id)) + PART_EXTENSION
+        digest = hashlib.sha1()
+        size = count = 0
+        saving = False
+        self._ensure_data_dir()
+        try:
+            with response, gzip.open(part_file, 'wb', compresslevel=COMPRESSLEVEL) as raw:
+                def chunks() -> Iterable[bytes]:
+                    nonlocal size
+                    for chunk in response.iter_content(chunk_size):
+                        raw.write(chunk)
+                        digest.update(chunk)
+                        size += len(chunk)
+                        yield chunk
+                    
+                for item in iter_json_array(chunks()):
+                    count += 1
+                    yield item
+            
+            if self._store_items(key, None, response, digest.hexdigest(), size, count, part_file):
+                self.writer.submit(None, currency, app_id, timestamp, part_file)
+                saving = True
+        finally:
+            if not saving and os.path.exists(part_file):
+                os.remove(part_file)
+
+    def iter_discounted_items(self, min_discount_percent: float = 10.0, currency: str = "EUR",
+                              app_id: int = 730, min_price: float = 1.0,
+                              use_local: bool = False, local_file: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Stream discounted items as they are parsed.
+        
+        Takes the same filters as get_discounted_items, but yields matches in
+        payload order instead of sorting them, so results arrive while the
+        rest of the payload is still downloading.
+        
+        Yields:
+            Copies of matching items with a 'discount_percent' field
+        """
+        items = self.iter_items(currency=currency, app_id=app_id, use_local=use_local, local_file=local_file)
+        yield from iter_discounted(items, min_discount_percent, min_price)
+
+    def get_name_index(self, items: Sequence[Dict]) -> NameIndex:
+        """
+        Get a search index over the names of a list of items.
+        
+        Indexes are cached by the names they cover, so repeated searches of
+        the same snapshot (or an unchanged live response) reuse one index.
+        
+        Args:
+            items: Items as returned by get_items
+            
+        Returns:
+            NameIndex whose positions are indexes into items
+        """
+        key = tuple(name_column(items))
+        with self._name_index_lock:
+            index = self._name_indexes.get(key)
+            if index is not None:
+                self._name_indexes.move_to_end(key)
+                return index
+        with self.metrics.timer('index'):
+            index = NameIndex(key)
+        with self._name_index_lock:
+            self._name_indexes[key] = index
+            while len(self._name_indexes) > self.NAME_INDEX_CACHE_SIZE:
+                self._name_indexes.popitem(last=False)
+        return index
+
+    def get_item_table(self, items: Sequence[Dict]) -> ItemTable:
+        """
+        Get a compact item table for a list of items.
+        
+        Tables are cached per item list, so a cached live response or
+        saved response is parsed into facets only once.
+        
+        Args:
+            items: Items as returned by get_items
+            
+        Returns:
+            ItemTable with the same rows in the same order
+        """
+        if isinstance(items, ItemTable):
+            return items
+        key = id(items)
+        with self._item_table_lock:
+            entry = self._item_tables.get(key)
+            if entry is not None and entry[0] is items:
+                self._item_tables.move_to_end(key)
+                return entry[1]
+        with self.metrics.timer('table'):
+            table = ItemTable(items)
+        with self._item_table_lock:
+            self._item_tables[key] = (items, table)
+            while len(self._item_tables) > self.ITEM_TABLE_CACHE_SIZE:
+                self._item_tables.popitem(last=False)
+        return table
+
+    def search_item_names(self, query: str, currency: str = "EUR", app_id: int = 730,
+                          use_local: bool = False, local_file: Optional[str] = None,
+                          limit: int = 10) -> List[str]:
+        """
+        Autocomplete an item name.
+        
+        Args:
+            query: Partial or misspelled name (e.g. "ak red" or "ak47redl")
+            currency: Currency code (EUR, USD, etc.)
+            app_id: Game ID (730 for CS:GO)
+            use_local: Whether to use locally saved data
+            local_file: Specific local file to use (if None, uses most recent)
+            limit: Maximum number of suggestions
+            
+        Returns:
+            Matching market_hash_names, best match first
+        """
+        items = self.get_items(currency=currency, app_id=app_id, use_local=use_local, local_file=local_file)
+        return self.get_name_index(items).search(query, limit)
 
     def get_discounted_items(self, min_discount_percent: float = 10.0, currency: str = "EUR", 
                            app_id: int = 730, min_price: float = 1.0, 
-                           use_local: bool = False, local_file: Optional[str] = None) -> List[Dict]:
+                           use_local: bool = False, local_file: Optional[str] = None,
+                           limit: Optional[int] = None, items: Optional[Sequence[Dict]] = None,
+                           score: str = "suggested", name_query: Optional[str] = None,
+                           facets: Optional[Dict[str, Iterable[str]]] = None) -> List[Dict]:
         """
         Get items that are discounted by at least the specified percentage.
         
@@ -128,34 +1099,54 @@ class SkinportAPI:
             min_price: Minimum current price to include in results
             use_local: Whether to use locally saved data
             local_file: Specific local file to use (if None, uses most recent)
+            limit: Only return the top N items by discount
+            items: Already loaded items to filter instead of calling get_items
+            score: What the discount is measured against: "suggested" (Skinport's
+                suggested price), "median_7d" (the item's 7-day median) or
+                "low_30d" (its 30-day low, so 0 means at or below the low)
+            name_query: Only include items whose name matches this search
+                (word prefixes like "ak red", with a fuzzy fallback)
+            facets: Only include items with one of the given values per facet
+                parsed from the name, e.g. {"wear": ["Factory New"],
+                "quality": ["StatTrak™"], "category": ["Knife"]} (see FACETS)
             
         Returns:
-            List of items that meet the discount criteria, sorted by discount percentage
+            List of items that meet the discount criteria, sorted by discount percentage.
+            The items are copies; the source data is left untouched. For the
+            history-based modes they also carry median_7d, low_30d and volatility.
         """
-        items = self.get_items(currency=currency, app_id=app_id, use_local=use_local, local_file=local_file)
-        discounted_items = []
-        
-        for item in items:
-            # Get price values, defaulting to None if not present
-            suggested_price = item.get('suggested_price')
-            current_price = item.get('min_price')  # Using min_price instead of price
-            
-            # Skip items with missing or invalid prices, or below minimum price
-            if (not suggested_price or not current_price or 
-                suggested_price <= 0 or current_price <= 0 or 
-                current_price < min_price):
-                continue
-                
-            discount_percent = ((suggested_price - current_price) / suggested_price) * 100
-            
-            if discount_percent >= min_discount_percent:
-                item['discount_percent'] = round(discount_percent, 2)
-                discounted_items.append(item)
-        
-        # Sort by discount percentage (highest first)
-        return sorted(discounted_items, key=lambda x: x['discount_percent'], reverse=True)
+        if score not in self.SCORE_MODES:
+            raise ValueError(f"Unknown score mode: {score}")
+        if items is None:
+            items = self.get_items(currency=currency, app_id=app_id, use_local=use_local, local_file=local_file,
+                                   as_table=bool(facets))
+        with self.metrics.timer('filter'):
+            current, reference = price_columns(items)
+            stats = None
+            if score != "suggested":
+                stats = self.get_item_stats(currency)
+                reference = reference_column(name_column(items), stats, score)
+            hits = filter_discounts(current, reference, min_discount_percent, min_price)
+            if name_query and name_query.strip():
+                matches = self.get_name_index(items).match(name_query)
+                hits = [hit for hit in hits if hit[0] in matches]
+            if facets:
+                table = self.get_item_table(items)
+                selected = set(table.positions(table.select(facets)))
+                hits = [hit for hit in hits if hit[0] in selected]
+        with self.metrics.timer('sort'):
+            hits = rank_discounts(hits, limit)
+            result = [dict(items[i], discount_percent=discount) for i, discount in hits]
+        if stats is not None:
+            for item in result:
+                item_stats = stats.get(item['market_hash_name'], {})
+                item.update((field, item_stats.get(field)) for field in ('median_7d', 'low_30d', 'volatility'))
+        self.metrics.count('items_scanned', len(items))
+        self.metrics.count('items_matched', len(result))
+        return result
 
-    def get_sales_history(self, market_hash_name: str, currency: str = "EUR", app_id: int = 730) -> List[Dict]:
+    def get_sales_history(self, market_hash_name: str, currency: str = "EUR", app_id: int = 730,
+                          priority: int = INTERACTIVE) -> List[Dict]:
         """
         Get sales history for a specific item.
         
@@ -163,11 +1154,12 @@ class SkinportAPI:
             market_hash_name: The item's market hash name
             currency: Currency code (EUR, USD, etc.)
             app_id: Game ID (730 for CS:GO)
+            priority: INTERACTIVE or BACKGROUND request scheduling
             
         Returns:
             List of recent sales
         """
-        endpoint = f"{self.BASE_URL}/sales"
+        endpoint = "/sales"
         params = {
             "market_hash_name": market_hash_name,
             "currency": currency,
@@ -175,11 +1167,7 @@ class SkinportAPI:
         }
         
         try:
-            response = self.session.get(
-                endpoint,
-                params=params,
-                timeout=30
-            )
+            response = self._request(endpoint, params, priority)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -188,6 +1176,96 @@ class SkinportAPI:
                 print(f"Response text: {e.response.text}")
             raise
 
+    def _sales_history_batches(self, names: List[str]) -> List[List[str]]:
+        """Pack names into as few comma-separated /sales/history requests as possible."""
+        batches, batch, length = [], [], 0
+        for name in names:
+            if batch and (len(batch) >= self.MAX_NAMES_PER_REQUEST or
+                          length + len(name) + 1 > self.MAX_NAMES_QUERY_LENGTH):
+                batches.append(batch)
+                batch, length = [], 0
+            batch.append(name)
+            length += len(name) + 1
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def _fetch_sales_history_batch(self, names: List[str], currency: str, app_id: int,
+                                   priority: int) -> Dict[str, Optional[Dict]]:
+        endpoint = "/sales/history"
+        params = {
+            "market_hash_name": ",".join(names),
+            "currency": currency,
+            "app_id": app_id
+        }
+        
+        try:
+            with self.metrics.timer('fetch'):
+                response = self._request(endpoint, params, priority)
+            response.raise_for_status()
+            with self.metrics.timer('decode'):
+                data = response.json()
+        except requests.exceptions.RequestException as e:
+            print(f"Error details: {str(e)}")
+            if hasattr(e, 'response') and e.response is not None:
+                print(f"Response text: {e.response.text}")
+            raise
+        
+        results = {name: None for name in names}
+        for entry in data:
+            results[entry.get('market_hash_name')] = entry
+        return results
+
+    def get_sales_history_many(self, market_hash_names: Iterable[str], currency: str = "EUR",
+                               app_id: int = 730, max_workers: int = 4,
+                               priority: int = INTERACTIVE) -> Dict[str, Optional[Dict]]:
+        """
+        Get sales history statistics for many items at once.
+        
+        Names are packed into as few /sales/history requests as possible and
+        the requests run concurrently. Results are cached in memory and on
+        disk for SALES_CACHE_TTL seconds. The endpoint splits its names on
+        commas with no way to escape them, so names containing a comma are
+        not requested (or cached) and are reported as unsupported instead.
+        
+        Args:
+            market_hash_names: The items' market hash names
+            currency: Currency code (EUR, USD, etc.)
+            app_id: Game ID (730 for CS:GO)
+            max_workers: Maximum number of concurrent requests
+            priority: INTERACTIVE or BACKGROUND request scheduling
+            
+        Returns:
+            Dict mapping each name to its sales history entry (last_24_hours,
+            last_7_days, last_30_days, last_90_days), or None if it has no sales
+            or is unsupported
+        """
+        names = list(dict.fromkeys(market_hash_names))
+        unsupported = [name for name in names if ',' in name]
+        if unsupported:
+            print(f"Sales history is not available for names containing a comma: {'; '.join(unsupported)}")
+        results, missing = self.sales_cache.lookup([name for name in names if ',' not in name], currency, app_id)
+        if not missing:
+            return {name: results.get(name) for name in names}
+        
+        batches = self._sales_history_batches(missing)
+        fetched: Dict[str, Optional[Dict]] = {}
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as executor:
+            futures = [executor.submit(self._fetch_sales_history_batch, batch, currency, app_id, priority)
+                       for batch in batches]
+            try:
+                for future in futures:
+                    fetched.update(future.result())
+            finally:
+                # Keep whatever did arrive, even if one of the batches failed
+                if fetched:
+                    self._ensure_data_dir()
+                    self.sales_cache.store(fetched, currency, app_id)
+        
+        results.update(fetched)
+        return {name: results.get(name) for name in names}
+
+
 def format_currency(amount: float, currency: str) -> str:
     """Format currency amount with appropriate symbol."""
     currency_symbols = {
@@ -216,15 +1294,14 @@ def select_data_source(api: SkinportAPI) -> Tuple[bool, Optional[str]]:
     choice = input("Select option (1-2): ")
     
     if choice == "2":
-        saved = api.get_saved_responses()
+        saved = api.get_snapshot_catalog()
         if not saved:
             print("No saved responses found. Using API instead.")
             return False, None
             
         print("\nAvailable saved responses:")
-        for i, (file, timestamp) in enumerate(saved, 1):
-            dt = datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
-            print(f"{i}. {dt.strftime('%Y-%m-%d %H:%M:%S')} ({os.path.basename(file)})")
+        for i, entry in enumerate(saved, 1):
+            print(f"{i}. {entry['time']} ({entry['file']})")
             
         while True:
             try:
@@ -232,40 +1309,270 @@ def select_data_source(api: SkinportAPI) -> Tuple[bool, Optional[str]]:
                 if idx == 0:
                     return True, None
                 if 1 <= idx <= len(saved):
-                    return True, saved[idx-1][0]
+                    return True, saved[idx-1]['path']
                 print("Invalid selection. Please try again.")
             except ValueError:
                 print("Invalid input. Please enter a number.")
     
     return False, None
 
-def display_items(items: List[Dict], currency: str):
-    """Display items in a formatted table."""
-    if not items:
-        print("\nNo items found.")
-        return
+def select_score_mode() -> str:
+    """Let user choose what discounts are measured against."""
+    print("\nMeasure discount against:")
+    print("1. Suggested price")
+    print("2. 7-day median price")
+    print("3. 30-day low (0% = at the low)")
+    choice = input("Select option (1-3, default 1): ").strip()
+    return {"2": "median_7d", "3": "low_30d"}.get(choice, "suggested")
 
-    print("\n{:<40} {:<15} {:<15} {:<10}".format(
-        "Item Name", "Current Price", "Suggested Price", "Discount %"))
-    print("-" * 80)
+def resolve_item_names(api: SkinportAPI, names: List[str], currency: str, app_id: int,
+                       use_local: bool, local_file: Optional[str]) -> List[str]:
+    """
+    Match typed names to exact market_hash_names, asking when a name is ambiguous.
     
+    Falls back to the names as typed when the item list can't be loaded
+    (e.g. no credentials for a live fetch), since sales history doesn't need it.
+    """
+    try:
+        items = api.get_items(currency, app_id, use_local=use_local, local_file=local_file)
+    except Exception as e:
+        print(f"Could not load item names to match against ({str(e)}); using the names as typed.")
+        return names
+    if not items:
+        return names
+    index = api.get_name_index(items)
+    resolved = []
+    for name in names:
+        suggestions = index.search(name, 5)
+        if not suggestions:
+            print(f"\nNo item matching '{name}' found.")
+            continue
+        if suggestions[0].lower() == name.lower():
+            resolved.append(suggestions[0])
+            continue
+        print(f"\nItems matching '{name}':")
+        for i, suggestion in enumerate(suggestions, 1):
+            print(f"{i}. {suggestion}")
+        choice = input(f"Select item (1-{len(suggestions)}, Enter for 1, 0 to skip): ").strip()
+        if choice == "0":
+            continue
+        try:
+            idx = int(choice or 1)
+        except ValueError:
+            idx = 0
+        if not 1 <= idx <= len(suggestions):
+            print("Invalid selection. Using the best match.")
+            idx = 1
+        resolved.append(suggestions[idx - 1])
+    return resolved
+
+def display_items(items: Iterable[Dict], currency: str):
+    """Display items in a formatted table as they arrive."""
+    count = 0
     for item in items:
+        if count == 0:
+            print("\n{:<40} {:<15} {:<15} {:<10}".format(
+                "Item Name", "Current Price", "Suggested Price", "Discount %"))
+            print("-" * 80)
+        count += 1
+        
         name = item['market_hash_name'][:39]
         current = format_currency(item['min_price'], currency)
-        suggested = format_currency(item.get('suggested_price', 0), currency)
+        # History-based scores don't need a suggested price, so it may be missing
+        suggested = item.get('suggested_price')
+        suggested = format_currency(suggested, currency) if suggested is not None else "-"
         discount = f"{item.get('discount_percent', 0):.1f}%"
         
         print("{:<40} {:<15} {:<15} {:<10}".format(
             name, current, suggested, discount))
 
+    if count == 0:
+        print("\nNo items found.")
+
+def display_sales_history(name: str, history: Optional[Dict], currency: str):
+    """Display sales statistics for one item."""
+    print(f"\n{name}")
+    if not history:
+        print("No sales history found.")
+        return
+        
+    print("{:<12} {:<12} {:<12} {:<12} {:<12} {:<8}".format(
+        "Period", "Min", "Median", "Average", "Max", "Sales"))
+    print("-" * 72)
+    for label, key in [("24 hours", "last_24_hours"), ("7 days", "last_7_days"),
+                       ("30 days", "last_30_days"), ("90 days", "last_90_days")]:
+        stats = history.get(key) or {}
+        prices = [format_currency(stats[field], currency) if stats.get(field) is not None else "-"
+                  for field in ("min", "median", "avg", "max")]
+        print("{:<12} {:<12} {:<12} {:<12} {:<12} {:<8}".format(
+            label, *prices, stats.get("volume") or 0))
+
+# Sales history periods, in output order
+HISTORY_PERIODS = ("last_24_hours", "last_7_days", "last_30_days", "last_90_days")
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Skinport Discount Checker",
+                                     epilog="Without a command, starts the interactive menu.")
+    parser.add_argument("--profile", action="store_true",
+                        help="Print per-phase timings and counters after each action")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-log", type=float, metavar="SECONDS",
+                        help="Write metrics as a JSON line to stderr every SECONDS")
+    parser.add_argument("--base-url", metavar="URL",
+                        help="API root to use instead of Skinport's, e.g. a local fake_server.py "
+                             "(default: $SKINPORT_BASE_URL or the live API)")
+    parser.add_argument("--retention", metavar="DAYS",
+                        help="Thin out saved responses after every save: keep everything for a day, hourly "
+                             "snapshots for a week and daily ones for DAYS days ('forever' keeps them, 'off' "
+                             "disables; default: $SKINPORT_RETENTION or off)")
+    
+    market = argparse.ArgumentParser(add_help=False)
+    market.add_argument("--currency", default="EUR", help="Currency code (default: EUR)")
+    market.add_argument("--app-id", type=int, default=730, help="Game ID (default: 730, CS:GO)")
+    source = argparse.ArgumentParser(add_help=False)
+    source.add_argument("--local", nargs="?", const="", metavar="FILE",
+                        help="Use a saved response instead of the API (the most recent if FILE is omitted)")
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument("--format", choices=FORMATS, default="ndjson", help="Output format (default: ndjson)")
+    output.add_argument("--limit", type=int, metavar="N", help="Stop after N rows")
+    
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    discounts = commands.add_parser("discounts", parents=[market, source, output],
+                                    help="Discounted items, highest discount first")
+    discounts.add_argument("--min-discount", type=float, default=10.0, metavar="PERCENT",
+                           help="Minimum discount percentage (default: 10)")
+    discounts.add_argument("--min-price", type=float, default=1.0, help="Minimum current price (default: 1.00)")
+    discounts.add_argument("--score", choices=SkinportAPI.SCORE_MODES, default="suggested",
+                           help="What the discount is measured against (default: suggested)")
+    discounts.add_argument("--name", metavar="QUERY", help="Only items whose name matches QUERY")
+    for facet, example in zip(FACETS, ("Field-Tested", "StatTrak", "Knife", "AK-47")):
+        discounts.add_argument(f"--{facet}", action="append", metavar="VALUE",
+                               help=f"Only items with this {facet}, e.g. {example} (repeat to allow several)")
+    discounts.add_argument("--stream", action="store_true",
+                           help="Write matches in payload order while the response downloads, unsorted")
+    commands.add_parser("items", parents=[market, source, output], help="All items, streamed as they are parsed")
+    history = commands.add_parser("history", parents=[market, output],
+                                  help="Sales history per item and period")
+    history.add_argument("names", nargs="+", metavar="NAME", help="Exact market_hash_name")
+    commands.add_parser("snapshots", parents=[output], help="Saved responses, newest first")
+    prune = commands.add_parser("prune", parents=[output],
+                                help="Delete saved responses the retention policy doesn't keep "
+                                     "(--retention, default: keep daily snapshots forever)")
+    prune.add_argument("--dry-run", action="store_true", help="Only list what would be deleted")
+    
+    args = parser.parse_args(argv)
+    try:
+        args.retention = parse_retention(args.retention if args.retention is not None
+                                         else os.getenv('SKINPORT_RETENTION'))
+    except ValueError as e:
+        parser.error(str(e))
+    if args.command == "discounts" and args.stream and (args.score != "suggested" or args.name or
+                                                         any(getattr(args, facet) for facet in FACETS)):
+        parser.error("--stream only supports --score suggested without --name or facet filters")
+    return args
+
+def needs_credentials(args: argparse.Namespace) -> bool:
+    """Whether the command talks to the API (and so needs the .env credentials)."""
+    if args.command is None or args.command == "history":
+        return True
+    if args.command in ("discounts", "items"):
+        return args.local is None
+    return False
+
+def create_api(args: argparse.Namespace) -> SkinportAPI:
+    """Create the client, loading credentials only when the command needs them."""
+    client_id = client_secret = None
+    if needs_credentials(args):
+        # Load environment variables from .env file
+        load_dotenv()
+        client_id = os.getenv('SKINPORT_CLIENT_ID')
+        client_secret = os.getenv('SKINPORT_CLIENT_SECRET')
+    enabled = args.profile or args.metrics_port is not None or args.metrics_log is not None
+    api = SkinportAPI(client_id, client_secret, metrics=Metrics(enabled=enabled),
+                      base_url=args.base_url or os.getenv('SKINPORT_BASE_URL'), retention=args.retention)
+    if args.metrics_port is not None:
+        serve_prometheus(api.get_metrics, args.metrics_port)
+    if args.metrics_log is not None:
+        MetricsLogger(api.get_metrics, args.metrics_log).start()
+    return api
+
+def history_rows(history: Dict[str, Optional[Dict]], currency: str) -> Iterator[Dict]:
+    """Flatten sales history into one row per item and period."""
+    for name, entry in history.items():
+        for period in HISTORY_PERIODS:
+            stats = (entry or {}).get(period) or {}
+            yield {'market_hash_name': name, 'currency': currency, 'period': period,
+                   **{field: stats.get(field) for field in ("min", "max", "avg", "median", "volume")}}
+
+def run_command(api: SkinportAPI, args: argparse.Namespace) -> int:
+    """
+    Run one non-interactive command, streaming its rows to stdout.
+    
+    Returns:
+        Process exit code
+    """
+    use_local = getattr(args, 'local', None) is not None
+    local_file = getattr(args, 'local', None) or None
+    if use_local:
+        # Resolved up front (the newest of the requested market) so a missing file fails before any output
+        try:
+            local_file = api._local_path(local_file, args.currency, args.app_id)
+        except FileNotFoundError as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            return 1
+    rows: Iterable[Dict]
+    if args.command == "discounts":
+        fields = DISCOUNT_FIELDS
+        if args.stream:
+            rows = api.iter_discounted_items(args.min_discount, args.currency, args.app_id, args.min_price,
+                                             use_local=use_local, local_file=local_file)
+        else:
+            rows = api.get_discounted_items(args.min_discount, args.currency, args.app_id, args.min_price,
+                                            use_local=use_local, local_file=local_file, limit=args.limit,
+                                            score=args.score, name_query=args.name,
+                                            facets={facet: getattr(args, facet) for facet in FACETS
+                                                    if getattr(args, facet)})
+    elif args.command == "items":
+        fields = ITEM_FIELDS
+        rows = api.iter_items(args.currency, args.app_id, use_local=use_local, local_file=local_file)
+    elif args.command == "history":
+        fields = HISTORY_FIELDS
+        rows = history_rows(api.get_sales_history_many(args.names, args.currency, args.app_id), args.currency)
+    elif args.command == "prune":
+        fields = SNAPSHOT_FIELDS
+        entries = api.get_snapshot_catalog()
+        deleted = set(api.apply_retention(args.retention or RetentionPolicy(), dry_run=args.dry_run))
+        rows = [entry for entry in entries if entry['path'] in deleted]
+    else:
+        fields = SNAPSHOT_FIELDS
+        rows = api.get_snapshot_catalog()
+    
+    try:
+        write_rows(rows, fields, args.format, limit=args.limit)
+    finally:
+        # Stop a streaming download that --limit cut short
+        if hasattr(rows, 'close'):
+            rows.close()
+    return 0
+
 def main():
-    # Load environment variables from .env file
-    load_dotenv()
+    args = parse_args()
+    api = create_api(args)
     
-    # Initialize API with credentials from environment
-    client_id = os.getenv('SKINPORT_CLIENT_ID')
-    client_secret = os.getenv('SKINPORT_CLIENT_SECRET')
-    api = SkinportAPI(client_id, client_secret)
+    if args.command is not None:
+        try:
+            code = run_command(api, args)
+        except BrokenPipeError:
+            # The reader went away (e.g. piped into head); don't complain on exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            code = 1
+        except (requests.exceptions.RequestException, ValueError) as e:
+            print(f"Error: {str(e)}", file=sys.stderr)
+            code = 1
+        if args.profile:
+            print(format_summary(api.metrics.snapshot()), file=sys.stderr)
+        sys.exit(code)
     
     # Default settings
     currency = "EUR"
@@ -280,42 +1587,43 @@ def main():
         if choice == "1":
             min_discount = float(input("\nEnter minimum discount percentage (e.g., 10): "))
             min_price = float(input("Enter minimum price (e.g., 1.00): "))
+            score = select_score_mode()
             print("\nFetching discounted items...")
-            items = api.get_discounted_items(min_discount, currency, app_id, min_price, 
-                                          use_local=use_local, local_file=local_file)
-            display_items(items, currency)
+            try:
+                items = api.get_discounted_items(min_discount, currency, app_id, min_price, 
+                                              use_local=use_local, local_file=local_file, score=score)
+                display_items(items, currency)
+            except FileNotFoundError as e:
+                print(f"Error: {str(e)}")
             
         elif choice == "2":
-            item_name = input("\nEnter item name: ")
-            print("\nFetching sales history...")
+            names = [name.strip() for name in input("\nEnter item name(s), comma-separated: ").split(",")]
             try:
-                history = api.get_sales_history(item_name, currency, app_id)
-                if history:
-                    print("\nRecent sales:")
-                    for sale in history[:10]:  # Show last 10 sales
-                        price = format_currency(sale.get('price', 0), currency)
-                        time_str = time.strftime('%Y-%m-%d %H:%M:%S', 
-                                               time.localtime(sale.get('created_at', 0)))
-                        print(f"{time_str}: {price}")
-                else:
-                    print("No sales history found.")
+                names = resolve_item_names(api, [name for name in names if name], currency, app_id,
+                                           use_local, local_file)
+                print("\nFetching sales history...")
+                history = api.get_sales_history_many(names, currency, app_id)
+                for name in names:
+                    display_sales_history(name, history.get(name), currency)
             except Exception as e:
                 print(f"Error fetching sales history: {str(e)}")
                 
         elif choice == "3":
             print("\nFetching all items...")
-            items = api.get_items(currency, app_id, use_local=use_local, local_file=local_file)
-            display_items(items, currency)
+            try:
+                display_items(api.iter_items(currency, app_id, use_local=use_local, local_file=local_file),
+                              currency)
+            except FileNotFoundError as e:
+                print(f"Error: {str(e)}")
             
         elif choice == "4":
-            saved = api.get_saved_responses()
+            saved = api.get_snapshot_catalog()
             if not saved:
                 print("\nNo saved responses found.")
             else:
                 print("\nSaved responses:")
-                for file, timestamp in saved:
-                    dt = datetime.strptime(timestamp, "%Y%m%d_%H%M%S")
-                    print(f"{dt.strftime('%Y-%m-%d %H:%M:%S')} ({os.path.basename(file)})")
+                for entry in saved:
+                    print(f"{entry['time']} ({entry['file']})")
             
         elif choice == "5":
             print("\nGoodbye!")
@@ -323,6 +1631,10 @@ def main():
             
         else:
             print("\nInvalid option. Please try again.")
+            
+        if args.profile and choice in ["1", "2", "3"]:
+            print("\n" + format_summary(api.metrics.snapshot()))
+            api.metrics.reset()
         
         input("\nPress Enter to continue...")
 
@@ -0,0 +1,216 @@
+import json
+import sys
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, TextIO, Tuple
+
+# Shared do-nothing timer handed out while metrics are disabled
+_NULL_TIMER = nullcontext()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'phase', 'start')
+
+    def __init__(self, metrics: 'Metrics', phase: str):
+        self.metrics = metrics
+        self.phase = phase
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.phase, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Phase timers and counters for one client.
+
+    While disabled, timer() returns a shared no-op context manager and
+    count()/observe() return immediately, so instrumented code paths cost
+    one attribute check.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # phase -> [count, total seconds, max seconds, last seconds]
+        self._phases: Dict[str, list] = {}
+        # counter name -> {label pairs: value}
+        self._counters: Dict[str, Dict[Tuple, float]] = {}
+
+    def timer(self, phase: str):
+        """Context manager recording the duration of a phase."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, phase)
+
+    def observe(self, phase: str, seconds: float):
+        """Record one duration for a phase."""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._phases.get(phase)
+            if stats is None:
+                self._phases[phase] = [1, seconds, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+                stats[3] = seconds
+
+    def count(self, name: str, value: float = 1, **labels):
+        """Add to a counter, optionally split by labels (e.g. endpoint, status)."""
+        if not self.enabled:
+            return
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def reset(self):
+        with self._lock:
+            self._phases.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Get the recorded metrics.
+
+        Returns:
+            Dict with 'phases' (phase -> count, total, max and last seconds)
+            and 'counters' (name -> value, or label string -> value for
+            labelled counters, e.g. {"endpoint=/items,status=200": 3})
+        """
+        with self._lock:
+            phases = {phase: {'count': count, 'total': round(total, 6), 'max': round(peak, 6),
+                              'last': round(last, 6)}
+                      for phase, (count, total, peak, last) in self._phases.items()}
+            counters = {}
+            for name, series in self._counters.items():
+                if list(series) == [()]:
+                    counters[name] = series[()]
+                else:
+                    counters[name] = {",".join(f"{k}={v}" for k, v in key): value for key, value in series.items()}
+        return {'phases': phases, 'counters': counters}
+
+
+def _labels(pairs) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+def _parse_labels(text: str):
+    return [tuple(pair.split("=", 1)) for pair in text.split(",")] if text else []
+
+
+def render_prometheus(stats: Dict, prefix: str = "skinport") -> str:
+    """
+    Render combined client stats in the Prometheus text exposition format.
+
+    Args:
+        stats: Dict as returned by SkinportAPI.get_metrics
+        prefix: Metric name prefix
+
+    Returns:
+        Exposition text, one sample per line
+    """
+    lines = [f"# TYPE {prefix}_phase_seconds summary"]
+    for phase, values in sorted(stats.get('phases', {}).items()):
+        label = _labels([("phase", phase)])
+        lines.append(f"{prefix}_phase_seconds_count{label} {values['count']}")
+        lines.append(f"{prefix}_phase_seconds_sum{label} {values['total']}")
+    lines.append(f"# TYPE {prefix}_phase_seconds_max gauge")
+    for phase, values in sorted(stats.get('phases', {}).items()):
+        lines.append(f"{prefix}_phase_seconds_max{_labels([('phase', phase)])} {values['max']}")
+
+    for name, value in sorted(stats.get('counters', {}).items()):
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        series = value if isinstance(value, dict) else {"": value}
+        for label, sample in sorted(series.items()):
+            lines.append(f"{prefix}_{name}_total{_labels(_parse_labels(label))} {sample}")
+
+    for name, value in sorted(stats.get('fetch', {}).items()):
+        lines.append(f"# TYPE {prefix}_cache_{name}_total counter")
+        lines.append(f"{prefix}_cache_{name}_total {value}")
+
+    scheduler = stats.get('scheduler', {})
+    fields = sorted({field for values in scheduler.values() for field in values})
+    for field in fields:
+        lines.append(f"# TYPE {prefix}_scheduler_{field} gauge")
+        for endpoint, values in sorted(scheduler.items()):
+            lines.append(f"{prefix}_scheduler_{field}{_labels([('endpoint', endpoint)])} {values[field]}")
+    return "\n".join(lines) + "\n"
+
+
+def format_summary(stats: Dict) -> str:
+    """Human-readable table of phase timings and counters (for --profile)."""
+    lines = ["{:<12} {:>6} {:>10} {:>10} {:>10}".format("Phase", "Count", "Last (s)", "Total (s)", "Max (s)"),
+             "-" * 52]
+    for phase, values in stats.get('phases', {}).items():
+        lines.append("{:<12} {:>6} {:>10.3f} {:>10.3f} {:>10.3f}".format(
+            phase, values['count'], values['last'], values['total'], values['max']))
+    for name, value in stats.get('counters', {}).items():
+        if isinstance(value, dict):
+            for label, sample in value.items():
+                lines.append(f"{name}[{label}]: {sample:,}")
+        else:
+            lines.append(f"{name}: {value:,}")
+    return "\n".join(lines)
+
+
+class MetricsLogger:
+    """Write the stats as one JSON line every interval seconds on a daemon thread."""
+
+    def __init__(self, source: Callable[[], Dict], interval: float = 60, stream: Optional[TextIO] = None):
+        self.source = source
+        self.interval = interval
+        self.stream = stream
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self) -> 'MetricsLogger':
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            line = json.dumps({'timestamp': time.time(), **self.source()})
+            print(line, file=self.stream or sys.stderr, flush=True)
+
+
+def serve_prometheus(source: Callable[[], Dict], port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve the stats at /metrics in Prometheus format on a daemon thread.
+
+    Returns:
+        The running server (call shutdown() to stop it)
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus(source()).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
@@ -0,0 +1,125 @@
+import bisect
+import difflib
+import heapq
+import re
+from array import array
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set
+
+_TOKEN = re.compile(r"[0-9a-z]+")
+# Fuzzy candidates re-ranked by edit similarity
+FUZZY_CANDIDATES = 50
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a name into lowercase alphanumeric tokens ("AK-47 | Redline" -> ak, 47, redline)."""
+    return _TOKEN.findall(text.lower())
+
+
+def _trigrams(compact: str) -> Set[str]:
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class NameIndex:
+    """
+    Prefix and fuzzy search over market_hash_names.
+
+    Every word of a name is indexed in a sorted token list, so each query
+    word matches names with a word starting with it ("ak red" finds
+    "AK-47 | Redline (Field-Tested)"). Queries that match nothing that way
+    fall back to trigrams of the name with punctuation removed, which
+    catches run-together input like "ak47redl" and small typos.
+    Positions returned by match() are indexes into the names sequence.
+    """
+
+    def __init__(self, names: Sequence[Optional[str]]):
+        self.names = [name or "" for name in names]
+        self._lower = [name.lower() for name in self.names]
+        postings: Dict[str, array] = {}
+        trigrams: Dict[str, array] = {}
+        for i, name in enumerate(self._lower):
+            tokens = _TOKEN.findall(name)
+            for token in set(tokens):
+                postings.setdefault(token, array('I')).append(i)
+            for trigram in _trigrams("".join(tokens)):
+                trigrams.setdefault(trigram, array('I')).append(i)
+        self._tokens = sorted(postings)
+        self._postings = [postings[token] for token in self._tokens]
+        self._trigrams = trigrams
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _prefix_ids(self, token: str) -> Set[int]:
+        ids: Set[int] = set()
+        start = bisect.bisect_left(self._tokens, token)
+        for i in range(start, len(self._tokens)):
+            if not self._tokens[i].startswith(token):
+                break
+            ids.update(self._postings[i])
+        return ids
+
+    def _token_match(self, tokens: List[str]) -> Set[int]:
+        ids: Optional[Set[int]] = None
+        # Rarest-looking (longest) words first keeps the intersections small
+        for token in sorted(tokens, key=len, reverse=True):
+            found = self._prefix_ids(token)
+            ids = found if ids is None else ids & found
+            if not ids:
+                return set()
+        return ids or set()
+
+    def _trigram_counts(self, tokens: List[str]) -> Counter:
+        counts: Counter = Counter()
+        for trigram in _trigrams("".join(tokens)):
+            counts.update(self._trigrams.get(trigram, ()))
+        return counts
+
+    def match(self, query: str) -> Set[int]:
+        """
+        Get the positions of every name matching a query (for filtering).
+
+        Names match if each query word prefixes one of their words, or,
+        failing that, if they contain every trigram of the query.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return set(range(len(self.names)))
+        ids = self._token_match(tokens)
+        if ids:
+            return ids
+        needed = len(_trigrams("".join(tokens)))
+        if not needed:
+            return set()
+        return {i for i, count in self._trigram_counts(tokens).items() if count == needed}
+
+    def search(self, query: str, limit: int = 10) -> List[str]:
+        """
+        Get the best matching names for autocomplete, best first.
+
+        Word-prefix matches come first (names starting with the query ahead
+        of the rest, then shorter names); otherwise the names sharing the
+        most trigrams are ranked by similarity to the query.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        lowered = query.lower().strip()
+        ids = self._token_match(tokens)
+        if ids:
+            best = heapq.nsmallest(limit, ids, key=lambda i: (not self._lower[i].startswith(lowered),
+                                                              len(self._lower[i]), self._lower[i]))
+            return [self.names[i] for i in best]
+
+        counts = self._trigram_counts(tokens)
+        if not counts:
+            return []
+        candidates = [i for i, _ in counts.most_common(FUZZY_CANDIDATES)]
+        matcher = difflib.SequenceMatcher(b=lowered, autojunk=False)
+
+        def similarity(i: int) -> float:
+            matcher.set_seq1(self._lower[i])
+            return matcher.ratio()
+
+        best = heapq.nlargest(limit, candidates, key=similarity)
+        return [self.names[i] for i in best]
@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+PRICE_FIELDS = ('min_price', 'suggested_price', 'max_price', 'mean_price', 'median_price', 'quantity')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    market_hash_name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    timestamp INTEGER NOT NULL,
+    currency TEXT,
+    app_id INTEGER,
+    source TEXT UNIQUE
+);
+CREATE TABLE IF NOT EXISTS prices (
+    snapshot_id INTEGER NOT NULL REFERENCES snapshots(id),
+    item_id INTEGER NOT NULL REFERENCES items(id),
+    timestamp INTEGER NOT NULL,
+    min_price REAL,
+    suggested_price REAL,
+    max_price REAL,
+    mean_price REAL,
+    median_price REAL,
+    quantity INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_prices_item_time ON prices(item_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_prices_time ON prices(timestamp);
+"""
+
+
+def _epoch(value) -> int:
+    return int(value.timestamp()) if isinstance(value, datetime) else int(value)
+
+
+class PriceHistoryStore:
+    """
+    SQLite time series of item prices, one row per item per saved snapshot.
+
+    Rows are indexed by (item, timestamp) for per-item history and by
+    timestamp for range scans. Timestamps are datetimes in the API and
+    Unix seconds in the database.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._item_ids: Dict[str, int] = {}
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _ids_for(self, names: List[str]) -> Dict[str, int]:
+        missing = [name for name in names if name not in self._item_ids]
+        if missing:
+            self._conn.executemany("INSERT OR IGNORE INTO items (market_hash_name) VALUES (?)",
+                                   ((name,) for name in missing))
+            # Chunk the lookup to stay under SQLite's bound parameter limit
+            for start in range(0, len(missing), 500):
+                chunk = missing[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT id, market_hash_name FROM items WHERE market_hash_name IN ({','.join('?' * len(chunk))})",
+                    chunk)
+                self._item_ids.update((row['market_hash_name'], row['id']) for row in rows)
+        return self._item_ids
+
+    def has_source(self, source: str) -> bool:
+        """Whether a snapshot file has already been recorded."""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM snapshots WHERE source = ?", (source,)).fetchone()
+        return row is not None
+
+    def append(self, items: Iterable[Dict], timestamp: datetime, currency: Optional[str] = None,
+               app_id: Optional[int] = None, source: Optional[str] = None) -> int:
+        """
+        Record the prices from one snapshot.
+
+        Args:
+            items: Items as returned by the /v1/items endpoint
+            timestamp: When the snapshot was taken
+            currency: Currency code of the prices
+            app_id: Game ID the items belong to
+            source: Saved response file the items came from (recorded only once)
+
+        Returns:
+            Number of price rows written
+        """
+        items = [item for item in items if item.get('market_hash_name')]
+        ts = _epoch(timestamp)
+        with self._lock, self._conn:
+            if source is not None:
+                if self._conn.execute("SELECT 1 FROM snapshots WHERE source = ?", (source,)).fetchone():
+                    return 0
+            snapshot_id = self._conn.execute(
+                "INSERT INTO snapshots (timestamp, currency, app_id, source) VALUES (?, ?, ?, ?)",
+                (ts, currency, app_id, source)).lastrowid
+            ids = self._ids_for([item['market_hash_name'] for item in items])
+            self._conn.executemany(
+                "INSERT INTO prices (snapshot_id, item_id, timestamp, min_price, suggested_price, max_price, "
+                "mean_price, median_price, quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                ((snapshot_id, ids[item['market_hash_name']], ts, *(item.get(field) for field in PRICE_FIELDS))
+                 for item in items))
+        return len(items)
+
+    def _query(self, where: str, params: list, currency: str, app_id: Optional[int], order: str,
+               limit: Optional[int] = None) -> List[Dict]:
+        # Always filter by currency: prices of different currencies can't be compared
+        if not currency:
+            raise ValueError("A currency is required to query price history")
+        sql = ("SELECT i.market_hash_name, p.timestamp, s.currency, s.app_id, "
+               + ", ".join(f"p.{field}" for field in PRICE_FIELDS) +
+               " FROM prices p JOIN items i ON i.id = p.item_id JOIN snapshots s ON s.id = p.snapshot_id"
+               f" WHERE {where} AND s.currency = ?")
+        params = params + [currency]
+        if app_id is not None:
+            sql += " AND s.app_id = ?"
+            params.append(app_id)
+        sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [dict(row, timestamp=datetime.fromtimestamp(row['timestamp'])) for row in rows]
+
+    def history(self, market_hash_name: str, since: Optional[datetime] = None,
+                until: Optional[datetime] = None, currency: str = "EUR",
+                app_id: Optional[int] = None) -> List[Dict]:
+        """Get one item's recorded prices in a currency (and game, if given), oldest first."""
+        where = "p.item_id = (SELECT id FROM items WHERE market_hash_name = ?)"
+        params = [market_hash_name]
+        if since is not None:
+            where += " AND p.timestamp >= ?"
+            params.append(_epoch(since))
+        if until is not None:
+            where += " AND p.timestamp <= ?"
+            params.append(_epoch(until))
+        return self._query(where, params, currency, app_id, "p.timestamp")
+
+    def price_at(self, market_hash_name: str, when: datetime, currency: str = "EUR",
+                 app_id: Optional[int] = None) -> Optional[Dict]:
+        """Get an item's latest recorded prices in a currency at or before a point in time."""
+        where = "p.item_id = (SELECT id FROM items WHERE market_hash_name = ?) AND p.timestamp <= ?"
+        rows = self._query(where, [market_hash_name, _epoch(when)], currency, app_id, "p.timestamp DESC", limit=1)
+        return rows[0] if rows else None
+
+    def range(self, start: datetime, end: datetime, currency: str = "EUR",
+              app_id: Optional[int] = None) -> List[Dict]:
+        """Get every recorded price in a currency between two points in time, oldest first."""
+        return self._query("p.timestamp BETWEEN ? AND ?", [_epoch(start), _epoch(end)], currency, app_id,
+                           "p.timestamp, i.market_hash_name")
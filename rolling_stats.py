@@ -0,0 +1,233 @@
+import math
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Days of history behind the 30-day low and volatility, and the 7-day median
+WINDOW_DAYS = 30
+MEDIAN_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS daily (
+    currency TEXT NOT NULL,
+    market_hash_name TEXT NOT NULL,
+    day INTEGER NOT NULL,
+    low REAL NOT NULL,
+    count INTEGER NOT NULL,
+    total REAL NOT NULL,
+    total_sq REAL NOT NULL,
+    PRIMARY KEY (currency, market_hash_name, day)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS priors (
+    currency TEXT NOT NULL,
+    market_hash_name TEXT NOT NULL,
+    last_day INTEGER NOT NULL,
+    prior_low REAL,
+    prior_count INTEGER NOT NULL,
+    prior_total REAL NOT NULL,
+    prior_total_sq REAL NOT NULL,
+    prior_means TEXT NOT NULL,
+    PRIMARY KEY (currency, market_hash_name)
+) WITHOUT ROWID;
+"""
+
+
+class _ItemState:
+    """An item's bucket for its latest day plus the aggregate of the days before it."""
+    __slots__ = ('day', 'low', 'count', 'total', 'total_sq',
+                 'prior_low', 'prior_count', 'prior_total', 'prior_total_sq', 'prior_means')
+
+    def __init__(self, day: int, low: float = math.inf, count: int = 0, total: float = 0.0,
+                 total_sq: float = 0.0):
+        self.day = day
+        self.low, self.count, self.total, self.total_sq = low, count, total, total_sq
+        self.set_prior(None, 0, 0.0, 0.0, ())
+
+    def set_prior(self, low: Optional[float], count: int, total: float, total_sq: float,
+                  means: Tuple[float, ...]):
+        self.prior_low, self.prior_count = low, count
+        self.prior_total, self.prior_total_sq = total, total_sq
+        self.prior_means = means
+
+    def add(self, price: float):
+        self.low = min(self.low, price)
+        self.count += 1
+        self.total += price
+        self.total_sq += price * price
+
+    def summary(self) -> Dict:
+        """Combine the latest bucket with the prior aggregate, in constant time."""
+        count = self.prior_count + self.count
+        mean = (self.prior_total + self.total) / count
+        variance = max((self.prior_total_sq + self.total_sq) / count - mean * mean, 0.0)
+        means = sorted(self.prior_means + (self.total / self.count,))
+        mid = len(means) // 2
+        median = means[mid] if len(means) % 2 else (means[mid - 1] + means[mid]) / 2
+        return {
+            'last_day': self.day,
+            'median_7d': median,
+            'low_30d': self.prior_low,
+            'volatility': math.sqrt(variance) / mean if mean > 0 else None,
+            'samples': count,
+        }
+
+
+class RollingStatsIndex:
+    """
+    Per-item rolling price statistics, updated as snapshots are saved.
+
+    Prices are bucketed per item and day (low, count, sum and sum of squares
+    of min_price). Each item also keeps the aggregate of the buckets before
+    its latest day, so a snapshot from the same day updates an item in
+    constant time; the aggregates are recomputed in SQL only when an item's
+    day rolls over. Buckets and aggregates are persisted in SQLite, so
+    queries never scan snapshots.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._states: Dict[str, Dict[str, _ItemState]] = {}
+        self._stats: Dict[str, Dict[str, Dict]] = {}
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _load(self, currency: str) -> Dict[str, _ItemState]:
+        states = self._states.get(currency)
+        if states is not None:
+            return states
+        states, stats = {}, {}
+        rows = self._conn.execute(
+            "SELECT p.market_hash_name, p.last_day, p.prior_low, p.prior_count, p.prior_total, "
+            "p.prior_total_sq, p.prior_means, d.low, d.count, d.total, d.total_sq FROM priors p "
+            "JOIN daily d ON d.currency = p.currency AND d.market_hash_name = p.market_hash_name "
+            "AND d.day = p.last_day WHERE p.currency = ?", (currency,))
+        for (name, day, prior_low, prior_count, prior_total, prior_total_sq, prior_means,
+             low, count, total, total_sq) in rows:
+            state = _ItemState(day, low, count, total, total_sq)
+            means = tuple(float(m) for m in prior_means.split(",")) if prior_means else ()
+            state.set_prior(prior_low, prior_count, prior_total, prior_total_sq, means)
+            states[name] = state
+            stats[name] = state.summary()
+        self._states[currency] = states
+        self._stats[currency] = stats
+        return states
+
+    def _refresh_priors(self, currency: str, states: Dict[str, _ItemState], names: Iterable[str]):
+        """Recompute the prior aggregates of items whose latest day changed."""
+        by_day: Dict[int, set] = {}
+        for name in names:
+            by_day.setdefault(states[name].day, set()).add(name)
+        for day, wanted in by_day.items():
+            means: Dict[str, List[float]] = {}
+            for name, mean in self._conn.execute(
+                    "SELECT market_hash_name, total / count FROM daily "
+                    "WHERE currency = ? AND day > ? AND day < ?", (currency, day - MEDIAN_DAYS, day)):
+                if name in wanted:
+                    means.setdefault(name, []).append(mean)
+            totals = self._conn.execute(
+                "SELECT market_hash_name, MIN(low), SUM(count), SUM(total), SUM(total_sq) FROM daily "
+                "WHERE currency = ? AND day >= ? AND day < ? GROUP BY market_hash_name",
+                (currency, day - WINDOW_DAYS, day))
+            for name, low, count, total, total_sq in totals:
+                if name in wanted:
+                    states[name].set_prior(low, count, total, total_sq, tuple(means.get(name, ())))
+
+    def update(self, items: Iterable[Dict], timestamp: datetime, currency: Optional[str]) -> int:
+        """
+        Add one snapshot's min_prices to the daily buckets and refresh the summaries.
+
+        Args:
+            items: Items as returned by the /v1/items endpoint
+            timestamp: When the snapshot was taken
+            currency: Currency code of the prices
+
+        Returns:
+            Number of items updated
+        """
+        currency = currency or ""
+        day = timestamp.toordinal()
+        touched: List[str] = []
+        rolled: List[str] = []
+        # Prices from before an item's latest day go straight into that day's bucket
+        late: List[Tuple] = []
+        with self._lock:
+            states = self._load(currency)
+            for item in items:
+                name = item.get('market_hash_name')
+                price = item.get('min_price')
+                if not name or price is None:
+                    continue
+                state = states.get(name)
+                if state is None or day > state.day:
+                    states[name] = state = _ItemState(day)
+                    rolled.append(name)
+                elif day < state.day:
+                    # Snapshots older than the window can't change the stats
+                    if day >= state.day - WINDOW_DAYS:
+                        late.append((currency, name, day, price, price, price * price))
+                        rolled.append(name)
+                    continue
+                state.add(price)
+                touched.append(name)
+
+            with self._conn:
+                self._conn.executemany(
+                    "INSERT INTO daily (currency, market_hash_name, day, low, count, total, total_sq) "
+                    "VALUES (?, ?, ?, ?, 1, ?, ?) ON CONFLICT (currency, market_hash_name, day) DO UPDATE SET "
+                    "low = MIN(low, excluded.low), count = count + 1, total = total + excluded.total, "
+                    "total_sq = total_sq + excluded.total_sq", late)
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO daily (currency, market_hash_name, day, low, count, total, total_sq) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    ((currency, name, states[name].day, states[name].low, states[name].count,
+                      states[name].total, states[name].total_sq) for name in touched))
+                if rolled:
+                    self._refresh_priors(currency, states, rolled)
+                    self._conn.execute("DELETE FROM daily WHERE currency = ? AND day < ?",
+                                       (currency, day - WINDOW_DAYS))
+
+                    # Aggregates only change when the day does
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO priors (currency, market_hash_name, last_day, prior_low, "
+                        "prior_count, prior_total, prior_total_sq, prior_means) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                        ((currency, name, states[name].day, states[name].prior_low, states[name].prior_count,
+                          states[name].prior_total, states[name].prior_total_sq,
+                          ",".join(repr(m) for m in states[name].prior_means)) for name in dict.fromkeys(rolled)))
+
+            stats = self._stats[currency]
+            updated = dict.fromkeys(touched + rolled)
+            for name in updated:
+                stats[name] = states[name].summary()
+        return len(updated)
+
+    def stats(self, currency: str) -> Dict[str, Dict]:
+        """
+        Get the current summary of every item in a currency.
+
+        Returns:
+            Dict mapping market_hash_name to median_7d (median of the daily
+            average prices over 7 days), low_30d (lowest price in the 30 days
+            before the latest day, so a new low stands out against it),
+            volatility (coefficient of variation over 30 days), samples and
+            last_day (the date ordinal of the latest price)
+        """
+        with self._lock:
+            self._load(currency)
+            return dict(self._stats[currency])
+
+    def clear(self):
+        """Drop all buckets and summaries (e.g. before a rebuild)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM daily")
+            self._conn.execute("DELETE FROM priors")
+            self._states.clear()
+            self._stats.clear()
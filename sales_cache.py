@@ -0,0 +1,80 @@
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class SalesHistoryCache:
+    """
+    In-memory sales history cache backed by a JSON file on disk.
+
+    Entries are keyed by (market_hash_name, currency, app_id) and expire after
+    ttl seconds. Names without any sales are cached as None so they are not
+    requested again until they expire.
+    """
+
+    def __init__(self, path: str, ttl: float = 3600):
+        self.path = path
+        self.ttl = ttl
+        self._entries: Optional[Dict[str, Dict]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(market_hash_name: str, currency: str, app_id: int) -> str:
+        return f"{currency}|{app_id}|{market_hash_name}"
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._entries is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+            self._evict()
+        return self._entries
+
+    def _evict(self):
+        cutoff = time.time() - self.ttl
+        expired = [key for key, entry in self._entries.items() if entry['cached_at'] < cutoff]
+        for key in expired:
+            del self._entries[key]
+
+    def lookup(self, names: Iterable[str], currency: str, app_id: int) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+        """
+        Split names into cached results and names that still need fetching.
+
+        Returns:
+            Tuple of (cached results by name, list of missing names)
+        """
+        found, missing = {}, []
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            entries = self._load()
+            for name in names:
+                entry = entries.get(self._key(name, currency, app_id))
+                if entry and entry['cached_at'] >= cutoff:
+                    found[name] = entry['data']
+                else:
+                    missing.append(name)
+        return found, missing
+
+    def store(self, results: Dict[str, Optional[Dict]], currency: str, app_id: int):
+        """Add fetched results to the cache and persist it."""
+        now = time.time()
+        with self._lock:
+            entries = self._load()
+            for name, data in results.items():
+                entries[self._key(name, currency, app_id)] = {'cached_at': now, 'data': data}
+            self._evict()
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Drop all cached entries, in memory and on disk."""
+        with self._lock:
+            self._entries = {}
+            if os.path.exists(self.path):
+                os.remove(self.path)
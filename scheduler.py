@@ -0,0 +1,192 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+# Request priorities (lower runs first)
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# Skinport allows 8 requests per 5 minutes on its public endpoints
+DEFAULT_LIMITS: Dict[str, Tuple[int, float]] = {
+    '/items': (8, 300.0),
+    '/sales/history': (8, 300.0),
+}
+DEFAULT_LIMIT = (8, 300.0)
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (seconds or HTTP date) into a delay in seconds."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Endpoint:
+    """Token bucket and wait queue for one endpoint."""
+
+    def __init__(self, capacity: int, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.waiters = []
+        self.requests = 0
+        self.throttled = 0
+        self.retries = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token can be taken."""
+        delay = max(0.0, self.blocked_until - now)
+        if self.tokens < 1:
+            delay = max(delay, (1 - self.tokens) / self.rate)
+        return delay
+
+
+class RequestScheduler:
+    """
+    Per-endpoint token buckets shared by every thread using a SkinportAPI.
+
+    Requests wait for a token in priority order (interactive before
+    background, FIFO within a priority). 429 and 5xx responses are retried
+    after the server's Retry-After delay, or a jittered exponential backoff
+    when there is none, and the endpoint is held back for everyone meanwhile.
+    """
+
+    def __init__(self, limits: Optional[Dict[str, Tuple[int, float]]] = None,
+                 max_retries: int = 4, backoff_base: float = 1.0, backoff_max: float = 60.0):
+        self.limits = dict(DEFAULT_LIMITS if limits is None else limits)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._endpoints: Dict[str, _Endpoint] = {}
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+
+    def _endpoint(self, endpoint: str) -> _Endpoint:
+        state = self._endpoints.get(endpoint)
+        if state is None:
+            state = self._endpoints[endpoint] = _Endpoint(*self.limits.get(endpoint, DEFAULT_LIMIT))
+        return state
+
+    def acquire(self, endpoint: str, priority: int = INTERACTIVE) -> float:
+        """
+        Block until a request to the endpoint may be sent.
+
+        Returns:
+            Seconds spent waiting
+        """
+        start = time.monotonic()
+        with self._cond:
+            state = self._endpoint(endpoint)
+            ticket = (priority, next(self._seq))
+            heapq.heappush(state.waiters, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    state.refill(now)
+                    delay = state.delay(now)
+                    if state.waiters[0] == ticket and delay == 0:
+                        state.tokens -= 1
+                        break
+                    self._cond.wait(timeout=delay if state.waiters[0] == ticket else None)
+            finally:
+                state.waiters.remove(ticket)
+                heapq.heapify(state.waiters)
+                self._cond.notify_all()
+
+            waited = time.monotonic() - start
+            state.requests += 1
+            state.total_wait += waited
+            state.max_wait = max(state.max_wait, waited)
+        return waited
+
+    def hold(self, endpoint: str, seconds: float, throttled: bool = False):
+        """
+        Stop handing out tokens for an endpoint for the given time.
+
+        Args:
+            endpoint: Endpoint path used as the bucket key
+            seconds: How long to hold requests back
+            throttled: The server reported we're out of quota; only allow a
+                single retry once the hold ends instead of a burst
+        """
+        with self._cond:
+            state = self._endpoint(endpoint)
+            state.blocked_until = max(state.blocked_until, time.monotonic() + seconds)
+            if throttled:
+                state.refill(time.monotonic())
+                state.tokens = min(state.tokens, 1.0)
+            self._cond.notify_all()
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter exponential backoff delay for a retry attempt."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def run(self, endpoint: str, send: Callable, priority: int = INTERACTIVE):
+        """
+        Send a request through the endpoint's bucket, retrying throttled responses.
+
+        Args:
+            endpoint: Endpoint path used as the bucket key (e.g. '/items')
+            send: Callable performing the request and returning a requests.Response
+            priority: INTERACTIVE or BACKGROUND
+
+        Returns:
+            The first response that is not retried, or the last one
+        """
+        attempt = 0
+        while True:
+            self.acquire(endpoint, priority)
+            response = send()
+            if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                return response
+
+            delay = parse_retry_after(response.headers.get('Retry-After'))
+            delay = self.backoff(attempt) if delay is None else delay + random.uniform(0, 1)
+            with self._cond:
+                state = self._endpoint(endpoint)
+                state.retries += 1
+                if response.status_code == 429:
+                    state.throttled += 1
+            response.close()
+            self.hold(endpoint, delay, throttled=response.status_code == 429)
+            attempt += 1
+
+    def stats(self) -> Dict[str, Dict]:
+        """Get queue depth, wait times and retry counters per endpoint."""
+        with self._cond:
+            now = time.monotonic()
+            result = {}
+            for endpoint, state in self._endpoints.items():
+                state.refill(now)
+                result[endpoint] = {
+                    'queue_depth': len(state.waiters),
+                    'tokens': round(state.tokens, 2),
+                    'requests': state.requests,
+                    'throttled': state.throttled,
+                    'retries': state.retries,
+                    'total_wait': round(state.total_wait, 3),
+                    'max_wait': round(state.max_wait, 3),
+                    'avg_wait': round(state.total_wait / state.requests, 3) if state.requests else 0.0,
+                }
+            return result
@@ -0,0 +1,61 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+
+def file_stamp(path: str) -> Tuple[int, int]:
+    """Modification time and size of a file, which change whenever it is rewritten."""
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class SnapshotCache:
+    """
+    Least-recently-used cache of loaded snapshots.
+
+    Entries are keyed by file path and stamped with the file's mtime and
+    size, so a snapshot that was rewritten on disk is loaded again instead
+    of being served stale. At most max_entries snapshots are kept. Cached
+    item lists are shared between callers and must not be modified.
+
+    Evicted and invalidated entries are only dereferenced, not closed,
+    since a caller may still be reading them; a ColumnarSnapshot releases
+    its memory mapping once the last reference to it is gone.
+    """
+
+    def __init__(self, max_entries: int = 4):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, int], Sequence[Dict]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, stamp: Tuple[int, int]) -> Optional[Sequence[Dict]]:
+        """Get the items loaded from a file, or None if not cached for this stamp."""
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != stamp:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, path: str, stamp: Tuple[int, int], items: Sequence[Dict]):
+        """Cache the items loaded from a file, evicting the least recently used."""
+        key = os.path.abspath(path)
+        with self._lock:
+            self._entries[key] = (stamp, items)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, paths: Optional[Iterable[str]] = None):
+        """Drop the given files from the cache, or everything if paths is None."""
+        with self._lock:
+            if paths is None:
+                self._entries.clear()
+                return
+            for path in paths:
+                self._entries.pop(os.path.abspath(path), None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,118 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import threading
+import zlib
+from typing import Callable, Dict, List, Optional, TextIO
+
+# New snapshots are gzip-compressed JSON; older ones are plain (pretty-printed) JSON
+COMPRESSED_EXTENSION = ".json.gz"
+PLAIN_EXTENSION = ".json"
+# Streamed responses while they download (gzip-compressed JSON, not listed as snapshots)
+PART_EXTENSION = ".part.gz"
+# Fast enough to keep up with polling while still shrinking payloads ~10x
+COMPRESSLEVEL = 6
+
+
+def snapshot_base(path: str) -> str:
+    """Strip the .json or .json.gz extension from a saved response path."""
+    for extension in (COMPRESSED_EXTENSION, PLAIN_EXTENSION):
+        if path.endswith(extension):
+            return path[:-len(extension)]
+    return path
+
+
+def is_json_snapshot(path: str) -> bool:
+    return path.endswith(COMPRESSED_EXTENSION) or path.endswith(PLAIN_EXTENSION)
+
+
+def open_snapshot(path: str) -> TextIO:
+    """Open a saved JSON response for reading text, compressed or not."""
+    if path.endswith(".gz"):
+        return gzip.open(path, 'rt', encoding='utf-8')
+    return open(path, 'r', encoding='utf-8')
+
+
+def read_snapshot(path: str) -> List[Dict]:
+    """
+    Load a saved JSON response, compressed or not.
+
+    gzip's CRC-32 trailer is verified on the way, so a damaged or truncated
+    compressed file raises instead of loading partially.
+    """
+    try:
+        with open_snapshot(path) as f:
+            return json.load(f)
+    except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+        raise ValueError(f"Corrupt snapshot {path}: {str(e)}") from e
+
+
+def write_snapshot_json(path: str, data: List[Dict], compresslevel: int = COMPRESSLEVEL) -> str:
+    """
+    Atomically write a compressed JSON snapshot.
+
+    The data goes to a temporary file that is flushed to disk and then
+    renamed over the target, so readers never see a partial snapshot.
+    """
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=compresslevel, mtime=0) as gz:
+                gz.write(json.dumps(data, separators=(',', ':')).encode('utf-8'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return path
+
+
+class SnapshotWriter:
+    """
+    Persist snapshots on a background thread.
+
+    submit() returns immediately unless max_pending snapshots are already
+    waiting, in which case it blocks until the writer catches up. Pending
+    snapshots are flushed at interpreter exit.
+    """
+
+    def __init__(self, write: Callable, max_pending: int = 4):
+        self._write = write
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="snapshot-writer", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+
+    def submit(self, *args):
+        """Queue a call to the write function."""
+        self._start()
+        self._queue.put(args)
+
+    def pending(self) -> int:
+        """Number of snapshots queued or being written."""
+        return self._queue.unfinished_tasks
+
+    def flush(self):
+        """Wait until every queued snapshot is written."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self):
+        while True:
+            args = self._queue.get()
+            try:
+                self._write(*args)
+            except Exception as e:
+                print(f"Error saving snapshot: {str(e)}")
+            finally:
+                self._queue.task_done()
@@ -0,0 +1,94 @@
+import codecs
+import json
+from typing import Any, Iterable, Iterator, Union
+
+
+class _ArrayParser:
+    """State machine that pulls complete elements out of a growing JSON array buffer."""
+
+    def __init__(self):
+        self.decoder = json.JSONDecoder()
+        self.buf = ""
+        self.pos = 0
+        self.started = False
+        self.finished = False
+        self.expect_value = True
+        self.after_comma = False
+
+    def _skip_ws(self, i: int) -> int:
+        buf = self.buf
+        while i < len(buf) and buf[i] in " \t\r\n":
+            i += 1
+        return i
+
+    def feed(self, text: str, eof: bool = False) -> Iterator[Any]:
+        self.buf = self.buf[self.pos:] + text
+        self.pos = 0
+
+        while not self.finished:
+            pos = self._skip_ws(self.pos)
+            self.pos = pos
+            if pos >= len(self.buf):
+                break
+            char = self.buf[pos]
+            if not self.started:
+                if char != '[':
+                    raise ValueError("Expected a JSON array")
+                self.started = True
+                self.pos += 1
+            elif char == ']':
+                if self.after_comma:
+                    raise ValueError("Trailing comma in JSON array")
+                self.finished = True
+            elif not self.expect_value:
+                if char != ',':
+                    raise ValueError(f"Expected ',' or ']' in JSON array, got {char!r}")
+                self.expect_value = True
+                self.after_comma = True
+                self.pos += 1
+            else:
+                try:
+                    value, end = self.decoder.raw_decode(self.buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    # Most likely an element split across chunks; wait for more data
+                    break
+                # A number at the end of the buffer may continue in the next chunk,
+                # also when the chunk ends after its "." or exponent marker
+                if not eof and (self._skip_ws(end) >= len(self.buf) or
+                                isinstance(value, (int, float)) and self.buf[end] in ".eE+-"):
+                    break
+                self.pos = end
+                self.expect_value = False
+                self.after_comma = False
+                yield value
+
+        if eof and not self.finished:
+            raise ValueError("Truncated JSON array")
+
+
+def iter_json_array(chunks: Iterable[Union[bytes, str]]) -> Iterator[Any]:
+    """
+    Incrementally parse a top-level JSON array, yielding one element at a time.
+
+    Only the current chunk and the element being decoded are kept in memory,
+    so peak memory does not grow with the size of the payload.
+
+    Args:
+        chunks: Raw UTF-8 bytes or text chunks, e.g. from Response.iter_content
+            or successive file reads
+
+    Raises:
+        ValueError: If the data is not a well-formed JSON array
+    """
+    parser = _ArrayParser()
+    utf8 = codecs.getincrementaldecoder('utf-8')()
+    for chunk in chunks:
+        if isinstance(chunk, bytes):
+            chunk = utf8.decode(chunk)
+        if chunk:
+            yield from parser.feed(chunk)
+        if parser.finished:
+            return
+    yield from parser.feed(utf8.decode(b"", final=True), eof=True)
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import main
+
+
+class FakeClock:
+    """Stands in for main.datetime so every save gets its own timestamp."""
+
+    def __init__(self, start: datetime):
+        self.current = start
+
+    def advance(self, **kwargs):
+        self.current += timedelta(**kwargs)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock(datetime(2026, 1, 1, 12, 0, 0))
+
+    class ClockDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return fake.current
+
+    monkeypatch.setattr(main, "datetime", ClockDatetime)
+    return fake
+
+
+
+@pytest.fixture
+def fake_server(tmp_path):
+    """Start local fake Skinport servers serving generated items; stopped after the test."""
+    from fake_server import FakeServerConfig, FakeSkinportServer, SnapshotReplay
+
+    servers = []
+
+    def start(synthetic: int = 200, **config):
+        replay = SnapshotReplay(str(tmp_path / f"server{len(servers)}"), synthetic=synthetic)
+        servers.append(FakeSkinportServer(replay, FakeServerConfig(seed=1, **config)).start())
+        return servers[-1]
+
+    yield start
+    for server in servers:
+        server.stop()
@@ -0,0 +1,10 @@
+from typing import Dict, List
+
+
+def make_items(count: int = 5, currency: str = "EUR", price: float = 10.0) -> List[Dict]:
+    """Build items shaped like /v1/items rows, "Item 0" to "Item <count - 1>"."""
+    return [{'market_hash_name': f"Item {i}", 'currency': currency, 'suggested_price': price + i,
+             'item_page': f"https://skinport.com/item/{i}", 'market_page': f"https://skinport.com/market/{i}",
+             'min_price': price + i - 1, 'max_price': price + i + 1, 'mean_price': price + i,
+             'median_price': price + i, 'quantity': i + 1, 'created_at': 1700000000, 'updated_at': 1700000000 + i}
+            for i in range(count)]
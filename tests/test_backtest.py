@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+import backtest
+from backtest import backtest as run_backtest
+from backtest import plan_shards, rule_grid
+from main import SkinportAPI
+from tests.helpers import make_items
+
+GRID = rule_grid([0, 10, 25], [0, 15, 30])
+
+
+def evolve(items, rng):
+    """Next snapshot: some items repriced, bought, delisted or newly listed."""
+    result = []
+    for item in items:
+        roll = rng.random()
+        if roll < 0.1:
+            continue
+        item = dict(item)
+        if roll < 0.4:
+            item['min_price'] = round(item['suggested_price'] * rng.uniform(0.5, 1.1), 2)
+        elif roll < 0.6:
+            item['quantity'] = max(item['quantity'] - 1, 0)
+        result.append(item)
+    result.extend(dict(item, market_hash_name=f"New {rng.random()}") for item in make_items(2, items[0]['currency']))
+    return result
+
+
+@pytest.fixture
+def snapshots(tmp_path, clock):
+    """Save 6 snapshots each of two markets; returns them oldest first per market."""
+    rng = random.Random(3)
+    api = SkinportAPI(data_dir=str(tmp_path))
+    saved = {}
+    for currency in ("EUR", "USD"):
+        items = make_items(40, currency)
+        for item in items:
+            item['min_price'] = round(item['suggested_price'] * rng.uniform(0.5, 1.1), 2)
+        items[0]['min_price'] = None
+        for _ in range(6):
+            api._save_response(items, currency, 730)
+            saved.setdefault(currency, []).append(items)
+            clock.advance(minutes=5)
+            items = evolve(items, rng)
+    return str(tmp_path), saved
+
+
+def expected_summary(saved):
+    """Replay every rule over every consecutive pair of snapshots, item by item."""
+    totals = {rule: [0, 0, 0, 0, 0.0] for rule in GRID}
+    pairs = 0
+    for history in saved.values():
+        for before, after in zip(history, history[1:]):
+            pairs += 1
+            later = {item['market_hash_name']: item for item in after}
+            for item in before:
+                cur, sug = item['min_price'], item['suggested_price']
+                if not cur or not sug:
+                    continue
+                discount = (sug - cur) / sug * 100
+                now = later.get(item['market_hash_name'])
+                bought = now is None or not now['min_price'] or now['quantity'] < item['quantity']
+                repriced = not (now is None or not now['min_price']) and now['min_price'] != cur
+                for rule in GRID:
+                    if discount >= rule[0] and cur >= rule[1]:
+                        stats = totals[rule]
+                        stats[0] += 1
+                        stats[1] += bought
+                        stats[2] += repriced
+                        stats[3] += not (bought or repriced)
+                        stats[4] += round(discount, 2)
+    return pairs, totals
+
+
+def assert_summary(rows, saved):
+    pairs, totals = expected_summary(saved)
+    assert [(row['min_discount_percent'], row['min_price']) for row in rows] == GRID
+    for row in rows:
+        hits, bought, repriced, unchanged, discount_total = totals[(row['min_discount_percent'], row['min_price'])]
+        assert row['snapshots'] == pairs
+        assert row['hits'] == hits
+        assert row['bought_percent'] == pytest.approx(bought / hits * 100, abs=0.01)
+        assert row['repriced_percent'] == pytest.approx(repriced / hits * 100, abs=0.01)
+        assert row['unchanged_percent'] == pytest.approx(unchanged / hits * 100, abs=0.01)
+        assert row['avg_discount_percent'] == pytest.approx(discount_total / hits, abs=0.01)
+
+
+@pytest.mark.parametrize("workers, shard_size", [(1, 50), (1, 2), (2, 1)])
+def test_matches_brute_force(snapshots, workers, shard_size):
+    data_dir, saved = snapshots
+    assert_summary(run_backtest(data_dir, GRID, workers=workers, shard_size=shard_size, progress=None), saved)
+
+
+def test_currency_filter(snapshots):
+    data_dir, saved = snapshots
+    rows = run_backtest(data_dir, GRID, workers=1, currency="USD", progress=None)
+    assert_summary(rows, {"USD": saved["USD"]})
+
+
+def test_plan_shards_covers_every_pair_once():
+    entries = [{'path': f"{currency}{i}", 'file': f"{currency}{i}", 'timestamp': f"2026010{i}_000000",
+                'currency': currency, 'app_id': 730} for currency in ("EUR", "USD") for i in range(7)]
+    shards = plan_shards(entries[::-1], shard_size=4)
+    assert shards == [["EUR0", "EUR1", "EUR2", "EUR3", "EUR4"], ["EUR4", "EUR5", "EUR6"],
+                      ["USD0", "USD1", "USD2", "USD3", "USD4"], ["USD4", "USD5", "USD6"]]
+    assert plan_shards(entries, shard_size=4, currency="USD") == shards[2:]
+
+
+def test_resumes_from_checkpoint(snapshots, tmp_path, monkeypatch):
+    data_dir, saved = snapshots
+    checkpoint = str(tmp_path / "checkpoint.json")
+    first = run_backtest(data_dir, GRID, workers=1, shard_size=2, checkpoint=checkpoint, progress=None)
+
+    def fail(*args):
+        raise AssertionError("shard evaluated again")
+
+    monkeypatch.setattr(backtest, "run_shard", fail)
+    assert run_backtest(data_dir, GRID, workers=1, shard_size=2, checkpoint=checkpoint, progress=None) == first
+    # A checkpoint of another rule grid is ignored
+    with pytest.raises(AssertionError, match="evaluated again"):
+        run_backtest(data_dir, GRID[:2], workers=1, shard_size=2, checkpoint=checkpoint, progress=None)
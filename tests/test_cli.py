@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+import sys
+
+import pytest
+
+from export import DISCOUNT_FIELDS, ITEM_FIELDS, write_rows
+from main import SkinportAPI, needs_credentials, parse_args, run_command
+from tests.helpers import make_items
+from watch import NdjsonSink, StdoutSink
+
+
+@pytest.fixture
+def saved(tmp_path, clock, monkeypatch):
+    """Two saved EUR responses and one USD response in ./saved_responses."""
+    monkeypatch.chdir(tmp_path)
+    api = SkinportAPI()
+    paths = {}
+    for name, items, currency in (("old", make_items(3), "EUR"), ("usd", make_items(4, "USD"), "USD"),
+                                  ("new", make_items(8), "EUR")):
+        paths[name] = api._save_response(items, currency, 730)
+        clock.advance(minutes=10)
+    api.flush_saves()
+    return paths
+
+
+def run(argv, capsys):
+    args = parse_args(argv)
+    code = run_command(SkinportAPI(), args)
+    captured = capsys.readouterr()
+    return code, captured.out, captured.err
+
+
+def test_local_latest_uses_the_newest_response_of_the_market(saved, capsys):
+    code, out, _ = run(["items", "--local"], capsys)
+    assert code == 0
+    assert [json.loads(line)['market_hash_name'] for line in out.splitlines()] == [f"Item {i}" for i in range(8)]
+
+    code, out, _ = run(["items", "--local", "--currency", "USD"], capsys)
+    assert {json.loads(line)['currency'] for line in out.splitlines()} == {"USD"}
+    assert len(out.splitlines()) == 4
+
+    code, out, _ = run(["items", "--local", saved["old"]], capsys)
+    assert len(out.splitlines()) == 3
+
+
+def test_limit(saved, capsys):
+    code, out, _ = run(["items", "--local", "--limit", "2"], capsys)
+    assert [json.loads(line)['market_hash_name'] for line in out.splitlines()] == ["Item 0", "Item 1"]
+
+    code, out, _ = run(["discounts", "--local", "--min-discount", "0", "--limit", "3"], capsys)
+    rows = [json.loads(line) for line in out.splitlines()]
+    expected = SkinportAPI().get_discounted_items(0, min_price=1.0, use_local=True)[:3]
+    assert [row['market_hash_name'] for row in rows] == [item['market_hash_name'] for item in expected]
+
+    code, out, _ = run(["discounts", "--local", "--stream", "--min-discount", "0", "--limit", "1"], capsys)
+    assert len(out.splitlines()) == 1
+
+
+def test_csv_header_and_column_order(saved, capsys):
+    code, out, _ = run(["discounts", "--local", "--min-discount", "0", "--format", "csv"], capsys)
+    rows = list(csv.reader(io.StringIO(out)))
+    assert tuple(rows[0]) == DISCOUNT_FIELDS
+    first = dict(zip(rows[0], rows[1]))
+    assert first['market_hash_name'] == "Item 0" and first['discount_percent'] == "10.0"
+
+    code, out, _ = run(["items", "--local", "--format", "csv", "--limit", "0"], capsys)
+    assert out == ",".join(ITEM_FIELDS) + "\n"
+
+
+def test_missing_market_exits_with_1(saved, capsys):
+    code, out, err = run(["discounts", "--local", "--currency", "GBP"], capsys)
+    assert code == 1
+    assert out == ""
+    assert "No saved responses found for GBP / app 730" in err
+
+    code, out, err = run(["items", "--local", "missing.json.gz"], capsys)
+    assert code == 1 and "Saved response not found" in err
+
+
+@pytest.mark.parametrize("argv", [
+    ["discounts", "--stream", "--score", "median_7d"],
+    ["discounts", "--stream", "--name", "ak"],
+    ["discounts", "--stream", "--wear", "Field-Tested"],
+])
+def test_stream_rejects_filters_it_cannot_apply(argv, capsys):
+    with pytest.raises(SystemExit) as exc:
+        parse_args(argv)
+    assert exc.value.code == 2
+    assert "--stream only supports" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("argv, expected", [
+    ([], True),
+    (["history", "AK-47 | Redline (Field-Tested)"], True),
+    (["discounts"], True),
+    (["items"], True),
+    (["discounts", "--local"], False),
+    (["items", "--local", "items.json.gz"], False),
+    (["snapshots"], False),
+    (["prune", "--dry-run"], False),
+])
+def test_needs_credentials(argv, expected):
+    assert needs_credentials(parse_args(argv)) is expected
+
+
+def test_output_follows_sys_stdout_at_write_time(monkeypatch):
+    sinks = [StdoutSink(), NdjsonSink("-")]
+    # Swapped after the sinks were created, like a capture set up after import
+    out = io.StringIO()
+    monkeypatch.setattr(sys, "stdout", out)
+    alert = {'timestamp': "2026-01-01T12:00:00", 'rule': "cheap", 'market_hash_name': "Item 0", 'min_price': 9.0,
+             'discount_percent': 10.0, 'currency': "EUR"}
+    for sink in sinks:
+        sink.emit(alert)
+    assert write_rows([{'a': 1}], ["a"], "csv") == 1
+    assert out.getvalue().splitlines() == ["[2026-01-01T12:00:00] cheap: Item 0 at 9.00 EUR (10.0% off)",
+                                           json.dumps(alert), "a", "1"]
@@ -0,0 +1,104 @@
+import gc
+import json
+import os
+
+import pytest
+
+from columnar import ColumnarSnapshot, columnar_path, convert_json_snapshots, write_snapshot
+from main import SkinportAPI
+from snapshot_cache import SnapshotCache, file_stamp
+from snapshot_io import read_snapshot, write_snapshot_json
+from tests.helpers import make_items
+
+
+@pytest.fixture
+def items():
+    items = make_items(6)
+    items[0]['market_hash_name'] = "★ StatTrak™ Karambit | Doppler (Factory New)"
+    items[1]['market_hash_name'] = "Sticker | 小狗 | Ωmega"
+    items[2].update(min_price=None, max_price=None, mean_price=None, median_price=None)
+    items[3]['suggested_price'] = None
+    items[4].update(item_page=None, quantity=None)
+    items[5]['min_price'] = 0.0
+    return items
+
+
+def corrupt(path: str):
+    """Flip the last byte of a file (inside the column data)."""
+    with open(path, 'r+b') as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))
+
+
+def test_round_trip_matches_the_json_source(tmp_path, items):
+    json_path = write_snapshot_json(str(tmp_path / "items_1.json.gz"), items)
+    cols_path = write_snapshot(read_snapshot(json_path), columnar_path(json_path))
+    with ColumnarSnapshot(cols_path) as snapshot:
+        assert len(snapshot) == len(items)
+        assert list(snapshot) == read_snapshot(json_path) == items
+        assert [snapshot[i] for i in range(len(items))] == items
+        assert snapshot[-1] == items[-1] and snapshot[1:3] == items[1:3]
+        assert snapshot.strings('market_hash_name')[1] == "Sticker | 小狗 | Ωmega"
+
+
+def test_empty_snapshot(tmp_path):
+    with ColumnarSnapshot(write_snapshot([], str(tmp_path / "empty.cols"))) as snapshot:
+        assert len(snapshot) == 0 and list(snapshot) == []
+
+
+def test_checksum_mismatch_is_rejected(tmp_path, items):
+    path = write_snapshot(items, str(tmp_path / "items.cols"))
+    corrupt(path)
+    with pytest.raises(ValueError, match="checksum"):
+        ColumnarSnapshot(path)
+
+
+def test_damaged_columnar_copy_falls_back_to_json(tmp_path, items, capsys):
+    api = SkinportAPI(data_dir=str(tmp_path))
+    path = api._save_response(items, "EUR", 730)
+    corrupt(columnar_path(path))
+
+    assert list(api.get_items("EUR", 730, use_local=True, local_file=path)) == items
+    assert list(api.iter_items("EUR", 730, use_local=True, local_file=path)) == items
+    assert capsys.readouterr().out.count("falling back to JSON") == 2
+
+
+def test_convert_skips_snapshots_that_already_have_a_columnar_copy(tmp_path, items):
+    first = write_snapshot_json(str(tmp_path / "items_20260101_120000.json.gz"), items)
+    second = str(tmp_path / "items_20260101_130000.json")
+    with open(second, 'w', encoding='utf-8') as f:
+        json.dump(items[:2], f)
+    assert convert_json_snapshots(str(tmp_path)) == [columnar_path(first), columnar_path(second)]
+
+    stamp = file_stamp(columnar_path(first))
+    assert convert_json_snapshots(str(tmp_path)) == []
+    assert file_stamp(columnar_path(first)) == stamp
+    assert len(convert_json_snapshots(str(tmp_path), overwrite=True)) == 2
+    with ColumnarSnapshot(columnar_path(second)) as snapshot:
+        assert list(snapshot) == items[:2]
+
+
+def test_evicted_snapshots_release_their_mapping(tmp_path, items):
+    cache = SnapshotCache(max_entries=1)
+    paths = [write_snapshot(items, str(tmp_path / f"items_{i}.cols")) for i in range(3)]
+    snapshot = ColumnarSnapshot(paths[0])
+    mapping = snapshot._mm
+    cache.put(paths[0], file_stamp(paths[0]), snapshot)
+    del snapshot
+
+    # Still in use by a caller when evicted: stays readable until dropped
+    held = ColumnarSnapshot(paths[1])
+    cache.put(paths[1], file_stamp(paths[1]), held)
+    gc.collect()
+    assert mapping.closed
+    cache.put(paths[2], file_stamp(paths[2]), ColumnarSnapshot(paths[2]))
+    assert not held.closed and list(held) == items
+    mapping = held._mm
+    del held
+    assert mapping.closed
+
+    mapping = cache.get(paths[2], file_stamp(paths[2]))._mm
+    cache.invalidate()
+    assert mapping.closed
@@ -0,0 +1,102 @@
+import os
+
+import pytest
+
+from delta_store import (DELTA_EXTENSION, apply_delta, compute_delta, diff_items, index_by_name, read_delta,
+                         write_delta)
+from main import SkinportAPI
+from tests.helpers import make_items
+
+
+def changed_items():
+    items = make_items(50)
+    new = [dict(item) for item in items[1:]]      # "Item 0" removed
+    new[0]['min_price'] = 1.0                      # "Item 1" repriced
+    new[2]['quantity'] = 0                         # "Item 3" sold out
+    new.append(dict(items[0], market_hash_name="New Item"))
+    return items, new
+
+
+def test_delta_round_trip():
+    old, new = changed_items()
+    delta = compute_delta(index_by_name(old), new)
+    assert delta['removed'] == ["Item 0"]
+    assert delta['changed']["Item 1"] == {'min_price': 1.0}
+    assert delta['changed']["Item 3"] == {'quantity': 0}
+    assert delta['changed']["New Item"] == new[-1]
+    assert apply_delta(old, delta) == new
+
+
+def test_identical_snapshots_have_an_empty_delta():
+    items = make_items(3)
+    delta = compute_delta(index_by_name(items), [dict(item) for item in items])
+    assert delta == {'changed': {}, 'removed': []}
+    assert apply_delta(items, delta) == items
+
+
+def test_apply_delta_does_not_modify_the_keyframe():
+    old, new = changed_items()
+    before = [dict(item) for item in old]
+    apply_delta(old, compute_delta(index_by_name(old), new))
+    assert old == before
+
+
+def test_write_and_read_delta(tmp_path):
+    old, new = changed_items()
+    base = tmp_path / "items_20260101_120000.json.gz"
+    path = write_delta(str(tmp_path / ("items_20260101_130000" + DELTA_EXTENSION)), str(base),
+                       compute_delta(index_by_name(old), new), len(new))
+    delta = read_delta(path)
+    assert delta['base'] == str(base)
+    assert delta['count'] == len(new)
+    assert apply_delta(old, delta) == new
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_diff_items():
+    old, new = changed_items()
+    changes = {item['market_hash_name']: item for item in diff_items(index_by_name(old), index_by_name(new))}
+    assert set(changes) == {"Item 0", "Item 1", "Item 3", "New Item"}
+    assert changes["Item 0"] == {'market_hash_name': "Item 0", 'removed': True}
+    assert changes["Item 1"]['changes'] == {'min_price': [10.0, 1.0]}
+    assert changes["Item 3"]['changes'] == {'quantity': [4, 0]}
+    only = diff_items(index_by_name(old), index_by_name(new), names=["Item 1", "Item 2"])
+    assert [item['market_hash_name'] for item in only] == ["Item 1"]
+
+
+@pytest.fixture
+def delta_api(tmp_path, clock):
+    api = SkinportAPI(storage_mode="delta", data_dir=str(tmp_path))
+    yield api
+    api.flush_saves()
+
+
+def test_delta_mode_saves_keyframe_then_deltas(delta_api, clock):
+    old, new = changed_items()
+    first = delta_api._save_response(old, "EUR", 730)
+    clock.advance(minutes=5)
+    second = delta_api._save_response(new, "EUR", 730)
+    assert first.endswith(".json.gz")
+    assert second.endswith(DELTA_EXTENSION)
+    assert read_delta(second)['base'] == first
+    assert [entry['kind'] for entry in delta_api.get_snapshot_catalog()] == ["delta", "full"]
+
+    assert list(delta_api.get_items("EUR", 730, use_local=True)) == new
+    assert list(delta_api.get_items("EUR", 730, use_local=True, local_file=first)) == old
+
+
+def test_get_changes_between_deltas(delta_api, clock):
+    old, new = changed_items()
+    delta_api._save_response(old, "EUR", 730)
+    clock.advance(minutes=5)
+    delta_api._save_response(new, "EUR", 730)
+    clock.advance(minutes=5)
+    newest = [dict(item) for item in new]
+    newest[1]['suggested_price'] = 99.0
+    delta_api._save_response(newest, "EUR", 730)
+
+    changes = delta_api.get_changes(since="20260101_120500")
+    assert [(item['market_hash_name'], item['changes']) for item in changes] == \
+        [("Item 2", {'suggested_price': [12.0, 99.0]})]
+    assert {item['market_hash_name'] for item in delta_api.get_changes(since="20260101_120000")} == \
+        {"Item 0", "Item 1", "Item 2", "Item 3", "New Item"}
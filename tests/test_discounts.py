@@ -0,0 +1,101 @@
+import copy
+import math
+import random
+
+import pytest
+
+from columnar import ColumnarSnapshot, write_snapshot
+from discounts import filter_discounts, price_columns, rank_discounts
+from item_table import ItemTable
+from main import SkinportAPI
+from tests.helpers import make_items
+
+
+def per_item_loop(items, min_discount_percent, min_price):
+    """The original get_discounted_items loop, run on copies."""
+    discounted_items = []
+    for item in copy.deepcopy(items):
+        suggested_price = item.get('suggested_price')
+        current_price = item.get('min_price')
+        if (not suggested_price or not current_price or
+                suggested_price <= 0 or current_price <= 0 or
+                current_price < min_price):
+            continue
+        discount_percent = ((suggested_price - current_price) / suggested_price) * 100
+        if discount_percent >= min_discount_percent:
+            item['discount_percent'] = round(discount_percent, 2)
+            discounted_items.append(item)
+    return sorted(discounted_items, key=lambda x: x['discount_percent'], reverse=True)
+
+
+@pytest.fixture
+def items():
+    rng = random.Random(7)
+    items = make_items(200)
+    for item in items:
+        # Few distinct prices, so many items tie on their discount
+        item['suggested_price'] = rng.choice([2, 4, 5, 10, 20.5])
+        item['min_price'] = round(item['suggested_price'] * rng.choice([0.5, 0.75, 0.9, 1.0, 1.2]), 2)
+    items[0]['min_price'] = None
+    items[1]['suggested_price'] = None
+    items[2]['suggested_price'] = 0
+    items[3]['min_price'] = 0
+    items[4].update(min_price=None, suggested_price=None)
+    items[5]['min_price'] = -1.0
+    return items
+
+
+@pytest.fixture
+def api(tmp_path):
+    return SkinportAPI(data_dir=str(tmp_path))
+
+
+@pytest.mark.parametrize("min_discount, min_price", [(0, 0), (10, 1.0), (25, 2.5), (50, 0), (-100, 0), (90, 0)])
+def test_matches_the_per_item_loop(api, items, min_discount, min_price):
+    expected = per_item_loop(items, min_discount, min_price)
+    assert api.get_discounted_items(min_discount, min_price=min_price, items=items) == expected
+
+    current, suggested = price_columns(items)
+    hits = rank_discounts(filter_discounts(current, suggested, min_discount, min_price))
+    assert [dict(items[i], discount_percent=discount) for i, discount in hits] == expected
+
+
+def test_ties_keep_input_order(api, items):
+    result = api.get_discounted_items(0, min_price=0, items=items)
+    for first, second in zip(result, result[1:]):
+        if first['discount_percent'] == second['discount_percent']:
+            assert int(first['market_hash_name'].split()[1]) < int(second['market_hash_name'].split()[1])
+    assert len({item['discount_percent'] for item in result}) < len(result)
+
+
+@pytest.mark.parametrize("limit", [0, 1, 7, 60, 500])
+def test_limit_returns_the_true_top_n(api, items, limit):
+    expected = per_item_loop(items, 0, 0)[:limit]
+    assert api.get_discounted_items(0, min_price=0, items=items, limit=limit) == expected
+
+    hits = filter_discounts(*price_columns(items), 0, 0)
+    assert rank_discounts(hits, limit) == rank_discounts(hits)[:limit]
+
+
+def test_input_items_are_left_unmodified(api, items):
+    before = copy.deepcopy(items)
+    result = api.get_discounted_items(0, min_price=0, items=items, limit=10)
+    assert items == before
+    assert all('discount_percent' not in item for item in items)
+    assert not any(item is source for item in result for source in items)
+
+
+def test_price_columns_use_nan_for_missing_prices(items):
+    current, suggested = price_columns(items)
+    assert len(current) == len(suggested) == len(items)
+    assert math.isnan(current[0]) and math.isnan(suggested[1]) and math.isnan(suggested[2])
+    assert current[6] == items[6]['min_price'] and suggested[6] == items[6]['suggested_price']
+
+
+def test_columnar_and_table_input_match_dicts(api, items, tmp_path):
+    expected = api.get_discounted_items(10, min_price=1.0, items=items)
+    with ColumnarSnapshot(write_snapshot(items, str(tmp_path / "items.cols"))) as snapshot:
+        assert api.get_discounted_items(10, min_price=1.0, items=snapshot) == expected
+        assert api.get_discounted_items(10, min_price=1.0, items=snapshot, limit=5) == expected[:5]
+    table = ItemTable(items)
+    assert api.get_discounted_items(10, min_price=1.0, items=table) == expected
@@ -0,0 +1,251 @@
+import os
+import threading
+import tracemalloc
+
+import pytest
+import requests
+
+from columnar import columnar_path
+from main import SkinportAPI
+from scheduler import RequestScheduler
+from tests.helpers import make_items
+
+
+def responses(server, endpoint="/items"):
+    """Count the responses the fake server sent for an endpoint, by status."""
+    counts = server.metrics.snapshot()['counters'].get('responses', {})
+    prefix = f"endpoint={endpoint},status="
+    return {int(labels[len(prefix):]): count for labels, count in counts.items() if labels.startswith(prefix)}
+
+
+@pytest.fixture
+def client(tmp_path):
+    clients = []
+
+    def make(server, **kwargs):
+        kwargs.setdefault('scheduler', RequestScheduler(limits={'/items': (100, 1.0), '/sales/history': (100, 1.0)},
+                                                        backoff_base=0.01))
+        api = SkinportAPI("id", "secret", data_dir=str(tmp_path / f"client{len(clients)}"), base_url=server.url,
+                          **kwargs)
+        clients.append(api)
+        return api
+
+    yield make
+    for api in clients:
+        api.flush_saves()
+
+
+def test_get_items_fetches_and_saves_once(fake_server, client):
+    server = fake_server()
+    api = client(server)
+    items = api.get_items("EUR", 730)
+    assert len(items) == 200
+    assert {item['currency'] for item in items} == {"EUR"}
+    assert api.get_items("EUR", 730) is items
+    api.flush_saves()
+
+    assert responses(server) == {200: 1}
+    assert api.fetch_stats['hits'] == 1 and api.fetch_stats['misses'] == 1
+    [entry] = api.get_snapshot_catalog()
+    assert (entry['currency'], entry['app_id'], entry['count']) == ("EUR", 730, 200)
+    assert list(api.get_items("EUR", 730, use_local=True)) == items
+
+
+def test_expired_cache_is_revalidated(fake_server, client):
+    server = fake_server()
+    api = client(server, cache_ttl=0)
+    items = api.get_items("EUR", 730)
+    assert api.get_items("EUR", 730) is items
+    api.flush_saves()
+
+    assert responses(server) == {200: 1, 304: 1}
+    assert api.fetch_stats['not_modified'] == 1
+    assert len(api.get_snapshot_catalog()) == 1
+
+
+def test_unchanged_response_is_not_saved_again(fake_server, client):
+    # The server sends validators but never answers 304
+    server = fake_server(etag="ignore")
+    api = client(server, cache_ttl=0)
+    assert api.get_items("EUR", 730) == api.get_items("EUR", 730)
+    api.flush_saves()
+
+    assert responses(server) == {200: 2}
+    assert len(api.get_snapshot_catalog()) == 1
+
+
+def test_concurrent_misses_share_one_request(fake_server, client):
+    server = fake_server(latency=0.2)
+    api = client(server)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(api.get_items("EUR", 730))) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    api.flush_saves()
+
+    assert responses(server) == {200: 1}
+    assert len(results) == 4 and all(result is results[0] for result in results)
+    assert len(api.get_snapshot_catalog()) == 1
+
+
+def test_markets_are_cached_separately(fake_server, client):
+    server = fake_server()
+    api = client(server)
+    results = {(result.currency, result.app_id): result for result in api.get_items_many([("EUR", 730), ("USD", 730)])}
+    assert {item['currency'] for item in results[("USD", 730)].items} == {"USD"}
+    assert responses(server) == {200: 2}
+
+
+@pytest.mark.parametrize("error_rate", [0.0, 1.0])
+def test_fetch_many_times_each_request_alone(fake_server, client, error_rate):
+    server = fake_server(latency=0.15, error_rate=error_rate, error_statuses=(503,))
+    api = client(server, scheduler=RequestScheduler(limits={'/items': (100, 1.0)}, max_retries=0))
+    results = list(api.get_items_many([("EUR", 730), ("USD", 730), ("GBP", 730)], max_workers=1))
+    assert [result.error is None for result in results] == [error_rate == 0] * 3
+    # One at a time, so the last one waited ~0.3s for a worker, which isn't counted
+    assert all(0.15 <= result.elapsed < 0.3 for result in results)
+
+
+def test_fetch_many_saves_results_the_caller_did_not_read(fake_server, client):
+    server = fake_server(latency=0.2)
+    api = client(server)
+    results = api.get_items_many([("EUR", 730), ("USD", 730), ("GBP", 730)], max_workers=1)
+    first = next(results)
+    results.close()
+    api.flush_saves()
+
+    # The fetch running when the caller stopped is finished and saved; the one not started yet is cancelled
+    assert first.currency == "EUR"
+    assert api.fetch_stats['misses'] == 2
+    assert {(e['currency'], e['app_id']) for e in api.get_snapshot_catalog()} == {("EUR", 730), ("USD", 730)}
+
+
+def test_server_errors_are_retried(fake_server, client):
+    server = fake_server(error_rate=0.5, error_statuses=(502, 503), retry_after=0)
+    api = client(server, scheduler=RequestScheduler(max_retries=20, backoff_base=0.01))
+    assert len(api.get_items("EUR", 730)) == 200
+    counts = responses(server)
+    assert counts[200] == 1
+    assert sum(counts.values()) > 1
+    assert api.get_scheduler_stats()['/items']['retries'] == sum(counts.values()) - 1
+
+
+def test_persistent_errors_raise(fake_server, client):
+    server = fake_server(error_rate=1.0, error_statuses=(503,), retry_after=0)
+    api = client(server, scheduler=RequestScheduler(max_retries=2))
+    with pytest.raises(requests.exceptions.HTTPError):
+        api.get_items("EUR", 730)
+    assert responses(server) == {503: 3}
+
+
+def test_truncated_body_raises(fake_server, client):
+    server = fake_server(truncate_rate=1.0, compression="none")
+    api = client(server)
+    with pytest.raises(requests.exceptions.RequestException):
+        api.get_items("EUR", 730)
+    assert api.get_snapshot_catalog() == []
+
+
+def test_iter_items_streams_and_revalidates(fake_server, client):
+    server = fake_server()
+    api = client(server, cache_ttl=0)
+    streamed = list(api.iter_items("EUR", 730))
+    assert len(streamed) == 200
+    assert list(api.iter_items("EUR", 730)) == streamed
+    assert list(api.get_items("EUR", 730)) == streamed
+
+    assert responses(server) == {200: 1, 304: 2}
+    [entry] = api.get_snapshot_catalog()
+    assert entry['count'] == 200
+
+
+def test_sales_history_many(fake_server, client):
+    server = fake_server()
+    api = client(server)
+    names = [item['market_hash_name'] for item in api.get_items("EUR", 730)[:30]]
+    history = api.get_sales_history_many(names + ["Not An Item"])
+    assert set(history) == set(names) | {"Not An Item"}
+    assert history["Not An Item"] is None
+    assert set(history[names[0]]) >= {'last_24_hours', 'last_7_days', 'last_30_days', 'last_90_days'}
+    assert api.get_sales_history_many(names) == {name: history[name] for name in names}
+    assert sum(responses(server, "/sales/history").values()) >= 1
+
+
+def test_sales_history_skips_names_with_commas(fake_server, client, tmp_path, capsys):
+    items = make_items(3)
+    items[1]['market_hash_name'] = "StatTrak™ Music Kit | Darude, Moments CS:GO"
+    seeded = SkinportAPI(data_dir=str(tmp_path / "server0"))
+    seeded._save_response(items, "EUR", 730)
+    seeded.flush_saves()
+    server = fake_server()
+    api = client(server)
+    names = [item['market_hash_name'] for item in items]
+
+    history = api.get_sales_history_many(names)
+    assert list(history) == names
+    assert history[names[1]] is None
+    assert history[names[0]] is not None and history[names[2]] is not None
+    assert "not available for names containing a comma: StatTrak™ Music Kit | Darude, Moments CS:GO" in \
+        capsys.readouterr().out
+    # Not cached as "no sales", and never sent to the endpoint where it would be split in two
+    assert api.sales_cache.lookup(names, "EUR", 730)[1] == [names[1]]
+    assert api.get_sales_history_many(names) == history
+    assert responses(server, "/sales/history") == {200: 1}
+
+
+def test_iter_items_keeps_memory_flat(fake_server, client):
+    server = fake_server(synthetic=5000)
+    requests.get(f"{server.url}/items").close()  # Let the server build its payload first
+    api = client(server)
+    tracemalloc.start()
+    try:
+        for count, item in enumerate(api.iter_items("EUR", 730), 1):
+            if count == 5000:
+                streaming_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        api.flush_saves()
+        start = tracemalloc.get_traced_memory()[0]
+        items = [dict(item) for item in api.get_items("EUR", 730)]
+        loaded = tracemalloc.get_traced_memory()[0] - start
+    finally:
+        tracemalloc.stop()
+    assert len(items) == 5000
+    assert streaming_peak * 5 < loaded
+
+
+def test_iter_items_saves_on_the_background_writer(fake_server, client):
+    server = fake_server()
+    api = client(server)
+    release = threading.Event()
+    save = api.writer._write
+
+    def blocked_save(*args):
+        release.wait(5)
+        return save(*args)
+
+    api.writer._write = blocked_save
+    assert len(list(api.iter_items("EUR", 730))) == 200
+    assert api.get_snapshot_catalog() == []
+    release.set()
+    api.flush_saves()
+
+    [entry] = api.get_snapshot_catalog()
+    assert entry['count'] == 200
+    assert os.path.exists(columnar_path(entry['path']))
+    assert [name for name in os.listdir(os.path.dirname(entry['path'])) if ".part" in name] == []
+    assert api.get_price_history(api.get_items("EUR", 730)[0]['market_hash_name'])
+
+
+def test_iter_items_in_delta_mode(fake_server, client):
+    server = fake_server()
+    api = client(server, storage_mode="delta", cache_ttl=0)
+    streamed = list(api.iter_items("EUR", 730))
+    api.flush_saves()
+    [entry] = api.get_snapshot_catalog()
+    assert entry['kind'] == "full"
+    assert list(api.get_items("EUR", 730, use_local=True)) == streamed
+    # Revalidated against the saved keyframe
+    assert list(api.iter_items("EUR", 730)) == streamed
+    assert api.fetch_stats['not_modified'] == 1
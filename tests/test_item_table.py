@@ -0,0 +1,102 @@
+import pytest
+
+import columnar
+from item_table import ItemTable, parse_facets
+from main import SkinportAPI
+from tests.helpers import make_items
+
+
+@pytest.mark.parametrize("name, facets", [
+    ("AK-47 | Redline (Field-Tested)", ("Field-Tested", "Normal", "Weapon", "AK-47")),
+    ("StatTrak™ M4A1-S | Hyper Beast (Minimal Wear)", ("Minimal Wear", "StatTrak™", "Weapon", "M4A1-S")),
+    ("Souvenir AWP | Dragon Lore (Factory New)", ("Factory New", "Souvenir", "Weapon", "AWP")),
+    ("★ StatTrak™ Karambit | Doppler (Factory New)", ("Factory New", "StatTrak™", "Knife", "Karambit")),
+    ("★ Karambit", ("", "Normal", "Knife", "Karambit")),
+    ("★ Sport Gloves | Pandora's Box (Battle-Scarred)", ("Battle-Scarred", "Normal", "Gloves", "Sport Gloves")),
+    ("★ Hand Wraps | Slaughter (Well-Worn)", ("Well-Worn", "Normal", "Gloves", "Hand Wraps")),
+    ("Sticker | Natus Vincere (Holo) | Katowice 2014", ("", "Normal", "Sticker", "")),
+    ("Sealed Graffiti | Lambda (Bazooka Pink)", ("", "Normal", "Graffiti", "")),
+    ("Patch | Metal Distinguished Master Guardian", ("", "Normal", "Patch", "")),
+    ("StatTrak™ Music Kit | Darude, Moments CS:GO", ("", "StatTrak™", "Music Kit", "")),
+    ("Sir Bloody Darryl Royale | The Professionals", ("", "Normal", "Agent", "")),
+    ("Special Agent Ava | FBI", ("", "Normal", "Agent", "")),
+    ("Chroma 2 Case", ("", "Normal", "Container", "")),
+    ("Chroma 2 Case Key", ("", "Normal", "Key", "")),
+    ("Katowice 2019 Legends (Holo/Foil)", ("", "Normal", "Other", "")),
+    ("Operation Bravo Challenge Coin", ("", "Normal", "Other", "")),
+])
+def test_parse_facets(name, facets):
+    assert parse_facets(name) == facets
+
+
+NAMES = ["AK-47 | Redline (Field-Tested)", "StatTrak™ AK-47 | Redline (Minimal Wear)",
+         "★ Karambit | Fade (Factory New)", "★ StatTrak™ Karambit | Doppler (Factory New)",
+         "Souvenir AWP | Safari Mesh (Field-Tested)", "Chroma 2 Case"]
+
+
+@pytest.fixture
+def items():
+    items = make_items(len(NAMES))
+    for item, name in zip(items, NAMES):
+        item['market_hash_name'] = name
+    items[2]['suggested_price'] = None
+    items[3]['quantity'] = None
+    return items
+
+
+def selected_names(table, facets):
+    return [table.names[i] for i in table.positions(table.select(facets))]
+
+
+def test_behaves_like_the_item_list(items):
+    table = ItemTable(items)
+    assert len(table) == len(items)
+    assert list(table) == items
+    assert table[-1] == items[-1]
+    assert table[1:3] == items[1:3]
+    with pytest.raises(IndexError):
+        table[len(items)]
+
+
+def test_built_from_a_columnar_snapshot(items, tmp_path):
+    path = columnar.write_snapshot(items, str(tmp_path / "items.cols"))
+    with columnar.load_snapshot(path) as snapshot:
+        table = ItemTable(snapshot)
+    assert list(table) == items
+    assert selected_names(table, {'weapon': ["Karambit"]}) == NAMES[2:4]
+
+
+def test_select_ors_values_and_ands_facets(items):
+    table = ItemTable(items)
+    assert selected_names(table, {}) == NAMES
+    assert selected_names(table, {'wear': ["Factory New", "Minimal Wear"]}) == NAMES[1:4]
+    assert selected_names(table, {'wear': ["Factory New", "Minimal Wear"], 'quality': ["StatTrak™"]}) == \
+        [NAMES[1], NAMES[3]]
+    assert selected_names(table, {'category': ["Container"]}) == [NAMES[5]]
+    assert selected_names(table, {'weapon': ["M4A4"]}) == []
+    with pytest.raises(ValueError):
+        table.select({'rarity': ["Covert"]})
+
+
+def test_select_ignores_case_and_punctuation(items):
+    table = ItemTable(items)
+    assert selected_names(table, {'quality': ["stattrak"], 'wear': ["FIELD TESTED", "minimal-wear"]}) == \
+        [NAMES[1]]
+    assert selected_names(table, {'weapon': ["ak47"]}) == NAMES[:2]
+
+
+def test_facet_counts(items):
+    table = ItemTable(items)
+    assert table.facet_counts('category') == {"Weapon": 3, "Knife": 2, "Container": 1}
+    assert table.facet_counts('wear') == {"": 1, "Factory New": 2, "Minimal Wear": 1, "Field-Tested": 2}
+    assert table.facet(3, 'quality') == "StatTrak™"
+
+
+def test_get_discounted_items_with_facets(items, tmp_path):
+    for item in items:
+        item['min_price'] = item['suggested_price'] and item['suggested_price'] / 2
+    api = SkinportAPI(data_dir=str(tmp_path))
+    api._save_response(items, "EUR", 730)
+    found = api.get_discounted_items(use_local=True, facets={'weapon': ["AK-47"], 'quality': ["StatTrak"]})
+    assert [item['market_hash_name'] for item in found] == [NAMES[1]]
+    assert found[0]['discount_percent'] == 50.0
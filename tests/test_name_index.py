@@ -0,0 +1,81 @@
+import pytest
+
+from main import SkinportAPI
+from name_index import NameIndex, tokenize
+from tests.helpers import make_items
+
+NAMES = ["AK-47 | Redline (Field-Tested)", "AK-47 | Redline (Minimal Wear)", "StatTrak™ AK-47 | Redline (Field-Tested)",
+         "AK-47 | Asiimov (Field-Tested)", "AWP | Asiimov (Field-Tested)", "M4A1-S | Hyper Beast (Minimal Wear)",
+         "★ Karambit | Fade (Factory New)", "Sticker | Redline Crew", "AK-47", None]
+
+
+@pytest.fixture
+def index():
+    return NameIndex(NAMES)
+
+
+def matched(index, query):
+    return sorted(index.names[i] for i in index.match(query))
+
+
+def test_tokenize():
+    assert tokenize("StatTrak™ AK-47 | Redline (Field-Tested)") == \
+        ["stattrak", "ak", "47", "redline", "field", "tested"]
+
+
+def test_word_prefixes_match_in_any_order(index):
+    expected = sorted(["AK-47 | Redline (Field-Tested)", "AK-47 | Redline (Minimal Wear)",
+                       "StatTrak™ AK-47 | Redline (Field-Tested)"])
+    assert matched(index, "ak red") == expected
+    assert matched(index, "RED ak") == expected
+    assert matched(index, "ak-47 redline") == expected
+    assert matched(index, "asiimov field") == ["AK-47 | Asiimov (Field-Tested)", "AWP | Asiimov (Field-Tested)"]
+    assert matched(index, "karambit zzz") == []
+
+
+def test_blank_query_matches_everything(index):
+    assert index.match("  ") == set(range(len(NAMES)))
+    assert index.search("") == []
+
+
+def test_run_together_input_falls_back_to_trigrams(index):
+    assert matched(index, "ak47redl") == sorted(["AK-47 | Redline (Field-Tested)", "AK-47 | Redline (Minimal Wear)",
+                                                 "StatTrak™ AK-47 | Redline (Field-Tested)"])
+    assert matched(index, "hyperbeast") == ["M4A1-S | Hyper Beast (Minimal Wear)"]
+
+
+def test_search_ranks_typos_by_similarity(index):
+    assert index.search("karambti fade")[0] == "★ Karambit | Fade (Factory New)"
+    assert index.search("hyper baest m4a1")[0] == "M4A1-S | Hyper Beast (Minimal Wear)"
+    assert index.search("redlnie ak47 minimal")[0] == "AK-47 | Redline (Minimal Wear)"
+    assert index.search("qqqq") == []
+
+
+def test_search_puts_names_starting_with_the_query_first(index):
+    assert index.search("ak") == ["AK-47", "AK-47 | Asiimov (Field-Tested)", "AK-47 | Redline (Field-Tested)",
+                                  "AK-47 | Redline (Minimal Wear)", "StatTrak™ AK-47 | Redline (Field-Tested)"]
+    assert index.search("redline") == ["Sticker | Redline Crew", "AK-47 | Redline (Field-Tested)",
+                                       "AK-47 | Redline (Minimal Wear)", "StatTrak™ AK-47 | Redline (Field-Tested)"]
+
+
+def test_search_limit(index):
+    assert index.search("ak", limit=2) == ["AK-47", "AK-47 | Asiimov (Field-Tested)"]
+    assert len(index.search("field", limit=3)) == 3
+    assert len(index.search("field", limit=100)) == 4
+
+
+def test_discount_name_query_uses_match(tmp_path):
+    items = make_items(len(NAMES) - 1)
+    for item, name in zip(items, NAMES):
+        item['market_hash_name'] = name
+    api = SkinportAPI(data_dir=str(tmp_path))
+    result = api.get_discounted_items(0, min_price=0, items=items, name_query="red ak")
+    assert sorted(item['market_hash_name'] for item in result) == \
+        sorted(["AK-47 | Redline (Field-Tested)", "AK-47 | Redline (Minimal Wear)",
+                "StatTrak™ AK-47 | Redline (Field-Tested)"])
+    assert [item['market_hash_name'] for item in
+            api.get_discounted_items(0, min_price=0, items=items, name_query="ak47redl", limit=1)] == \
+        ["AK-47 | Redline (Field-Tested)"]
+    assert len(api.get_discounted_items(0, min_price=0, items=items, name_query=" ")) == len(items)
+    # The index is built once per list of names
+    assert api.get_name_index(items) is api.get_name_index([dict(item) for item in items])
@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from main import SkinportAPI
+from price_history import PriceHistoryStore
+from scheduler import RequestScheduler
+from snapshot_io import write_snapshot_json
+from tests.helpers import make_items
+
+T0 = datetime(2026, 1, 1, 12, 0)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = PriceHistoryStore(str(tmp_path / "history.sqlite3"))
+    yield store
+    store.close()
+
+
+def test_append_is_idempotent_per_source(store):
+    items = make_items(3)
+    assert store.append(items, T0, "EUR", 730, source="items_1.json.gz") == 3
+    assert store.append(items, T0 + timedelta(hours=1), "EUR", 730, source="items_1.json.gz") == 0
+    assert store.has_source("items_1.json.gz") and not store.has_source("items_2.json.gz")
+    assert len(store.history("Item 0")) == 1
+
+    # Without a source there is nothing to deduplicate on
+    store.append(items, T0 + timedelta(hours=1), "EUR", 730)
+    store.append(items, T0 + timedelta(hours=2), "EUR", 730)
+    assert [row['timestamp'] for row in store.history("Item 0")] == [T0 + timedelta(hours=h) for h in range(3)]
+
+
+def test_queries_filter_by_currency_and_app(store):
+    store.append(make_items(2, "EUR", price=10), T0, "EUR", 730, source="a")
+    store.append(make_items(2, "USD", price=12), T0 + timedelta(hours=1), "USD", 730, source="b")
+    store.append(make_items(2, "EUR", price=1), T0 + timedelta(hours=2), "EUR", 570, source="c")
+    store.append(make_items(2, "EUR", price=11), T0 + timedelta(hours=3), "EUR", 730, source="d")
+
+    assert [row['min_price'] for row in store.history("Item 0")] == [9, 0, 10]
+    assert [row['min_price'] for row in store.history("Item 0", app_id=730)] == [9, 10]
+    assert [row['min_price'] for row in store.history("Item 0", currency="USD")] == [11]
+    assert store.history("Item 0", currency="GBP") == []
+    assert {row['currency'] for row in store.range(T0, T0 + timedelta(hours=3))} == {"EUR"}
+    assert len(store.range(T0, T0 + timedelta(hours=3), app_id=570)) == 2
+
+    latest = store.price_at("Item 1", T0 + timedelta(hours=2, minutes=30))
+    assert (latest['app_id'], latest['min_price']) == (570, 1)
+    assert store.price_at("Item 1", T0 + timedelta(hours=2, minutes=30), app_id=730)['min_price'] == 10
+    assert store.price_at("Item 1", T0 - timedelta(seconds=1)) is None
+    with pytest.raises(ValueError):
+        store.history("Item 0", currency="")
+
+
+def test_since_and_until(store):
+    for hour in range(4):
+        store.append(make_items(1, price=10 + hour), T0 + timedelta(hours=hour), "EUR", 730, source=str(hour))
+    rows = store.history("Item 0", since=T0 + timedelta(hours=1), until=T0 + timedelta(hours=2))
+    assert [row['suggested_price'] for row in rows] == [11, 12]
+    assert [row['timestamp'] for row in store.range(T0 + timedelta(hours=3), T0 + timedelta(days=1))] == \
+        [T0 + timedelta(hours=3)]
+
+
+def test_import_skips_snapshots_already_imported(tmp_path):
+    data_dir = tmp_path / "saved_responses"
+    data_dir.mkdir()
+    write_snapshot_json(str(data_dir / "items_20260101_120000_EUR_730.json.gz"), make_items(3))
+    write_snapshot_json(str(data_dir / "items_20260101_130000_EUR_730.json.gz"), make_items(3, price=20))
+    api = SkinportAPI(data_dir=str(data_dir))
+    assert api.import_saved_responses() == 2
+    assert api.import_saved_responses() == 0
+    assert [row['min_price'] for row in api.get_price_history("Item 2")] == [11, 21]
+
+    write_snapshot_json(str(data_dir / "items_20260101_140000_EUR_730.json.gz"), make_items(3, price=30))
+    api.refresh_saved_responses()
+    assert api.import_saved_responses() == 1
+    assert [row['min_price'] for row in api.get_price_history("Item 2")] == [11, 21, 31]
+    # Saved responses are recorded as they are written, so there is nothing left to import
+    api._save_response(make_items(3), "EUR", 730)
+    assert api.import_saved_responses() == 0
+
+
+def test_delta_saves_record_history(tmp_path, clock):
+    api = SkinportAPI(storage_mode="delta", data_dir=str(tmp_path))
+    items = make_items(10)
+    for quantity in (1, 5, 7):
+        items[0]['quantity'] = quantity
+        api._save_response(items, "EUR", 730)
+        clock.advance(hours=1)
+    assert [e['kind'] for e in api.get_snapshot_catalog()] == ["delta", "delta", "full"]
+    rows = api.get_price_history("Item 0")
+    assert [row['quantity'] for row in rows] == [1, 5, 7]
+    assert [row['timestamp'] for row in rows] == [datetime(2026, 1, 1, 12 + hour) for hour in range(3)]
+    assert len(api.get_price_history("Item 9")) == 3
+    assert api.import_saved_responses() == 0
+
+
+def test_streamed_responses_record_history(fake_server, tmp_path):
+    server = fake_server(synthetic=50)
+    api = SkinportAPI("id", "secret", data_dir=str(tmp_path / "client"), base_url=server.url,
+                      scheduler=RequestScheduler(limits={'/items': (100, 1.0)}))
+    items = list(api.iter_items("EUR", 730))
+    api.flush_saves()
+    for item in items[:5]:
+        [row] = api.get_price_history(item['market_hash_name'], app_id=730)
+        assert (row['min_price'], row['quantity']) == (item['min_price'], item['quantity'])
+    assert api.import_saved_responses() == 0
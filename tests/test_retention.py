@@ -0,0 +1,143 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+from catalog import RetentionPolicy, parse_retention
+from columnar import columnar_path
+from delta_store import DELTA_EXTENSION
+from main import SkinportAPI, parse_args, run_command
+from tests.helpers import make_items
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+def entry(when, currency="EUR", app_id=730):
+    return {'file': when.strftime("items_%Y%m%d_%H%M%S.json.gz"), 'timestamp': when.strftime("%Y%m%d_%H%M%S"),
+            'currency': currency, 'app_id': app_id}
+
+
+def kept(policy, entries):
+    expired = {e['file'] for e in policy.select(entries, NOW)}
+    return sorted((e['timestamp'], e['currency']) for e in entries if e['file'] not in expired)
+
+
+def test_keeps_everything_from_the_first_day():
+    entries = [entry(NOW - timedelta(minutes=5 * i)) for i in range(12 * 23)]
+    assert RetentionPolicy().select(entries, NOW) == []
+
+
+def test_keeps_the_newest_snapshot_per_hour_then_per_day():
+    # Every 20 minutes for 20 days
+    entries = [entry(NOW - timedelta(minutes=20 * i)) for i in range(3 * 24 * 20)]
+    remaining = [datetime.strptime(ts, "%Y%m%d_%H%M%S") for ts, _ in kept(RetentionPolicy(), entries)]
+    first_day = [when for when in remaining if NOW - when <= timedelta(hours=24)]
+    week = [when for when in remaining if timedelta(hours=24) < NOW - when <= timedelta(days=7)]
+    older = [when for when in remaining if NOW - when > timedelta(days=7)]
+    assert len(first_day) == 3 * 24 + 1
+    # One per hour; the newest in each hour is the one kept
+    assert len({when.strftime("%Y%m%d%H") for when in week}) == len(week)
+    assert all(when.minute == 40 for when in week)
+    assert len(week) == 6 * 24
+    # One per day, forever by default
+    assert len({when.date() for when in older}) == len(older) == 14
+    assert all(when.strftime("%H%M") == "2340" for when in older[:-1])
+
+
+def test_daily_snapshots_expire_after_daily_days():
+    entries = [entry(NOW - timedelta(days=i)) for i in range(40)]
+    assert [ts for ts, _ in kept(RetentionPolicy(daily_days=30), entries)] == \
+        [(NOW - timedelta(days=i)).strftime("%Y%m%d_%H%M%S") for i in range(30, -1, -1)]
+
+
+def test_buckets_are_per_market():
+    when = NOW - timedelta(days=3, minutes=30)
+    entries = [entry(when, "EUR"), entry(when + timedelta(minutes=1), "EUR"), entry(when, "USD")]
+    entries[-1]['file'] = "items_usd.json.gz"
+    assert kept(RetentionPolicy(), entries) == [(entries[2]['timestamp'], "USD"), (entries[1]['timestamp'], "EUR")]
+
+
+@pytest.mark.parametrize("value, policy", [
+    ("90", RetentionPolicy(daily_days=90)), ("forever", RetentionPolicy()), ("off", None), ("", None), (None, None),
+])
+def test_parse_retention(value, policy):
+    assert parse_retention(value) == policy
+
+
+@pytest.mark.parametrize("value", ["-1", "0", "soon"])
+def test_parse_retention_rejects_junk(value):
+    with pytest.raises(ValueError):
+        parse_retention(value)
+
+
+def save_every(api, clock, hours, count):
+    """Save count snapshots hours apart, each with one item's quantity changed."""
+    paths = []
+    for i in range(count):
+        data = make_items(20)
+        data[0]['quantity'] += i
+        paths.append(api._save_response(data, "EUR", 730))
+        clock.advance(hours=hours)
+    return paths
+
+
+def test_apply_retention_removes_files_catalog_entries_and_cached_snapshots(tmp_path, clock):
+    api = SkinportAPI(data_dir=str(tmp_path))
+    paths = save_every(api, clock, hours=6, count=12)  # From noon on Jan 1 to 6:00 on Jan 4
+    clock.advance(days=10)
+    newest_per_day = [paths[i] for i in (1, 5, 9, 11)]
+    api._load_local(paths[0])
+    assert len(api.snapshot_cache) == 1
+
+    doomed = api.apply_retention(RetentionPolicy(), dry_run=True)
+    assert doomed == [path for path in paths if path not in newest_per_day][::-1]
+    assert all(os.path.exists(path) for path in paths)
+    assert len(api.get_snapshot_catalog()) == 12
+
+    assert api.apply_retention(RetentionPolicy()) == doomed
+    assert sorted(e['path'] for e in api.get_snapshot_catalog()) == newest_per_day
+    for path in doomed:
+        assert not os.path.exists(path) and not os.path.exists(columnar_path(path))
+    assert len(api.snapshot_cache) == 0
+    # Reopening the directory sees the same catalog
+    assert SkinportAPI(data_dir=str(tmp_path)).get_snapshot_catalog() == api.get_snapshot_catalog()
+
+
+def test_keyframes_of_kept_deltas_are_never_deleted(tmp_path, clock):
+    writer = SkinportAPI(storage_mode="delta", data_dir=str(tmp_path))
+    paths = save_every(writer, clock, hours=1, count=3)
+    assert [os.path.splitext(path)[1] for path in paths] == [".gz", DELTA_EXTENSION, DELTA_EXTENSION]
+    clock.advance(days=3)
+
+    # A new client doesn't hold the keyframe as its current one
+    api = SkinportAPI(storage_mode="delta", data_dir=str(tmp_path))
+    assert api.apply_retention(RetentionPolicy(hourly_days=1)) == [paths[1]]
+    assert os.path.exists(paths[0])
+    assert [item['quantity'] for item in api.get_items("EUR", 730, use_local=True)][:2] == [3, 2]
+
+
+def test_saves_apply_the_configured_policy(tmp_path, clock):
+    api = SkinportAPI(data_dir=str(tmp_path), retention=RetentionPolicy(keep_all_hours=1, hourly_days=1,
+                                                                        daily_days=2))
+    save_every(api, clock, hours=0.25, count=8)
+    assert len(api.get_snapshot_catalog()) == 6
+    clock.advance(days=5)
+    api._save_response(make_items(20), "EUR", 730)
+    assert len(api.get_snapshot_catalog()) == 1
+
+
+def test_prune_command(tmp_path, clock, capfd, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    api = SkinportAPI()
+    paths = save_every(api, clock, hours=6, count=8)
+    clock.advance(days=10)
+
+    assert run_command(api, parse_args(["prune", "--dry-run", "--format", "csv"])) == 0
+    listed = capfd.readouterr().out.splitlines()
+    assert listed[0].startswith("file,time,kind")
+    assert len(listed) == 1 + 5
+    assert all(os.path.exists(path) for path in paths)
+
+    assert run_command(api, parse_args(["--retention", "5", "prune"])) == 0
+    assert len(capfd.readouterr().out.splitlines()) == 8
+    assert api.get_snapshot_catalog() == []
@@ -0,0 +1,106 @@
+import math
+import random
+import statistics
+from datetime import datetime, timedelta
+
+import pytest
+
+from rolling_stats import MEDIAN_DAYS, WINDOW_DAYS, RollingStatsIndex
+
+START = datetime(2026, 1, 1, 9, 0)
+
+
+def expected_stats(prices):
+    """Compute an item's stats from every (day, price) seen, the slow way."""
+    last = max(day for day, _ in prices)
+    window = [(day, price) for day, price in prices if day >= last - WINDOW_DAYS]
+    daily = {}
+    for day, price in window:
+        daily.setdefault(day, []).append(price)
+    before = [price for day, price in window if day < last]
+    values = [price for _, price in window]
+    mean = statistics.fmean(values)
+    return {
+        'last_day': last,
+        'median_7d': statistics.median(statistics.fmean(daily[day]) for day in daily if day > last - MEDIAN_DAYS),
+        'low_30d': min(before) if before else None,
+        'volatility': statistics.pstdev(values) / mean,
+        'samples': len(values),
+    }
+
+
+def assert_stats_match(actual, expected):
+    assert actual.keys() == expected.keys()
+    for name in expected:
+        for key, value in expected[name].items():
+            assert actual[name][key] == pytest.approx(value, rel=1e-9, abs=1e-9), (name, key)
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = RollingStatsIndex(str(tmp_path / "rolling_stats.sqlite3"))
+    yield index
+    index.close()
+
+
+def test_matches_brute_force_as_the_windows_slide(index):
+    rng = random.Random(7)
+    seen = {}
+    for offset in range(3 * WINDOW_DAYS // 2):
+        for snapshot in range(rng.randint(1, 3)):
+            when = START + timedelta(days=offset, hours=snapshot)
+            items = []
+            for name in ("A", "B", "C"):
+                # Items are sometimes missing from a snapshot, as on the real market
+                if rng.random() < 0.8:
+                    price = round(rng.uniform(5, 15), 2)
+                    items.append({'market_hash_name': name, 'min_price': price})
+                    seen.setdefault(name, []).append((when.toordinal(), price))
+            index.update(items, when, "EUR")
+        assert_stats_match(index.stats("EUR"), {name: expected_stats(prices) for name, prices in seen.items()})
+
+
+def test_late_snapshot_within_the_window_counts(index):
+    index.update([{'market_hash_name': "A", 'min_price': 10.0}], START, "EUR")
+    index.update([{'market_hash_name': "A", 'min_price': 12.0}], START + timedelta(days=5), "EUR")
+    index.update([{'market_hash_name': "A", 'min_price': 4.0}], START + timedelta(days=2), "EUR")
+    stats = index.stats("EUR")["A"]
+    assert stats['low_30d'] == 4.0
+    assert stats['samples'] == 3
+    assert stats['median_7d'] == 10.0
+
+    # Older than the window: ignored
+    index.update([{'market_hash_name': "A", 'min_price': 1.0}], START - timedelta(days=WINDOW_DAYS), "EUR")
+    assert index.stats("EUR")["A"] == stats
+
+
+def test_first_day_has_no_prior_low(index):
+    index.update([{'market_hash_name': "A", 'min_price': 10.0}, {'market_hash_name': "B", 'min_price': None}],
+                 START, "EUR")
+    index.update([{'market_hash_name': "A", 'min_price': 6.0}], START + timedelta(hours=1), "EUR")
+    assert index.stats("EUR") == {"A": {'last_day': START.toordinal(), 'median_7d': 8.0, 'low_30d': None,
+                                        'volatility': pytest.approx(0.25), 'samples': 2}}
+
+
+def test_currencies_are_kept_apart(index):
+    index.update([{'market_hash_name': "A", 'min_price': 10.0}], START, "EUR")
+    index.update([{'market_hash_name': "A", 'min_price': 1000.0}], START, "USD")
+    assert index.stats("EUR")["A"]['median_7d'] == 10.0
+    assert index.stats("USD")["A"]['median_7d'] == 1000.0
+    assert index.stats("GBP") == {}
+
+
+def test_stats_survive_reopening(tmp_path):
+    path = str(tmp_path / "rolling_stats.sqlite3")
+    index = RollingStatsIndex(path)
+    for offset in range(10):
+        index.update([{'market_hash_name': "A", 'min_price': 10.0 + offset}], START + timedelta(days=offset), "EUR")
+    expected = index.stats("EUR")
+    index.close()
+
+    reopened = RollingStatsIndex(path)
+    assert reopened.stats("EUR") == expected
+    reopened.update([{'market_hash_name': "A", 'min_price': 1.0}], START + timedelta(days=10), "EUR")
+    assert reopened.stats("EUR")["A"]['low_30d'] == 10.0
+    assert math.isclose(reopened.stats("EUR")["A"]['median_7d'], statistics.median([14, 15, 16, 17, 18, 19, 1]))
+    reopened.close()
@@ -0,0 +1,122 @@
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+
+import scheduler
+from scheduler import BACKGROUND, INTERACTIVE, RequestScheduler, parse_retry_after
+
+
+class FakeResponse:
+    def __init__(self, status_code: int, retry_after=None):
+        self.status_code = status_code
+        self.headers = {} if retry_after is None else {'Retry-After': retry_after}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def no_jitter(monkeypatch):
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: low)
+
+
+def wait_for(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_parse_retry_after():
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("-3") == 0.0
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after(formatdate(time.time() - 60, usegmt=True)) == 0.0
+
+
+def test_burst_up_to_capacity_then_refill_rate():
+    sched = RequestScheduler(limits={'/items': (3, 0.3)})
+    start = time.monotonic()
+    for _ in range(3):
+        assert sched.acquire('/items') < 0.01
+    # The bucket is empty; every further request waits for the 10/s refill
+    for _ in range(3):
+        sched.acquire('/items')
+    elapsed = time.monotonic() - start
+    assert 0.28 <= elapsed < 0.6
+    stats = sched.stats()['/items']
+    assert stats['requests'] == 6
+    assert stats['queue_depth'] == 0
+    assert stats['max_wait'] >= 0.09
+
+
+def test_endpoints_have_separate_buckets():
+    sched = RequestScheduler(limits={'/items': (1, 10.0), '/sales/history': (1, 10.0)})
+    sched.acquire('/items')
+    assert sched.acquire('/sales/history') < 0.01
+    assert sched.stats()['/items']['tokens'] < 1
+
+
+def test_interactive_requests_go_before_queued_background_ones():
+    sched = RequestScheduler(limits={'/items': (1, 0.1)})
+    sched.acquire('/items')
+    order = []
+
+    def request(name, priority):
+        sched.acquire('/items', priority)
+        order.append(name)
+
+    threads = []
+    for name, priority in (("background 1", BACKGROUND), ("background 2", BACKGROUND),
+                           ("interactive", INTERACTIVE)):
+        threads.append(threading.Thread(target=request, args=(name, priority)))
+        threads[-1].start()
+        wait_for(lambda: sched.stats()['/items']['queue_depth'] == len(threads) or order)
+    for thread in threads:
+        thread.join()
+    assert order == ["interactive", "background 1", "background 2"]
+
+
+def test_run_retries_until_success(no_jitter):
+    sched = RequestScheduler(limits={'/items': (10, 1.0)})
+    responses = [FakeResponse(503, "0"), FakeResponse(502), FakeResponse(200)]
+    sent = iter(responses)
+    assert sched.run('/items', lambda: next(sent)) is responses[-1]
+    assert responses[0].closed and responses[1].closed
+    assert sched.stats()['/items']['retries'] == 2
+    assert sched.stats()['/items']['throttled'] == 0
+
+
+def test_run_gives_up_after_max_retries(no_jitter):
+    sched = RequestScheduler(limits={'/items': (10, 1.0)}, max_retries=2)
+    calls = []
+
+    def send():
+        calls.append(1)
+        return FakeResponse(503, "0")
+
+    assert sched.run('/items', send).status_code == 503
+    assert len(calls) == 3
+
+
+def test_run_does_not_retry_client_errors():
+    sched = RequestScheduler(limits={'/items': (10, 1.0)})
+    assert sched.run('/items', lambda: FakeResponse(404)).status_code == 404
+    assert sched.stats()['/items']['retries'] == 0
+
+
+def test_429_holds_the_endpoint_for_everyone(no_jitter):
+    sched = RequestScheduler(limits={'/items': (10, 100.0)})
+    sent = iter([FakeResponse(429, "0.2"), FakeResponse(200)])
+    start = time.monotonic()
+    assert sched.run('/items', lambda: next(sent)).status_code == 200
+    assert time.monotonic() - start >= 0.2
+    stats = sched.stats()['/items']
+    assert stats['throttled'] == 1
+    # The hold left a single token for the retry instead of the remaining burst
+    assert stats['tokens'] < 1
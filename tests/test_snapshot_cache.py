@@ -0,0 +1,112 @@
+import json
+import os
+
+import pytest
+
+from main import SkinportAPI
+from metrics import Metrics
+from snapshot_cache import SnapshotCache, file_stamp
+from tests.helpers import make_items
+
+STAMP = (1, 100)
+
+
+def test_get_requires_the_same_stamp():
+    cache = SnapshotCache()
+    items = make_items(2)
+    assert cache.get("a.json", STAMP) is None
+    cache.put("a.json", STAMP, items)
+    assert cache.get("a.json", STAMP) is items
+    assert cache.get(os.path.abspath("a.json"), STAMP) is items
+    assert cache.get("a.json", (2, 100)) is None
+    assert cache.get("a.json", (1, 101)) is None
+
+
+def test_evicts_the_least_recently_used():
+    cache = SnapshotCache(max_entries=2)
+    cache.put("a", STAMP, ["a"])
+    cache.put("b", STAMP, ["b"])
+    assert cache.get("a", STAMP) == ["a"]  # a is now the most recently used
+    cache.put("c", STAMP, ["c"])
+    assert len(cache) == 2
+    assert cache.get("b", STAMP) is None
+    assert cache.get("a", STAMP) == ["a"] and cache.get("c", STAMP) == ["c"]
+
+    # Putting an existing path again refreshes it instead of adding an entry
+    cache.put("c", (2, 1), ["c2"])
+    cache.put("d", STAMP, ["d"])
+    assert len(cache) == 2
+    assert cache.get("a", STAMP) is None and cache.get("c", (2, 1)) == ["c2"]
+
+
+def test_invalidate():
+    cache = SnapshotCache()
+    for path in "abc":
+        cache.put(path, STAMP, [path])
+    cache.invalidate(["a", "missing"])
+    assert cache.get("a", STAMP) is None and len(cache) == 2
+    cache.invalidate()
+    assert len(cache) == 0
+
+
+@pytest.fixture
+def api(tmp_path):
+    return SkinportAPI(data_dir=str(tmp_path), metrics=Metrics(enabled=True))
+
+
+def save_plain(path, items):
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(items, f)
+    return str(path)
+
+
+def cache_counts(api):
+    return api.metrics.snapshot()['counters']['snapshot_cache']
+
+
+def test_rewritten_files_are_loaded_again(api, tmp_path):
+    path = save_plain(tmp_path / "items_20260101_120000.json", make_items(3))
+    first = api._load_local(path)
+    assert api._load_local(path) is first
+    assert cache_counts(api) == {"result=miss": 1, "result=hit": 1}
+
+    # A different size
+    save_plain(path, make_items(4))
+    assert len(api._load_local(path)) == 4
+
+    # Same size, new modification time
+    mtime, size = file_stamp(path)
+    items = make_items(4)
+    items[0]['min_price'] = 8.0
+    save_plain(path, items)
+    os.utime(path, ns=(mtime + 10 ** 9, mtime + 10 ** 9))
+    assert file_stamp(path)[1] == size
+    assert api._load_local(path)[0]['min_price'] == 8.0
+    assert cache_counts(api) == {"result=miss": 3, "result=hit": 1}
+
+
+def test_invalidate_snapshots(api, tmp_path):
+    paths = [save_plain(tmp_path / f"items_20260101_12000{i}.json", make_items(2)) for i in range(3)]
+    loaded = [api._load_local(path) for path in paths]
+    assert len(api.snapshot_cache) == 3
+
+    api.invalidate_snapshots([paths[0]])
+    assert api._load_local(paths[0]) is not loaded[0]
+    assert api._load_local(paths[1]) is loaded[1]
+
+    api.invalidate_snapshots()
+    assert len(api.snapshot_cache) == 0
+    assert api._load_local(paths[2]) is not loaded[2]
+
+
+def test_local_items_are_cached_with_the_configured_capacity(api, tmp_path):
+    paths = [save_plain(tmp_path / f"items_20260101_12000{i}.json", make_items(2))
+             for i in range(api.SNAPSHOT_CACHE_SIZE + 1)]
+    for path in paths:
+        api.get_items(use_local=True, local_file=path)
+    assert len(api.snapshot_cache) == api.SNAPSHOT_CACHE_SIZE
+    # The oldest was evicted, the newest is still served from memory
+    assert api.get_items(use_local=True, local_file=paths[-1]) is api.get_items(use_local=True, local_file=paths[-1])
+    before = cache_counts(api)["result=miss"]
+    api.get_items(use_local=True, local_file=paths[0])
+    assert cache_counts(api)["result=miss"] == before + 1
@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import snapshot_io
+from snapshot_io import SnapshotWriter, read_snapshot, snapshot_base, write_snapshot_json
+from tests.helpers import make_items
+
+
+@pytest.fixture
+def items():
+    items = make_items(50)
+    items[0]['market_hash_name'] = "★ Karambit | Doppler (Factory New)"
+    items[1]['min_price'] = None
+    return items
+
+
+def test_plain_and_compressed_snapshots_read_the_same(tmp_path, items):
+    plain = str(tmp_path / "items_1.json")
+    with open(plain, 'w', encoding='utf-8') as f:
+        json.dump(items, f, indent=2)
+    compressed = write_snapshot_json(str(tmp_path / "items_1.json.gz"), items)
+    assert read_snapshot(plain) == read_snapshot(compressed) == items
+    assert snapshot_base(plain) == snapshot_base(compressed) == str(tmp_path / "items_1")
+
+
+def test_failed_write_leaves_no_partial_file(tmp_path, items, monkeypatch):
+    path = str(tmp_path / "items_1.json.gz")
+    write_snapshot_json(path, items[:2])
+
+    def fail(fd):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(snapshot_io.os, "fsync", fail)
+    with pytest.raises(OSError, match="disk full"):
+        write_snapshot_json(path, items)
+    with pytest.raises(OSError):
+        write_snapshot_json(str(tmp_path / "items_2.json.gz"), items)
+    # The old snapshot is untouched and no temporary or new file is left behind
+    assert os.listdir(tmp_path) == ["items_1.json.gz"]
+    assert read_snapshot(path) == items[:2]
+
+
+def test_truncated_snapshot_is_reported(tmp_path, items):
+    path = write_snapshot_json(str(tmp_path / "items_1.json.gz"), items)
+    with open(path, 'rb') as f:
+        data = f.read()
+    for size in (len(data) - 4, len(data) // 2, 5):
+        with open(path, 'wb') as f:
+            f.write(data[:size])
+        with pytest.raises(ValueError, match="Corrupt snapshot"):
+            read_snapshot(path)
+
+
+def test_corrupt_snapshot_is_reported(tmp_path, items):
+    path = write_snapshot_json(str(tmp_path / "items_1.json.gz"), items)
+    with open(path, 'rb') as f:
+        data = bytearray(f.read())
+    # A damaged CRC-32 trailer with intact data still fails the check
+    data[-8] ^= 0xFF
+    with open(path, 'wb') as f:
+        f.write(data)
+    with pytest.raises(ValueError, match="Corrupt snapshot"):
+        read_snapshot(path)
+
+    data[-8] ^= 0xFF
+    data[len(data) // 2] ^= 0xFF
+    with open(path, 'wb') as f:
+        f.write(data)
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+
+
+def test_flush_drains_the_queue(capsys):
+    written = []
+
+    def write(index):
+        time.sleep(0.005)
+        if index == 3:
+            raise OSError("disk full")
+        written.append(index)
+
+    writer = SnapshotWriter(write, max_pending=2)
+    writer.flush()  # Nothing submitted yet
+    for index in range(10):
+        writer.submit(index)
+    writer.flush()
+    assert writer.pending() == 0
+    assert written == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert "Error saving snapshot: disk full" in capsys.readouterr().out
+
+
+def test_submit_blocks_while_the_queue_is_full():
+    release = threading.Event()
+    writer = SnapshotWriter(lambda: release.wait(5), max_pending=1)
+    writer.submit()
+    writer.submit()  # The first one is being written, this one waits in the queue
+    blocked = threading.Thread(target=writer.submit)
+    blocked.start()
+    blocked.join(0.1)
+    assert blocked.is_alive() and writer.pending() == 2
+    release.set()
+    blocked.join(5)
+    writer.flush()
+    assert writer.pending() == 0
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from streaming import iter_json_array
+
+
+def chunked(text: str, size: int):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+ITEMS = [{"market_hash_name": "AK-47 | Redline (Field-Tested)", "min_price": 12.5, "quantity": 3},
+         {"market_hash_name": "Glove Case Key", "min_price": None, "quantity": 0},
+         123456789, -0.5, "text with ] and , inside", [], {}]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10 ** 6])
+def test_parses_any_chunking(size):
+    text = json.dumps(ITEMS, indent=2)
+    assert list(iter_json_array(chunked(text, size))) == ITEMS
+
+
+def test_multibyte_utf8_split_across_chunks():
+    data = json.dumps(["★ StatTrak™ Karambit"], ensure_ascii=False).encode("utf-8")
+    assert list(iter_json_array(data[i:i + 1] for i in range(len(data)))) == ["★ StatTrak™ Karambit"]
+
+
+@pytest.mark.parametrize("text", ["[]", " [ ] ", "[\n]"])
+def test_empty_array(text):
+    assert list(iter_json_array([text])) == []
+
+
+def test_stops_at_closing_bracket():
+    chunks = iter(["[1, 2]", "never read"])
+    assert list(iter_json_array(chunks)) == [1, 2]
+    assert next(chunks) == "never read"
+
+
+@pytest.mark.parametrize("text", ["[1,]", "[1, ]", "[1,\n]", "[,1]", "[1 2]", "[1,,2]", "{}", "1", "[1", "[1,", ""])
+def test_rejects_malformed_arrays(text):
+    with pytest.raises(ValueError):
+        list(iter_json_array(chunked(text, 1)))
+    with pytest.raises(ValueError):
+        list(iter_json_array([text]))
+
+
+@pytest.mark.parametrize("chunks, expected", [
+    (["[12", "34, 5", "6]"], [1234, 56]),
+    (["[-0", ".5]"], [-0.5]),
+    (["[12.", "5]"], [12.5]),
+    (["[1", "e3, 2E", "-1]"], [1000.0, 0.2]),
+])
+def test_numbers_split_at_any_point(chunks, expected):
+    assert list(iter_json_array(chunks)) == expected
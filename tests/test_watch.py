@@ -0,0 +1,139 @@
+import pytest
+
+import main
+import watch
+from fake_server import SnapshotReplay
+from main import SkinportAPI
+from scheduler import RequestScheduler
+from tests.helpers import make_items
+from watch import AlertRule, Watcher
+
+
+class ListSink:
+    def __init__(self):
+        self.alerts = []
+
+    def emit(self, alert):
+        self.alerts.append(alert)
+
+
+class CountingRule(AlertRule):
+    """Rule that records which items it was evaluated for."""
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.seen = []
+
+    def matches(self, item, discount):
+        self.seen.append(item['market_hash_name'])
+        return super().matches(item, discount)
+
+
+@pytest.fixture
+def market(fake_server, tmp_path, clock, monkeypatch):
+    """A fake server whose items can be replaced between polls, and a client polling it."""
+    monkeypatch.setattr(watch, "datetime", main.datetime)
+    server = fake_server()
+    served = []
+
+    def serve(items):
+        data_dir = str(tmp_path / f"served{len(served)}")
+        seeded = SkinportAPI(data_dir=data_dir)
+        seeded._save_response(items, "EUR", 730)
+        seeded.flush_saves()
+        server.replay = SnapshotReplay(data_dir)
+        served.append(items)
+        clock.advance(minutes=1)
+
+    api = SkinportAPI("id", "secret", data_dir=str(tmp_path / "client"), base_url=server.url, cache_ttl=0,
+                      scheduler=RequestScheduler(limits={'/items': (100, 1.0)}))
+    yield server, serve, api
+    api.flush_saves()
+
+
+def names(alerts):
+    return [alert['market_hash_name'] for alert in alerts]
+
+
+def test_only_changed_items_are_evaluated(market):
+    server, serve, api = market
+    rule = CountingRule("any")
+    watcher = Watcher(api, [rule], [ListSink()])
+    items = make_items(10)
+    serve(items)
+    watcher.cycle()
+    assert rule.seen == [f"Item {i}" for i in range(10)]
+
+    rule.seen.clear()
+    items[3]['min_price'] = 1.0
+    items[5]['quantity'] = 50
+    items[7]['item_page'] = "https://skinport.com/item/moved"  # Not a watched field
+    serve(items)
+    watcher.cycle()
+    assert rule.seen == ["Item 3", "Item 5"]
+
+
+def test_alerts_fire_once_while_matching_and_again_after_a_gap(market):
+    server, serve, api = market
+    sink = ListSink()
+    watcher = Watcher(api, [AlertRule("cheap", max_price=12)], [sink])
+    items = make_items(6)  # min_price 9 to 14
+    serve(items)
+    assert watcher.cycle() == 4
+    assert names(sink.alerts) == ["Item 0", "Item 1", "Item 2", "Item 3"]
+    assert sink.alerts[0]['timestamp'] == "2026-01-01T12:01:00"
+    assert sink.alerts[0]['rule'] == "cheap" and sink.alerts[0]['discount_percent'] == 10.0
+
+    # Still matching after a change: no new alert
+    items[1]['quantity'] += 5
+    serve(items)
+    assert watcher.cycle() == 0
+
+    # Stops matching, then matches again
+    items[1]['min_price'] = 20.0
+    serve(items)
+    assert watcher.cycle() == 0
+    assert ("cheap", "Item 1") not in watcher._active
+    items[1]['min_price'] = 10.0
+    serve(items)
+    assert watcher.cycle() == 1
+    assert names(sink.alerts[4:]) == ["Item 1"]
+
+
+def test_removed_items_are_cleared(market):
+    server, serve, api = market
+    sink = ListSink()
+    watcher = Watcher(api, [AlertRule("cheap", max_price=12)], [sink])
+    items = make_items(6)
+    serve(items)
+    watcher.cycle()
+    assert ("cheap", "Item 0") in watcher._active
+
+    serve(items[1:])
+    assert watcher.cycle() == 0
+    assert ("cheap", "Item 0") not in watcher._active
+    assert "Item 0" not in watcher._state
+
+    serve(items)
+    assert watcher.cycle() == 1
+    assert names(sink.alerts[4:]) == ["Item 0"]
+
+
+def test_unchanged_responses_emit_nothing(market):
+    server, serve, api = market
+    rule = CountingRule("any")
+    sink = ListSink()
+    watcher = Watcher(api, [rule], [sink])
+    serve(make_items(3))
+    assert watcher.cycle() == 3
+
+    # Revalidated with a 304, so the client hands back the very same items
+    rule.seen.clear()
+    assert watcher.cycle() == 0
+    assert rule.seen == [] and len(sink.alerts) == 3
+    assert (api.fetch_stats['misses'], api.fetch_stats['not_modified']) == (1, 1)
+
+    # Served from the client's cache without a request
+    api.cache_ttl = 300
+    assert watcher.cycle() == 0
+    assert (api.fetch_stats['hits'], api.fetch_stats['misses']) == (1, 1)
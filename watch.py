@@ -0,0 +1,248 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Set, TextIO, Tuple
+
+import requests
+from dotenv import load_dotenv
+
+from catalog import parse_retention
+from discounts import item_discount
+from main import BACKGROUND, SkinportAPI
+from metrics import Metrics, MetricsLogger, serve_prometheus
+
+# Fields whose change makes an item worth re-evaluating
+WATCHED_FIELDS = ('min_price', 'suggested_price', 'quantity')
+
+
+@dataclass
+class AlertRule:
+    """
+    A saved alert condition. Unset limits don't filter.
+
+    name_pattern is a case-insensitive regular expression searched for in
+    market_hash_name.
+    """
+    name: str
+    min_discount_percent: Optional[float] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    name_pattern: Optional[str] = None
+    _regex: Optional[re.Pattern] = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.name_pattern:
+            self._regex = re.compile(self.name_pattern, re.IGNORECASE)
+
+    def matches(self, item: Dict, discount: Optional[float]) -> bool:
+        price = item.get('min_price')
+        if price is None:
+            return False
+        if self.min_price is not None and price < self.min_price:
+            return False
+        if self.max_price is not None and price > self.max_price:
+            return False
+        if self.min_discount_percent is not None and (discount is None or discount < self.min_discount_percent):
+            return False
+        if self._regex is not None and not self._regex.search(item.get('market_hash_name', '')):
+            return False
+        return True
+
+
+def load_rules(path: str) -> List[AlertRule]:
+    """Load alert rules from a JSON file holding a list of rule objects."""
+    with open(path, 'r', encoding='utf-8') as f:
+        return [AlertRule(**rule) for rule in json.load(f)]
+
+
+class StdoutSink:
+    """Print alerts as human-readable lines."""
+
+    def __init__(self, stream: Optional[TextIO] = None):
+        # None writes to whatever sys.stdout is when an alert is emitted
+        self.stream = stream
+
+    def emit(self, alert: Dict):
+        discount = alert['discount_percent']
+        discount = f"{discount:.1f}%" if discount is not None else "-"
+        print(f"[{alert['timestamp']}] {alert['rule']}: {alert['market_hash_name']} "
+              f"at {alert['min_price']:.2f} {alert['currency']} ({discount} off)", file=self.stream or sys.stdout,
+              flush=True)
+
+
+class NdjsonSink:
+    """Append alerts as one JSON object per line to a file ('-' for stdout)."""
+
+    def __init__(self, path: str):
+        self.stream = None if path == "-" else open(path, 'a', encoding='utf-8')
+
+    def emit(self, alert: Dict):
+        stream = self.stream or sys.stdout
+        stream.write(json.dumps(alert) + "\n")
+        stream.flush()
+
+
+class WebhookSink:
+    """POST each alert as JSON to a URL."""
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def emit(self, alert: Dict):
+        try:
+            self.session.post(self.url, json=alert, timeout=self.timeout).raise_for_status()
+        except requests.exceptions.RequestException as e:
+            print(f"Error sending webhook: {str(e)}", file=sys.stderr)
+
+
+class Watcher:
+    """
+    Poll /v1/items and emit alerts for rules that newly match.
+
+    The previous prices are kept in memory, and rules are only evaluated for
+    items whose price or quantity changed since the last cycle. An unchanged
+    response (served from the API cache or a 304) costs no evaluation at all.
+    """
+
+    def __init__(self, api: SkinportAPI, rules: List[AlertRule], sinks: List, currency: str = "EUR",
+                 app_id: int = 730, interval: float = SkinportAPI.CACHE_TTL):
+        self.api = api
+        self.rules = rules
+        self.sinks = sinks
+        self.currency = currency
+        self.app_id = app_id
+        self.interval = interval
+        self._last_items = None
+        self._state: Dict[str, Tuple] = {}
+        # (rule name, item name) pairs currently matching, so each hit is emitted once
+        self._active: Set[Tuple[str, str]] = set()
+
+    def _changed(self, items) -> List[Dict]:
+        changed = []
+        seen = set()
+        state = self._state
+        for item in items:
+            name = item['market_hash_name']
+            seen.add(name)
+            values = tuple(item.get(key) for key in WATCHED_FIELDS)
+            if state.get(name) != values:
+                state[name] = values
+                changed.append(item)
+        removed = [name for name in state if name not in seen]
+        for name in removed:
+            del state[name]
+        if removed:
+            removed = set(removed)
+            self._active = {hit for hit in self._active if hit[1] not in removed}
+        return changed
+
+    def cycle(self) -> int:
+        """
+        Run one poll and evaluation.
+
+        Returns:
+            Number of alerts emitted
+        """
+        items = self.api.get_items(self.currency, self.app_id, priority=BACKGROUND)
+        if items is self._last_items:
+            return 0
+        self._last_items = items
+
+        emitted = 0
+        timestamp = datetime.now().isoformat(timespec='seconds')
+        for item in self._changed(items):
+            name = item['market_hash_name']
+            discount = item_discount(item)
+            for rule in self.rules:
+                hit = (rule.name, name)
+                if not rule.matches(item, discount):
+                    self._active.discard(hit)
+                    continue
+                if hit in self._active:
+                    continue
+                self._active.add(hit)
+                alert = {
+                    'timestamp': timestamp,
+                    'rule': rule.name,
+                    'market_hash_name': name,
+                    'min_price': item.get('min_price'),
+                    'suggested_price': item.get('suggested_price'),
+                    'discount_percent': discount,
+                    'quantity': item.get('quantity'),
+                    'currency': item.get('currency', self.currency),
+                    'item_page': item.get('item_page'),
+                }
+                for sink in self.sinks:
+                    sink.emit(alert)
+                emitted += 1
+        return emitted
+
+    def next_run(self, now: float) -> float:
+        """Next poll time, aligned to the server cache window (plus a small margin)."""
+        return (now // self.interval + 1) * self.interval + 5
+
+    def run(self, cycles: Optional[int] = None):
+        """Poll until interrupted (or for a number of cycles)."""
+        done = 0
+        while cycles is None or done < cycles:
+            try:
+                self.cycle()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                print(f"Error during poll: {str(e)}", file=sys.stderr)
+            done += 1
+            if cycles is not None and done >= cycles:
+                break
+            time.sleep(max(0.0, self.next_run(time.time()) - time.time()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch Skinport prices and emit alerts")
+    parser.add_argument("--rules", required=True, help="JSON file with a list of alert rules")
+    parser.add_argument("--currency", default="EUR")
+    parser.add_argument("--app-id", type=int, default=730)
+    parser.add_argument("--interval", type=float, default=SkinportAPI.CACHE_TTL,
+                        help="Seconds between polls (default: server cache window)")
+    parser.add_argument("--ndjson", action="append", default=[], metavar="PATH",
+                        help="Append alerts as NDJSON to PATH ('-' for stdout)")
+    parser.add_argument("--webhook", action="append", default=[], metavar="URL",
+                        help="POST alerts as JSON to URL")
+    parser.add_argument("--quiet", action="store_true", help="Don't print alerts to stdout")
+    parser.add_argument("--once", action="store_true", help="Run a single poll and exit")
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics on http://127.0.0.1:PORT/metrics")
+    parser.add_argument("--metrics-log", type=float, metavar="SECONDS",
+                        help="Write metrics as a JSON line to stderr every SECONDS")
+    parser.add_argument("--base-url", metavar="URL",
+                        help="API root to use instead of Skinport's (default: $SKINPORT_BASE_URL or the live API)")
+    args = parser.parse_args()
+
+    load_dotenv()
+    metrics = Metrics(enabled=args.metrics_port is not None or args.metrics_log is not None)
+    api = SkinportAPI(os.getenv('SKINPORT_CLIENT_ID'), os.getenv('SKINPORT_CLIENT_SECRET'), metrics=metrics,
+                      base_url=args.base_url or os.getenv('SKINPORT_BASE_URL'),
+                      retention=parse_retention(os.getenv('SKINPORT_RETENTION')))
+    if args.metrics_port is not None:
+        serve_prometheus(api.get_metrics, args.metrics_port)
+    if args.metrics_log is not None:
+        MetricsLogger(api.get_metrics, args.metrics_log).start()
+
+    sinks = [] if args.quiet else [StdoutSink()]
+    sinks += [NdjsonSink(path) for path in args.ndjson]
+    sinks += [WebhookSink(url) for url in args.webhook]
+
+    watcher = Watcher(api, load_rules(args.rules), sinks, args.currency, args.app_id, args.interval)
+    try:
+        watcher.run(cycles=1 if args.once else None)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()